@@ -1,11 +1,14 @@
 import os
 import json
-import google.generativeai as genai
 from typing import Dict, List, Optional, Tuple
 import requests
 from datetime import datetime, timedelta
 import re
 
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
 # Load environment variables
 try:
     from dotenv import load_dotenv
@@ -13,31 +16,43 @@ try:
 except ImportError:
     pass
 
-# Configure Gemini API
+# Gemini API key; the SDK is only imported when a key is set, so the
+# nutrition calculations work without google-generativeai installed
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-if GEMINI_API_KEY:
+
+
+def _import_gemini():
+    """The configured google.generativeai module, or None when the SDK isn't installed"""
+    try:
+        import google.generativeai as genai
+    except ImportError as e:
+        logger.warning("Gemini SDK not installed (%s); AI meal planning is unavailable", e)
+        return None
     genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
 
 class AIMealPlanner:
     def __init__(self):
         self.model = None
-        if GEMINI_API_KEY:
+        genai = _import_gemini() if GEMINI_API_KEY else None
+        if genai is not None:
             try:
                 # Try different model names
                 model_names = ['gemini-1.5-pro', 'gemini-pro', 'gemini-1.0-pro']
                 for model_name in model_names:
                     try:
                         self.model = genai.GenerativeModel(model_name)
-                        print(f"Successfully initialized Gemini model: {model_name}")
+                        logger.info("Successfully initialized Gemini model: %s", model_name)
                         break
                     except Exception as e:
-                        print(f"Failed to initialize {model_name}: {e}")
+                        logger.warning("Failed to initialize %s: %s", model_name, e)
                         continue
                 else:
-                    print("Could not initialize any Gemini model")
+                    logger.warning("Could not initialize any Gemini model")
                     self.model = None
             except Exception as e:
-                print(f"Error initializing Gemini model: {e}")
+                logger.error("Error initializing Gemini model: %s", e)
                 self.model = None
         
         # Nutrition calculation constants
@@ -502,7 +517,7 @@ Format the response as a JSON object:
         except Exception as e:
             # Check if it's a quota error and use fallback
             if "quota" in str(e).lower() or "429" in str(e):
-                print("API quota exceeded, using fallback meal plan")
+                logger.warning("API quota exceeded, using fallback meal plan")
                 # Return the fallback meal plan directly
                 nutrition_needs = self.calculate_nutritional_needs(
                     age=user_profile.get('age', 30),
@@ -788,7 +803,7 @@ Format the response as a JSON object:
         except Exception as e:
             # Check if it's a quota error and use fallback
             if "quota" in str(e).lower() or "429" in str(e):
-                print("API quota exceeded, using fallback custom meal")
+                logger.warning("API quota exceeded, using fallback custom meal")
                 # Return the fallback custom meal directly
                 return {
                     "meal": {
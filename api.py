@@ -1,34 +1,61 @@
+import time
+_api_import_started = time.perf_counter()
+
+# Configure logging before the other imports so their startup messages are routed too
+from app_logging import setup_logging, get_logger, logging_stats
+setup_logging()
+logger = get_logger("api")
+
 from fastapi import FastAPI, HTTPException, Request, Depends, Form, status, WebSocket, WebSocketDisconnect, Query, UploadFile, File, Body
 
 import pymysql
+from db_pool import get_pool, pool_stats, close_all_pools
+from db_offload import OffloadedRoute, run_in_db_executor, shutdown_db_executor, stay_on_event_loop, DB_MAX_CONCURRENCY
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse, StreamingResponse, PlainTextResponse, Response
+from fastapi.encoders import jsonable_encoder
 from datetime import datetime, timedelta, time as dt_time
 import time
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from typing import Optional, Dict, Tuple, List, Union
-import secrets
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import hashlib
 import json
 import os
 import random
-import numpy as np
-import cv2
-import torch
-from transformers import AutoImageProcessor, AutoModelForImageClassification, SiglipForImageClassification
 from PIL import Image
-import requests
-import pandas as pd
+import httpx
+import http_client
+from nutrition_cache import nutrition_cache, food_key, query_key
+from session_store import SessionMiddleware, session_store
+from metrics import MetricsMiddleware, render_metrics, PROMETHEUS_CONTENT_TYPE
+from query_profiler import QueryProfilerMiddleware, query_profiler, format_report
+from food_import import search_local_foods, get_local_food_nutrition
+from inference_batcher import QueueFullError
+from model_registry import lazy_module, start_warmup, readiness, record_import_time
+from ml_models import food_batcher, workout_batcher
+import gym_stats
+import scheduling
+import availability
+from scheduling import SCHEDULING_HORIZON_WEEKS, SCHEDULING_MAX_HORIZON_WEEKS
+import response_cache as cache_events
+from response_cache import response_cache
+import inference_client
+from inference_client import InferenceError
 import io
 
+# pandas is only needed by the Excel exports; import it on first use
+pd = lazy_module("pandas")
+
 # Import food detection routes
 try:
     from routes.food_detect import router as food_detect_router
     FOOD_DETECT_AVAILABLE = True
 except ImportError:
     FOOD_DETECT_AVAILABLE = False
-    print("Warning: Food detection routes not available")
+    logger.warning("Food detection routes not available")
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -44,15 +71,21 @@ def get_usda_api_key() -> str:
     """Get USDA API key from environment or use demo key"""
     api_key = os.environ.get('USDA_API_KEY')
     if not api_key:
-        print("Warning: No USDA API key found. Using DEMO_KEY with rate limits.")
+        logger.warning("No USDA API key found. Using DEMO_KEY with rate limits.")
         return 'DEMO_KEY'
     return api_key
 
-def search_usda_foods(query: str, max_results: int = 5) -> List[Dict]:
+async def search_usda_foods(query: str, max_results: int = 5) -> List[Dict]:
     """
     Search for foods in USDA database
-    Returns list of food items with basic info
+    Returns list of food items with basic info (cached, see nutrition_cache.py)
     """
+    return await nutrition_cache.get_or_fetch(
+        query_key("search", query, max_results),
+        lambda: _fetch_usda_foods(query, max_results)
+    ) or []
+
+async def _fetch_usda_foods(query: str, max_results: int) -> List[Dict]:
     api_key = get_usda_api_key()
     url = f"{USDA_API_BASE_URL}/foods/search"
     
@@ -66,7 +99,7 @@ def search_usda_foods(query: str, max_results: int = 5) -> List[Dict]:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = await http_client.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         
@@ -83,14 +116,17 @@ def search_usda_foods(query: str, max_results: int = 5) -> List[Dict]:
         
         return foods
     except Exception as e:
-        print(f"Error searching USDA foods: {e}")
+        logger.error("Error searching USDA foods: %s", e)
         return []
 
-def get_usda_food_details(fdc_id: int) -> Optional[Dict]:
+async def get_usda_food_details(fdc_id: int) -> Optional[Dict]:
     """
     Get detailed nutrition information for a specific food
-    Returns comprehensive nutrition data
+    Returns comprehensive nutrition data (cached, see nutrition_cache.py)
     """
+    return await nutrition_cache.get_or_fetch(food_key(fdc_id), lambda: _fetch_usda_food_details(fdc_id))
+
+async def _fetch_usda_food_details(fdc_id: int) -> Optional[Dict]:
     api_key = get_usda_api_key()
     url = f"{USDA_API_BASE_URL}/food/{fdc_id}"
     
@@ -100,17 +136,17 @@ def get_usda_food_details(fdc_id: int) -> Optional[Dict]:
         'nutrients': '203,204,205,208,269'  # Protein, Fat, Carbs, Calories, Sugar
     }
     
-    print(f"🔍 Getting details for FDC ID: {fdc_id}")
-    print(f"🌐 URL: {url}")
+    logger.debug("🔍 Getting details for FDC ID: %s", fdc_id)
+    logger.debug("🌐 URL: %s", url)
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = await http_client.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         
-        print(f"✅ USDA API response received")
-        print(f"📊 Food name: {data.get('description', 'Unknown')}")
-        print(f"📊 Nutrients found: {len(data.get('foodNutrients', []))}")
+        logger.debug("✅ USDA API response received")
+        logger.debug("📊 Food name: %s", data.get('description', 'Unknown'))
+        logger.debug("📊 Nutrients found: %s", len(data.get('foodNutrients', [])))
         
         # Extract nutrition data
         nutrition_data = {
@@ -137,34 +173,34 @@ def get_usda_food_details(fdc_id: int) -> Optional[Dict]:
             value = nutrient.get('amount', 0)
             nutrient_name = nutrient.get('nutrient', {}).get('name', 'Unknown')
             
-            print(f"📊 Processing nutrient: {nutrient_name} (ID: {nutrient_id}) = {value}")
+            logger.debug("📊 Processing nutrient: %s (ID: %s) = %s", nutrient_name, nutrient_id, value)
             
             # Map nutrient IDs to our fields (updated based on actual USDA API response)
             if nutrient_id == 1003:  # Protein
                 nutrition_data['protein'] = int(round(value))
-                print(f"✅ Protein: {nutrition_data['protein']}")
+                logger.debug("✅ Protein: %s", nutrition_data['protein'])
             elif nutrient_id == 1004:  # Total lipid (fat)
                 nutrition_data['fat'] = int(round(value))
-                print(f"✅ Fat: {nutrition_data['fat']}")
+                logger.debug("✅ Fat: %s", nutrition_data['fat'])
             elif nutrient_id == 1005:  # Carbohydrate
                 nutrition_data['carbs'] = int(round(value))
-                print(f"✅ Carbs: {nutrition_data['carbs']}")
+                logger.debug("✅ Carbs: %s", nutrition_data['carbs'])
             elif nutrient_id == 2000:  # Total Sugars
                 nutrition_data['sugar'] = int(round(value))
-                print(f"✅ Sugar: {nutrition_data['sugar']}")
+                logger.debug("✅ Sugar: %s", nutrition_data['sugar'])
             # Also check for alternative IDs
             elif nutrient_id == 203:  # Protein (alternative)
                 nutrition_data['protein'] = int(round(value))
-                print(f"✅ Protein (alt): {nutrition_data['protein']}")
+                logger.debug("✅ Protein (alt): %s", nutrition_data['protein'])
             elif nutrient_id == 204:  # Total lipid (fat) (alternative)
                 nutrition_data['fat'] = int(round(value))
-                print(f"✅ Fat (alt): {nutrition_data['fat']}")
+                logger.debug("✅ Fat (alt): %s", nutrition_data['fat'])
             elif nutrient_id == 205:  # Carbohydrate (alternative)
                 nutrition_data['carbs'] = int(round(value))
-                print(f"✅ Carbs (alt): {nutrition_data['carbs']}")
+                logger.debug("✅ Carbs (alt): %s", nutrition_data['carbs'])
             elif nutrient_id == 208:  # Energy (kcal) (alternative)
                 nutrition_data['calories'] = int(round(value))
-                print(f"✅ Calories: {nutrition_data['calories']}")
+                logger.debug("✅ Calories: %s", nutrition_data['calories'])
             elif nutrient_id == 291:  # Fiber
                 nutrition_data['fiber'] = int(round(value))
             elif nutrient_id == 269:  # Sugars (alternative)
@@ -182,98 +218,51 @@ def get_usda_food_details(fdc_id: int) -> Optional[Dict]:
         if nutrition_data['calories'] == 0:
             calculated_calories = (nutrition_data['protein'] * 4) + (nutrition_data['carbs'] * 4) + (nutrition_data['fat'] * 9)
             nutrition_data['calories'] = int(round(calculated_calories))
-            print(f"📊 Calculated calories: {nutrition_data['calories']} (protein: {nutrition_data['protein']}g, carbs: {nutrition_data['carbs']}g, fat: {nutrition_data['fat']}g)")
+            logger.debug("📊 Calculated calories: %s (protein: %sg, carbs: %sg, fat: %sg)", nutrition_data['calories'], nutrition_data['protein'], nutrition_data['carbs'], nutrition_data['fat'])
         
-        print(f"📊 Final nutrition data: {nutrition_data}")
+        logger.debug("📊 Final nutrition data: %s", nutrition_data)
         return nutrition_data
         
     except Exception as e:
-        print(f"Error getting USDA food details: {e}")
+        logger.error("Error getting USDA food details: %s", e)
         return None
 
-# Initialize food classification model
-FOOD_MODEL_NAME = "Kaludi/food-category-classification-v2.0"
-food_processor = None
-food_model = None
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-def load_food_classification_model():
-    """Load the food classification model from Hugging Face"""
-    global food_processor, food_model
-    try:
-        print(f"Loading food classification model: {FOOD_MODEL_NAME}")
-        food_processor = AutoImageProcessor.from_pretrained(FOOD_MODEL_NAME)
-        food_model = AutoModelForImageClassification.from_pretrained(FOOD_MODEL_NAME)
-        food_model.to(device)
-        food_model.eval()
-        print("Food classification model loaded successfully")
-    except Exception as e:
-        print(f"Error loading food classification model: {e}")
-        # Fallback to a simpler model
-        try:
-            fallback_model = "Shresthadev403/food-image-classification"
-            print(f"Loading fallback model: {fallback_model}")
-            food_processor = AutoImageProcessor.from_pretrained(fallback_model)
-            food_model = AutoModelForImageClassification.from_pretrained(fallback_model)
-            food_model.to(device)
-            food_model.eval()
-            print("Fallback food classification model loaded successfully")
-        except Exception as e2:
-            print(f"Error loading fallback model: {e2}")
-            food_processor = None
-            food_model = None
-
-def classify_food_image(image_data: bytes) -> Dict:
-    """
-    Classify food in an image using Hugging Face model
-    Returns the detected food type and confidence
-    """
-    if food_model is None or food_processor is None:
-        return {"error": "Food classification model not loaded"}
-    
-    try:
-        # Convert bytes to PIL Image
-        from PIL import Image
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Preprocess image
-        inputs = food_processor(images=image, return_tensors="pt")
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        
-        # Get predictions
-        with torch.no_grad():
-            outputs = food_model(**inputs)
-            logits = outputs.logits
-            probabilities = torch.nn.functional.softmax(logits, dim=-1)
-        
-        # Get top predictions
-        top_probs, top_indices = torch.topk(probabilities, 3)
-        
-        predictions = []
-        for i in range(len(top_indices[0])):
-            label_id = top_indices[0][i].item()
-            confidence = top_probs[0][i].item()
-            label = food_model.config.id2label.get(label_id, f"class_{label_id}")
-            predictions.append({
-                "food_type": label,
-                "confidence": confidence,
-                "label_id": label_id
-            })
-        
-        return {
-            "success": True,
-            "predictions": predictions,
-            "top_prediction": predictions[0] if predictions else None
-        }
-        
+def find_local_foods(query: str, limit: int) -> List[Dict]:
+    """Search foods imported from USDA dumps by food_import.py"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        return search_local_foods(cursor, query, limit)
     except Exception as e:
-        print(f"Error classifying food image: {e}")
-        return {"error": f"Error classifying image: {str(e)}"}
+        logger.warning("Local food search unavailable: %s", e)
+        return []
+    finally:
+        cursor.close()
+        conn.close()
 
-def search_usda_foods_enhanced(query: str, max_results: int = 5) -> List[Dict]:
+def find_local_food_nutrition(fdc_id: int) -> Optional[Dict]:
+    """Nutrition for a food imported from USDA dumps by food_import.py"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        return get_local_food_nutrition(cursor, fdc_id)
+    except Exception as e:
+        logger.warning("Local food lookup unavailable: %s", e)
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+async def search_usda_foods_enhanced(query: str, max_results: int = 5) -> List[Dict]:
     """
-    Enhanced search for foods in USDA database with better matching
+    Enhanced search for foods in USDA database with better matching (cached)
     """
+    return await nutrition_cache.get_or_fetch(
+        query_key("search-enhanced", query, max_results),
+        lambda: _fetch_usda_foods_enhanced(query, max_results)
+    ) or []
+
+async def _fetch_usda_foods_enhanced(query: str, max_results: int) -> List[Dict]:
     api_key = get_usda_api_key()
     url = f"{USDA_API_BASE_URL}/foods/search"
     
@@ -287,7 +276,7 @@ def search_usda_foods_enhanced(query: str, max_results: int = 5) -> List[Dict]:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = await http_client.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         
@@ -318,17 +307,17 @@ def search_usda_foods_enhanced(query: str, max_results: int = 5) -> List[Dict]:
         
         return foods
     except Exception as e:
-        print(f"Error searching USDA foods: {e}")
+        logger.error("Error searching USDA foods: %s", e)
         return []
 
-def get_food_nutrition_from_usda(food_name: str) -> Optional[Dict]:
+async def get_food_nutrition_from_usda(food_name: str) -> Optional[Dict]:
     """
     Get nutrition information for a food from USDA database
     Returns the first matching food with complete nutrition data
     """
     try:
         # Search for the food
-        foods = search_usda_foods_enhanced(food_name, max_results=10)
+        foods = await search_usda_foods_enhanced(food_name, max_results=10)
         
         if not foods:
             return None
@@ -366,16 +355,16 @@ def get_food_nutrition_from_usda(food_name: str) -> Optional[Dict]:
         return None
         
     except Exception as e:
-        print(f"Error getting nutrition from USDA: {e}")
+        logger.error("Error getting nutrition from USDA: %s", e)
         return None
 
-def analyze_food_photo_enhanced(image_data: bytes) -> Dict:
+async def analyze_food_photo_enhanced(image_data: bytes) -> Dict:
     """
     Enhanced food photo analysis using Hugging Face model + USDA database
     """
     try:
         # Step 1: Classify the food using the Hugging Face model
-        classification_result = classify_food_image(image_data)
+        classification_result = await inference_client.classify_food(image_data)
         
         if "error" in classification_result:
             return classification_result
@@ -389,7 +378,7 @@ def analyze_food_photo_enhanced(image_data: bytes) -> Dict:
         confidence = top_prediction["confidence"]
         
         # Step 3: Search USDA database for the detected food
-        nutrition_data = get_food_nutrition_from_usda(detected_food_type)
+        nutrition_data = await get_food_nutrition_from_usda(detected_food_type)
         
         if nutrition_data:
             return {
@@ -411,7 +400,7 @@ def analyze_food_photo_enhanced(image_data: bytes) -> Dict:
             }
             
     except Exception as e:
-        print(f"Error in enhanced food analysis: {e}")
+        logger.error("Error in enhanced food analysis: %s", e)
         return {"error": f"Analysis failed: {str(e)}"}
 
 def get_estimated_nutrition(food_type: str) -> Dict:
@@ -465,35 +454,41 @@ def get_estimated_nutrition(food_type: str) -> Dict:
         "source": "Estimated (default)"
     }
 
-def search_and_get_nutrition(food_name: str) -> Optional[Dict]:
+async def search_and_get_nutrition(food_name: str) -> Optional[Dict]:
     """
     Search for food and get nutrition data in one call
-    Returns nutrition data for the best match
+    Returns nutrition data for the best match (cached by normalized food name)
     """
-    print(f"🔍 Searching for nutrition data for: {food_name}")
+    return await nutrition_cache.get_or_fetch(
+        query_key("nutrition", food_name),
+        lambda: _fetch_search_and_get_nutrition(food_name)
+    )
+
+async def _fetch_search_and_get_nutrition(food_name: str) -> Optional[Dict]:
+    logger.debug("🔍 Searching for nutrition data for: %s", food_name)
     
     # Search for foods
-    foods = search_usda_foods(food_name, max_results=3)
-    print(f"📊 Found {len(foods)} foods in search")
+    foods = await search_usda_foods(food_name, max_results=3)
+    logger.debug("📊 Found %s foods in search", len(foods))
     
     if not foods:
-        print("❌ No foods found in search")
+        logger.info("❌ No foods found in search")
         return None
     
     # Get details for the first (best) match
     best_match = foods[0]
-    print(f"🎯 Best match: {best_match['name']} (FDC ID: {best_match['fdc_id']})")
+    logger.debug("🎯 Best match: %s (FDC ID: %s)", best_match['name'], best_match['fdc_id'])
     
-    nutrition_data = get_usda_food_details(best_match['fdc_id'])
+    nutrition_data = await get_usda_food_details(best_match['fdc_id'])
     
     if nutrition_data:
         nutrition_data['search_name'] = food_name
         nutrition_data['matched_name'] = best_match['name']
         nutrition_data['confidence'] = 0.9  # High confidence for USDA data
-        print(f"✅ Nutrition data retrieved: {nutrition_data['name']}")
-        print(f"📊 Calories: {nutrition_data['calories']}, Protein: {nutrition_data['protein']}, Carbs: {nutrition_data['carbs']}, Fat: {nutrition_data['fat']}")
+        logger.info("✅ Nutrition data retrieved: %s", nutrition_data['name'])
+        logger.debug("📊 Calories: %s, Protein: %s, Carbs: %s, Fat: %s", nutrition_data['calories'], nutrition_data['protein'], nutrition_data['carbs'], nutrition_data['fat'])
     else:
-        print("❌ Could not get nutrition details")
+        logger.warning("❌ Could not get nutrition details")
     
     return nutrition_data
 
@@ -562,7 +557,7 @@ try:
     from ai_meal_planner import meal_planner
 except ImportError:
     meal_planner = None
-    print("Warning: AI meal planner not available. Install required dependencies.")
+    logger.warning("AI meal planner not available. Install required dependencies.")
 
 # Helper function to convert non-serializable objects to JSON-serializable format
 def convert_for_json(obj):
@@ -577,8 +572,41 @@ def convert_for_json(obj):
     else:
         return obj
 
+def parse_workout_notes(notes: Optional[str]) -> Tuple[str, List[str]]:
+    """Workout type and numbered exercise lines from session notes ("Workout Type: X\\n1. ...")"""
+    if not notes:
+        return "Custom", []
+    lines = notes.split("\n")
+    workout_type = "Custom"
+    if "Workout Type:" in lines[0]:
+        workout_type = lines[0].split("Workout Type:")[1].strip()
+    exercises = [line.strip() for line in lines[1:] if line.strip() and line.strip()[0].isdigit()]
+    return workout_type, exercises
+
+def format_workout_notes(workout_type: str, exercises: List[str], notes: str = "") -> str:
+    """Session notes in the format parse_workout_notes reads back"""
+    notes_content = f"Workout Type: {workout_type}"
+    if exercises:
+        notes_content += "\nExercises:\n"
+        for i, exercise in enumerate(exercises, 1):
+            notes_content += f"{i}. {exercise}\n"
+    if notes:
+        notes_content += f"\n{notes}"
+    return notes_content
+
+def encode_json(result) -> bytes:
+    """The body FastAPI would send for a returned value, for response_cache.py"""
+    return JSONResponse(content=jsonable_encoder(result)).body
+
+def cached_json_response(body: bytes, hit: bool) -> Response:
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT" if hit else "MISS"})
+
 app = FastAPI(title="Gym Management Platform")
 
+# Run async handlers (and their blocking pymysql calls) on the bounded database
+# executor so one slow query does not stall the event loop - see db_offload.py
+app.router.route_class = OffloadedRoute
+
 # Configure templates
 templates = Jinja2Templates(directory="templates")
 
@@ -594,17 +622,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, SQL count/time, external-call and inference time (served at /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# Sessions in MySQL are looked up before the route takes its own connection
+if session_store.backend == "mysql":
+    app.add_middleware(SessionMiddleware)
+
+# Slow-query log and N+1 detector (QUERY_PROFILE=off|slow|all)
+if query_profiler.enabled:
+    app.add_middleware(QueryProfilerMiddleware)
+    query_profiler.start()
+
 # Include food detection routes if available
 if FOOD_DETECT_AVAILABLE:
     app.include_router(food_detect_router)
-    print("✅ Food detection routes included")
+    logger.info("✅ Food detection routes included")
 else:
-    print("⚠️ Food detection routes not available")
+    logger.warning("⚠️ Food detection routes not available")
 
 security = HTTPBasic()
 
-# Store active sessions
-active_sessions = {}
+# Login sessions live in session_store (SESSION_BACKEND=memory|mysql)
 
 # Add membership prices configuration
 MEMBERSHIP_PRICES = {
@@ -694,39 +733,97 @@ WORKOUT_TEMPLATES = {
 def get_current_user(request: Request) -> Optional[dict]:
     try:
         session_id = request.cookies.get("session_id")
-        print(f"Session ID from cookie: {session_id}")  # Debug log
+        logger.debug("Session ID from cookie: %s", session_id)
         if not session_id:
-            print("No session ID found in cookies")  # Debug log
+            logger.debug("No session ID found in cookies")
             return None
         
-        user = active_sessions.get(session_id)
-        print(f"User from session: {user}")  # Debug log
-        print(f"Active sessions: {active_sessions}")  # Debug log
+        # Already looked up by SessionMiddleware (mysql backend, HTTP requests)
+        resolved = getattr(request.state, "session", None)
+        if resolved is not None and resolved[0] == session_id:
+            return resolved[1]
+        
+        user = session_store.get(session_id)
+        logger.debug("User from session: %s", user)
         return user
     except Exception as e:
-        print(f"Error in get_current_user: {str(e)}")  # Debug log
+        logger.error("Error in get_current_user: %s", e)
         return None
 
 # FastAPI dependency version of get_current_user
 def get_current_user_dependency(request: Request) -> dict:
-    print(f"get_current_user_dependency called")  # Debug log
+    logger.debug("get_current_user_dependency called")
     user = get_current_user(request)
-    print(f"User from get_current_user: {user}")  # Debug log
+    logger.debug("User from get_current_user: %s", user)
     if not user:
-        print("No user found, raising 401")  # Debug log
+        logger.debug("No user found, raising 401")
         raise HTTPException(status_code=401, detail="Not authenticated")
-    print(f"Returning user: {user}")  # Debug log
+    logger.debug("Returning user: %s", user)
     return user
 
+@app.on_event("startup")
+async def start_shared_http_client():
+    await http_client.start_http_client()
+
+@app.on_event("shutdown")
+async def stop_shared_http_client():
+    await http_client.close_http_client()
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    session_store.start_sweeper()
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    session_store.stop_sweeper()
+
+@app.on_event("startup")
+async def start_gym_stats():
+    # DDL commits implicitly, so the tables are created here and never inside a request transaction
+    try:
+        await run_in_db_executor(gym_stats.ensure_tables)
+    except Exception as e:
+        logger.error("Could not create gym statistics tables: %s", e)
+    gym_stats.start_reconciler()
+
+@app.on_event("shutdown")
+async def stop_gym_stats():
+    gym_stats.stop_reconciler()
+
+@app.on_event("startup")
+async def warm_up_models():
+    # Models load on a background thread (MODEL_WARMUP); requests are served meanwhile.
+    # With INFERENCE_SERVER_URL set the models live in inference_server.py instead.
+    if not inference_client.remote_inference_enabled():
+        start_warmup()
+
+@app.get("/api/ready")
+@stay_on_event_loop
+async def readiness_check():
+    """Readiness probe: 503 until the MODEL_WARMUP models have loaded (or failed to)"""
+    if inference_client.remote_inference_enabled():
+        report = readiness(required=[])
+        report["inference_servers"] = inference_client.inference_servers()
+    else:
+        report = readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/metrics")
+@stay_on_event_loop
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # Database connection
+# Connections come from the shared pool in db_pool.py; conn.close() returns
+# the connection to the pool instead of tearing down the socket.
 def get_db_connection():
-    return pymysql.connect(
-        host=os.environ.get("DB_HOST", "localhost"),
-        user=os.environ.get("DB_USER", "root"),
-        password=os.environ.get("DB_PASSWORD", "omaromar"),
-        database=os.environ.get("DB_NAME", "trainer_app"),
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return get_pool().get_connection()
+
+@app.on_event("shutdown")
+async def close_db_pools():
+    shutdown_db_executor()
+    close_all_pools()
 
 
 
@@ -849,7 +946,7 @@ async def login(request: Request):
         password = data.get('password')
         role = data.get('role')
         
-        print(f"Login attempt - Email: {email}, Role: {role}")  # Debug log
+        logger.debug("Login attempt - Email: %s, Role: %s", email, role)
         
         connection = get_db_connection()
         cursor = connection.cursor()
@@ -857,13 +954,12 @@ async def login(request: Request):
         try:
             # Check in coaches table
             if role == "coach":
-                print("Checking coach credentials...")  # Debug log
+                logger.debug("Checking coach credentials...")
                 cursor.execute("SELECT * FROM coaches WHERE email = %s", (email,))
                 coach = cursor.fetchone()
-                print(f"Found coach: {coach}")  # Debug log
+                logger.debug("Found coach: %s", coach)
                 
                 if coach and coach['password'] == password:
-                    session_id = secrets.token_urlsafe(32)
                     user_data = {
                         "user_type": "coach",
                         "name": coach['name'],
@@ -872,12 +968,12 @@ async def login(request: Request):
                         "gym_id": coach.get('gym_id', None),
                         "specialization": coach.get('specialization', '')
                     }
-                    active_sessions[session_id] = user_data
+                    session_id = session_store.create(user_data)
                     response = JSONResponse(content={"status": "success", "user": user_data})
                     response.set_cookie(key="session_id", value=session_id, httponly=True)
                     return response
                 else:
-                    print("Coach not found or password mismatch")  # Debug log
+                    logger.debug("Coach not found or password mismatch")
                     return JSONResponse(
                         status_code=401,
                         content={"detail": "Invalid coach credentials"}
@@ -888,7 +984,6 @@ async def login(request: Request):
                 cursor.execute("SELECT * FROM members WHERE email = %s AND password = %s", (email, password))
                 member = cursor.fetchone()
                 if member:
-                    session_id = secrets.token_urlsafe(32)
                     user_data = {
                         "user_type": "member",
                         "name": member['name'],
@@ -897,7 +992,7 @@ async def login(request: Request):
                         "gym_id": member['gym_id'],
                         "membership_type": member.get('membership_type', 'Basic')
                     }
-                    active_sessions[session_id] = user_data
+                    session_id = session_store.create(user_data)
                     response = JSONResponse(content={"status": "success", "user": user_data})
                     response.set_cookie(key="session_id", value=session_id, httponly=True)
                     return response
@@ -907,14 +1002,13 @@ async def login(request: Request):
                 cursor.execute("SELECT * FROM gyms WHERE email = %s AND password = %s", (email, password))
                 gym = cursor.fetchone()
                 if gym:
-                    session_id = secrets.token_urlsafe(32)
                     user_data = {
                         "user_type": "gym",
                         "name": gym['name'],
                         "email": gym['email'],
                         "id": gym['id']
                     }
-                    active_sessions[session_id] = user_data
+                    session_id = session_store.create(user_data)
                     response = JSONResponse(content={"status": "success", "user": user_data})
                     response.set_cookie(key="session_id", value=session_id, httponly=True)
                     return response
@@ -927,7 +1021,7 @@ async def login(request: Request):
             cursor.close()
             connection.close()
     except Exception as e:
-        print(f"Login error: {str(e)}")  # Debug log
+        logger.error("Login error: %s", e)
         return JSONResponse(
             status_code=500,
             content={"detail": str(e)}
@@ -1058,7 +1152,7 @@ async def get_coach_members(
         
         return members
     except Exception as e:
-        print(f"Error in get_coach_members: {str(e)}")
+        logger.error("Error in get_coach_members: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving members")
 
 @app.get("/api/coach/sessions")
@@ -1122,17 +1216,7 @@ async def get_coach_sessions(
         formatted_sessions = []
         for session in sessions:
             # Parse workout notes
-            workout_type = "Custom"
-            exercises = []
-            if session["notes"]:
-                try:
-                    # Extract workout type and exercises from notes
-                    lines = session["notes"].split("\n")
-                    if lines and "Workout Type:" in lines[0]:
-                        workout_type = lines[0].split("Workout Type:")[1].strip()
-                    exercises = [line.strip() for line in lines[1:] if line.strip() and line.strip()[0].isdigit()]
-                except:
-                    pass
+            workout_type, exercises = parse_workout_notes(session["notes"])
             
             formatted_sessions.append({
                 "id": session["id"],
@@ -1156,7 +1240,7 @@ async def get_coach_sessions(
         
         return formatted_sessions
     except Exception as e:
-        print(f"Error in get_coach_sessions: {str(e)}")
+        logger.error("Error in get_coach_sessions: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving sessions")
 
 @app.put("/api/coach/sessions/{session_id}/status")
@@ -1177,10 +1261,11 @@ async def update_session_status(
         
         # Check if session exists and belongs to coach
         cursor.execute(
-            "SELECT id FROM sessions WHERE id = %s AND coach_id = %s",
+            "SELECT id, gym_id, coach_id, member_id, session_date, status FROM sessions WHERE id = %s AND coach_id = %s",
             [session_id, current_user["id"]]
         )
-        if not cursor.fetchone():
+        before = cursor.fetchone()
+        if not before:
             raise HTTPException(status_code=404, detail="Session not found")
         
         # Update session status
@@ -1188,14 +1273,16 @@ async def update_session_status(
             "UPDATE sessions SET status = %s WHERE id = %s",
             [status, session_id]
         )
+        gym_stats.session_updated(cursor, before, session_id)
         
         conn.commit()
+        cache_events.sessions_written(before["gym_id"], before["coach_id"], before["member_id"])
         cursor.close()
         conn.close()
         
         return {"message": "Session status updated successfully"}
     except Exception as e:
-        print(f"Error in update_session_status: {str(e)}")
+        logger.error("Error in update_session_status: %s", e)
         raise HTTPException(status_code=500, detail="Error updating session status")
 
 @app.get("/api/coach/progress")
@@ -1219,7 +1306,7 @@ async def get_member_progress(
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        print(f"Fetching progress for member {member_id} with coach {current_user['id']}")
+        logger.debug("Fetching progress for member %s with coach %s", member_id, current_user['id'])
         
         # Calculate date range
         date_condition = ""
@@ -1248,11 +1335,11 @@ async def get_member_progress(
             JOIN member_coach mc ON s.member_id = mc.member_id
             WHERE mc.coach_id = %s """ + member_condition + " " + date_condition
         
-        print(f"Stats query: {stats_query}")  # Debug log
-        print(f"Stats params: {member_params}")  # Debug log
+        logger.debug("Stats query: %s", stats_query)
+        logger.debug("Stats params: %s", member_params)
         cursor.execute(stats_query, tuple(member_params))
         stats = cursor.fetchone()
-        print(f"Stats result: {stats}")  # Debug log
+        logger.debug("Stats result: %s", stats)
         
         # Calculate attendance rate
         total_sessions = stats["total_sessions"] or 0
@@ -1272,10 +1359,10 @@ async def get_member_progress(
             LIMIT 1
         """
         
-        print(f"Workout query: {workout_query}")  # Debug log
+        logger.debug("Workout query: %s", workout_query)
         cursor.execute(workout_query, tuple(member_params))
         common_workout = cursor.fetchone()
-        print(f"Common workout result: {common_workout}")  # Debug log
+        logger.debug("Common workout result: %s", common_workout)
         
         # Get session history
         history_query = """
@@ -1289,10 +1376,10 @@ async def get_member_progress(
             ORDER BY session_date
         """
         
-        print(f"History query: {history_query}")  # Debug log
+        logger.debug("History query: %s", history_query)
         cursor.execute(history_query, tuple(member_params))
         session_history = cursor.fetchall()
-        print(f"Session history result: {session_history}")  # Debug log
+        logger.debug("Session history result: %s", session_history)
         
         # Get workout distribution
         distribution_query = """
@@ -1306,10 +1393,10 @@ async def get_member_progress(
             ORDER BY count DESC
         """
         
-        print(f"Distribution query: {distribution_query}")  # Debug log
+        logger.debug("Distribution query: %s", distribution_query)
         cursor.execute(distribution_query, tuple(member_params))
         workout_distribution = cursor.fetchall()
-        print(f"Workout distribution result: {workout_distribution}")  # Debug log
+        logger.debug("Workout distribution result: %s", workout_distribution)
         
         # Get recent sessions
         sessions_query = """
@@ -1326,14 +1413,14 @@ async def get_member_progress(
             LIMIT 5
         """
         
-        print(f"Sessions query: {sessions_query}")  # Debug log
+        logger.debug("Sessions query: %s", sessions_query)
         cursor.execute(sessions_query, tuple(member_params))
         recent_sessions = cursor.fetchall()
-        print(f"Recent sessions result: {recent_sessions}")  # Debug log
+        logger.debug("Recent sessions result: %s", recent_sessions)
         
         # If no data found, create some test data
         if not session_history:
-            print("No data found, creating test data")
+            logger.debug("No data found, creating test data")
             today = datetime.now().date()
             session_history = [
                 {"date": (today - timedelta(days=i)).strftime("%Y-%m-%d"), "count": random.randint(1, 3)}
@@ -1370,7 +1457,7 @@ async def get_member_progress(
                         workout_type = lines[0].split("Workout Type:")[1].strip()
                     exercises = [line.strip() for line in lines[1:] if line.strip() and line.strip()[0].isdigit()]
                 except Exception as e:
-                    print(f"Error parsing notes: {str(e)}")
+                    logger.error("Error parsing notes: %s", e)
             
             formatted_recent_sessions.append({
                 "date": session["formatted_date"],
@@ -1401,11 +1488,11 @@ async def get_member_progress(
             "recent_sessions": formatted_recent_sessions
         }
         
-        print(f"Returning response data: {response_data}")
+        logger.debug("Returning response data: %s", response_data)
         return response_data
         
     except Exception as e:
-        print(f"Error in get_member_progress: {str(e)}")
+        logger.error("Error in get_member_progress: %s", e)
         raise HTTPException(status_code=500, detail=f"Error retrieving member progress: {str(e)}")
 
 # Gym routes
@@ -1435,7 +1522,7 @@ async def get_gym_dashboard_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting gym dashboard: {str(e)}")
+        logger.error("Error getting gym dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1467,7 +1554,7 @@ async def get_gym_members_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting gym members page: {str(e)}")
+        logger.error("Error getting gym members page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1499,7 +1586,7 @@ async def get_gym_coaches_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting gym coaches page: {str(e)}")
+        logger.error("Error getting gym coaches page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1531,7 +1618,7 @@ async def get_gym_sessions_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting gym sessions page: {str(e)}")
+        logger.error("Error getting gym sessions page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1545,6 +1632,11 @@ async def get_gym_dashboard(request: Request):
     if not user or user["user_type"] != "gym":
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    cached = response_cache.get("gym_dashboard", user["id"])
+    if cached is not None:
+        return cached_json_response(cached, hit=True)
+    token = response_cache.begin()
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -1553,26 +1645,9 @@ async def get_gym_dashboard(request: Request):
         cursor.execute("SELECT * FROM gyms WHERE id = %s", (user["id"],))
         gym = cursor.fetchone()
         
-        # Get stats with proper revenue calculation (membership fees only)
-        cursor.execute("""
-            SELECT 
-                (SELECT COUNT(*) FROM members WHERE gym_id = %s) as total_members,
-                (SELECT COUNT(*) FROM coaches WHERE gym_id = %s AND status = 'Active') as active_coaches,
-                (SELECT COUNT(*) FROM sessions WHERE gym_id = %s AND DATE(session_date) = CURDATE()) as today_sessions,
-                (
-                    -- Calculate total monthly revenue from all active members
-                    SELECT COALESCE(SUM(
-                        CASE 
-                            WHEN m.membership_type = 'Basic' THEN 50.00
-                            WHEN m.membership_type = 'Premium' THEN 100.00
-                            WHEN m.membership_type = 'VIP' THEN 150.00
-                        END
-                    ), 0)
-                    FROM members m
-                    WHERE m.gym_id = %s
-                ) as monthly_revenue
-        """, (user["id"], user["id"], user["id"], user["id"]))
-        stats = cursor.fetchone()
+        # Counters maintained by the write paths (gym_stats.py) instead of
+        # aggregating members and sessions on every load
+        stats = gym_stats.dashboard_stats(user["id"], conn)
         
         # Get recent members
         cursor.execute("""
@@ -1596,14 +1671,16 @@ async def get_gym_dashboard(request: Request):
         """, (user["id"],))
         recent_sessions = cursor.fetchall()
         
-        return {
+        body = encode_json({
             "gym": gym,
             "stats": stats,
             "recent_members": recent_members,
             "recent_sessions": recent_sessions
-        }
+        })
+        response_cache.put("gym_dashboard", user["id"], body, cache_events.gym_dashboard_tags(user["id"]), token)
+        return cached_json_response(body, hit=False)
     except Exception as e:
-        print(f"Error getting gym dashboard: {str(e)}")
+        logger.error("Error getting gym dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1642,7 +1719,7 @@ async def get_member_dashboard_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting member dashboard: {str(e)}")
+        logger.error("Error getting member dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1657,13 +1734,13 @@ async def get_member_nutrition_page(request: Request):
     
     # Check VIP or Premium membership
     membership_type = user.get('membership_type', 'Basic')
-    print(f"DEBUG: User {user.get('name')} has membership type: {membership_type}")
+    logger.debug("User %s has membership type: %s", user.get('name'), membership_type)
     
     if membership_type not in ['VIP', 'Premium']:
-        print(f"DEBUG: Access denied for membership type: {membership_type}")
+        logger.debug("Access denied for membership type: %s", membership_type)
         return RedirectResponse(url="/member/dashboard")
     
-    print(f"DEBUG: Access granted for {membership_type} member")
+    logger.debug("Access granted for %s member", membership_type)
     return templates.TemplateResponse(
         "member/nutrition.html",
         {
@@ -1679,13 +1756,18 @@ async def get_member_dashboard(request: Request):
     if not user or user["user_type"] != "member":
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    cached = response_cache.get("member_dashboard", user["id"])
+    if cached is not None:
+        return cached_json_response(cached, hit=True)
+    token = response_cache.begin()
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         # Get member info
         cursor.execute("""
-            SELECT m.*, c.name as coach_name, c.specialization, c.email as coach_email
+            SELECT m.*, mc.coach_id, c.name as coach_name, c.specialization, c.email as coach_email
             FROM members m
             LEFT JOIN member_coach mc ON m.id = mc.member_id
             LEFT JOIN coaches c ON mc.coach_id = c.id
@@ -1739,7 +1821,7 @@ async def get_member_dashboard(request: Request):
         """, (user["id"],))
         recent_sessions = cursor.fetchall()
         
-        return {
+        body = encode_json({
             "member": member,
             "stats": {
                 **stats,
@@ -1752,9 +1834,12 @@ async def get_member_dashboard(request: Request):
                 "email": member["coach_email"]
             } if member["coach_name"] else None,
             "recent_sessions": recent_sessions
-        }
+        })
+        response_cache.put("member_dashboard", user["id"], body,
+                           cache_events.member_dashboard_tags(user["id"], member["coach_id"]), token)
+        return cached_json_response(body, hit=False)
     except Exception as e:
-        print(f"Error getting member dashboard: {str(e)}")
+        logger.error("Error getting member dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1823,23 +1908,23 @@ async def get_gym_sessions(
         # Add order by
         query += " ORDER BY s.session_date DESC, s.session_time DESC"
         
-        print(f"Executing query: {query}")  # Debug log
-        print(f"With params: {params}")  # Debug log
+        logger.debug("Executing query: %s", query)
+        logger.debug("With params: %s", params)
         
         cursor.execute(query, params)
         sessions = cursor.fetchall()
         
-        print(f"Found {len(sessions)} sessions")  # Debug log
+        logger.debug("Found %s sessions", len(sessions))
         
         # Format the response
         formatted_sessions = []
         for session in sessions:
             try:
-                print(f"Processing session: {session}")  # Debug log
+                logger.debug("Processing session: %s", session)
                 
                 # Ensure all required fields are present
                 if not all(key in session for key in ['id', 'member_id', 'coach_id', 'session_date', 'session_time', 'duration', 'status', 'notes']):
-                    print(f"Missing required fields in session: {session}")
+                    logger.warning("Missing required fields in session: %s", session)
                     continue
                 
                 # Parse the workout notes to get exercise list
@@ -1854,7 +1939,7 @@ async def get_gym_sessions(
                             workout_type = lines[0].replace(' Workout:', '') if lines else "Custom"
                         exercises = [line.strip() for line in lines[1:] if line.strip()]
                     except Exception as e:
-                        print(f"Error parsing notes: {str(e)}")
+                        logger.error("Error parsing notes: %s", e)
                 
                 # Create formatted session with explicit type conversion
                 formatted_session = {
@@ -1884,17 +1969,17 @@ async def get_gym_sessions(
                 if all(formatted_session.values()):
                     formatted_sessions.append(formatted_session)
                 else:
-                    print(f"Invalid formatted session: {formatted_session}")
+                    logger.warning("Invalid formatted session: %s", formatted_session)
                 
             except Exception as e:
-                print(f"Error formatting session: {str(e)}")
+                logger.error("Error formatting session: %s", e)
                 continue
         
-        print(f"Returning {len(formatted_sessions)} formatted sessions")  # Debug log
+        logger.debug("Returning %s formatted sessions", len(formatted_sessions))
         return formatted_sessions
         
     except Exception as e:
-        print(f"Error getting gym sessions: {str(e)}")
+        logger.error("Error getting gym sessions: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -1978,7 +2063,7 @@ async def get_gym_coaches(
         return formatted_coaches
         
     except Exception as e:
-        print(f"Error getting gym coaches: {str(e)}")
+        logger.error("Error getting gym coaches: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2061,7 +2146,7 @@ async def get_gym_members(request: Request, search: str = None, membership_type:
         
         return formatted_members
     except Exception as e:
-        print(f"Error getting gym members: {str(e)}")
+        logger.error("Error getting gym members: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2136,6 +2221,7 @@ async def add_gym_member(request: Request):
             ))
             
             member_id = cursor.lastrowid
+            gym_stats.member_added(cursor, member_id)
             
             # If coach_id is provided, assign member to coach
             if "coach_id" in data:
@@ -2163,6 +2249,9 @@ async def add_gym_member(request: Request):
             ))
             
             conn.commit()
+            cache_events.member_written(user["id"], member_id)
+            if "coach_id" in data:
+                cache_events.assignment_written(member_id, data["coach_id"])
             
             # Get the newly created member with additional details
             cursor.execute("""
@@ -2207,7 +2296,7 @@ async def add_gym_member(request: Request):
             raise he
         except Exception as e:
             conn.rollback()
-            print(f"Error adding member: {str(e)}")
+            logger.error("Error adding member: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
         finally:
             cursor.close()
@@ -2216,7 +2305,7 @@ async def add_gym_member(request: Request):
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/gym/sessions")
@@ -2287,6 +2376,7 @@ async def create_session(request: Request):
             ))
             
             session_id = cursor.lastrowid
+            gym_stats.session_added(cursor, session_id)
             
             # Create payment record for the session
             session_price = 25.00  # Base price for a session
@@ -2313,6 +2403,7 @@ async def create_session(request: Request):
             ))
             
             conn.commit()
+            cache_events.sessions_written(user["id"], data["coach_id"], data["member_id"])
             
             # Get the created session with details
             cursor.execute("""
@@ -2363,7 +2454,7 @@ async def create_session(request: Request):
             raise he
         except Exception as e:
             conn.rollback()
-            print(f"Error creating session: {str(e)}")
+            logger.error("Error creating session: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
         finally:
             cursor.close()
@@ -2372,7 +2463,7 @@ async def create_session(request: Request):
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/gym/members/{member_id}/renew-membership")
@@ -2439,7 +2530,7 @@ async def renew_membership(member_id: int, request: Request):
         raise he
     except Exception as e:
         conn.rollback()
-        print(f"Error renewing membership: {str(e)}")
+        logger.error("Error renewing membership: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2476,7 +2567,7 @@ async def get_coach_dashboard_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting coach dashboard: {str(e)}")
+        logger.error("Error getting coach dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2488,6 +2579,12 @@ async def get_coach_dashboard(request: Request):
     if not user or user["user_type"] != "coach":
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    # Many coach pages fetch this just for the coach's name
+    cached = response_cache.get("coach_dashboard", user["id"])
+    if cached is not None:
+        return cached_json_response(cached, hit=True)
+    token = response_cache.begin()
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -2543,16 +2640,7 @@ async def get_coach_dashboard(request: Request):
         formatted_sessions = []
         for session in recent_sessions:
             # Parse the workout notes to get exercise list
-            exercises = []
-            workout_type = "Custom"
-            if session["notes"]:
-                try:
-                    lines = session["notes"].split("\n")
-                    if lines and "Workout Type:" in lines[0]:
-                        workout_type = lines[0].split("Workout Type:")[1].strip()
-                    exercises = [line.strip() for line in lines[1:] if line.strip() and line.strip()[0].isdigit()]
-                except Exception as e:
-                    print(f"Error parsing notes: {str(e)}")
+            workout_type, exercises = parse_workout_notes(session["notes"])
             
             formatted_session = {
                 "id": session["id"],
@@ -2572,7 +2660,7 @@ async def get_coach_dashboard(request: Request):
             }
             formatted_sessions.append(formatted_session)
         
-        return {
+        body = encode_json({
             "coach": {
                 "id": coach["id"],
                 "name": coach["name"],
@@ -2589,9 +2677,13 @@ async def get_coach_dashboard(request: Request):
                 "performance_rating": performance_rating
             },
             "recent_sessions": formatted_sessions
-        }
+        })
+        tags = cache_events.coach_dashboard_tags(
+            user["id"], coach["gym_id"], [session["member_id"] for session in recent_sessions])
+        response_cache.put("coach_dashboard", user["id"], body, tags, token)
+        return cached_json_response(body, hit=False)
     except Exception as e:
-        print(f"Error getting coach dashboard: {str(e)}")
+        logger.error("Error getting coach dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2628,7 +2720,7 @@ async def get_coach_schedule_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting coach schedule page: {str(e)}")
+        logger.error("Error getting coach schedule page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2665,7 +2757,7 @@ async def get_coach_members_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting coach members page: {str(e)}")
+        logger.error("Error getting coach members page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2702,7 +2794,7 @@ async def get_coach_sessions_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting coach sessions page: {str(e)}")
+        logger.error("Error getting coach sessions page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2739,7 +2831,7 @@ async def get_coach_progress_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting coach progress page: {str(e)}")
+        logger.error("Error getting coach progress page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2789,7 +2881,7 @@ async def get_coach_member_details_page(request: Request, member_id: int):
             }
         )
     except Exception as e:
-        print(f"Error getting member details: {str(e)}")
+        logger.error("Error getting member details: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -2880,9 +2972,7 @@ async def get_coach_member_details(member_id: int, current_user: dict = Depends(
             "recent_sessions": formatted_sessions
         }
     except Exception as e:
-        print(f"Error in get_coach_member_details: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in get_coach_member_details: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving member details")
     finally:
         if cursor:
@@ -2897,7 +2987,8 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user_de
     return current_user
 
 @app.get("/logout")
-async def logout():
+async def logout(request: Request):
+    session_store.delete(request.cookies.get("session_id"))
     response = RedirectResponse(url="/")
     response.delete_cookie("session_id")
     return response
@@ -2986,6 +3077,7 @@ async def create_coach_session(
             ))
             
             session_id = cursor.lastrowid
+            gym_stats.session_added(cursor, session_id)
             
             # Get the created session with details
             cursor.execute("""
@@ -3003,6 +3095,7 @@ async def create_coach_session(
             new_session = cursor.fetchone()
             
             conn.commit()
+            cache_events.sessions_written(new_session["gym_id"], current_user["id"], data["member_id"])
             
             return {
                 "message": "Session created successfully",
@@ -3026,7 +3119,7 @@ async def create_coach_session(
             raise he
         except Exception as e:
             conn.rollback()
-            print(f"Error creating session: {str(e)}")
+            logger.error("Error creating session: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
         finally:
             cursor.close()
@@ -3035,7 +3128,7 @@ async def create_coach_session(
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/coach/schedule")
@@ -3149,7 +3242,7 @@ async def get_coach_schedule(
             "weekly_availability": formatted_free_days
         })
     except Exception as e:
-        print(f"Error in get_coach_schedule: {str(e)}")
+        logger.error("Error in get_coach_schedule: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving schedule")
 
 @app.get("/coach/members/{member_id}/add-session", response_class=HTMLResponse)
@@ -3196,7 +3289,7 @@ async def get_add_session_page(request: Request, member_id: int):
             }
         )
     except Exception as e:
-        print(f"Error getting add session page: {str(e)}")
+        logger.error("Error getting add session page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -3234,7 +3327,7 @@ async def get_member_schedule_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting member schedule page: {str(e)}")
+        logger.error("Error getting member schedule page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -3283,16 +3376,7 @@ async def get_member_schedule(
         formatted_sessions = []
         for session in sessions:
             # Parse workout notes
-            workout_type = "Custom"
-            exercises = []
-            if session["notes"]:
-                try:
-                    lines = session["notes"].split("\n")
-                    if lines and "Workout Type:" in lines[0]:
-                        workout_type = lines[0].split("Workout Type:")[1].strip()
-                    exercises = [line.strip() for line in lines[1:] if line.strip() and line.strip()[0].isdigit()]
-                except:
-                    pass
+            workout_type, exercises = parse_workout_notes(session["notes"])
             
             formatted_sessions.append({
                 "id": session["id"],
@@ -3376,7 +3460,7 @@ async def get_member_schedule(
             "coach": coach_data
         })
     except Exception as e:
-        print(f"Error in get_member_schedule: {str(e)}")
+        logger.error("Error in get_member_schedule: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving schedule")
 
 @app.get("/member/progress", response_class=HTMLResponse)
@@ -3411,7 +3495,7 @@ async def get_member_progress_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting member progress page: {str(e)}")
+        logger.error("Error getting member progress page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -3562,7 +3646,7 @@ async def get_member_progress_data(current_user: dict = Depends(get_current_user
         }
         
     except Exception as e:
-        print(f"Error in get_member_progress_data: {str(e)}")
+        logger.error("Error in get_member_progress_data: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving progress data")
 
 @app.get("/gym/reports", response_class=HTMLResponse)
@@ -3591,7 +3675,7 @@ async def get_gym_reports_page(request: Request):
             }
         )
     except Exception as e:
-        print(f"Error getting gym reports page: {str(e)}")
+        logger.error("Error getting gym reports page: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -3604,79 +3688,13 @@ async def get_gym_reports(request: Request):
     if not user or user["user_type"] != "gym":
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Get membership statistics
-        cursor.execute("""
-            SELECT 
-                membership_type,
-                COUNT(*) as count,
-                SUM(CASE WHEN join_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY) THEN 1 ELSE 0 END) as new_members
-            FROM members 
-            WHERE gym_id = %s
-            GROUP BY membership_type
-        """, (user["id"],))
-        membership_stats = cursor.fetchall()
-        
-        # Get session statistics
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_sessions,
-                SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_sessions,
-                SUM(CASE WHEN status = 'Cancelled' THEN 1 ELSE 0 END) as cancelled_sessions,
-                COUNT(DISTINCT member_id) as active_members,
-                COUNT(DISTINCT coach_id) as active_coaches
-            FROM sessions 
-            WHERE gym_id = %s
-            AND session_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-        """, (user["id"],))
-        session_stats = cursor.fetchone()
-        
-        # Get revenue statistics - total monthly revenue from all active members
-        cursor.execute("""
-            SELECT 
-                SUM(CASE 
-                    WHEN membership_type = 'Basic' THEN 50.00
-                    WHEN membership_type = 'Premium' THEN 100.00
-                    WHEN membership_type = 'VIP' THEN 150.00
-                END) as monthly_revenue,
-                COUNT(CASE WHEN membership_type = 'Basic' THEN 1 END) as basic_members,
-                COUNT(CASE WHEN membership_type = 'Premium' THEN 1 END) as premium_members,
-                COUNT(CASE WHEN membership_type = 'VIP' THEN 1 END) as vip_members
-            FROM members 
-            WHERE gym_id = %s
-        """, (user["id"],))
-        revenue_stats = cursor.fetchone()
-        
-        # Get coach performance
-        cursor.execute("""
-            SELECT 
-                c.name as coach_name,
-                COUNT(s.id) as total_sessions,
-                SUM(CASE WHEN s.status = 'Completed' THEN 1 ELSE 0 END) as completed_sessions,
-                COUNT(DISTINCT s.member_id) as unique_members
-            FROM coaches c
-            LEFT JOIN sessions s ON c.id = s.coach_id
-            WHERE c.gym_id = %s
-            AND (s.session_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY) OR s.session_date IS NULL)
-            GROUP BY c.id, c.name
-        """, (user["id"],))
-        coach_stats = cursor.fetchall()
-        
-        return {
-            "membership_stats": membership_stats,
-            "session_stats": session_stats,
-            "revenue_stats": revenue_stats,
-            "coach_stats": coach_stats
-        }
+        # Membership, session, revenue and coach figures come from the
+        # precomputed per-day counters in gym_stats.py
+        return gym_stats.report_stats(user["id"])
     except Exception as e:
-        print(f"Error getting gym reports: {str(e)}")
+        logger.error("Error getting gym reports: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
 
 # Helper to get contacts for messaging
 
@@ -3722,7 +3740,7 @@ def get_message_contacts(user):
             if coach:
                 contacts.append(coach)
     except Exception as e:
-        print(f"Error getting message contacts: {str(e)}")
+        logger.error("Error getting message contacts: %s", e)
         return []
     finally:
         cursor.close()
@@ -3755,7 +3773,7 @@ def get_conversation(user, contact_id, contact_type):
         ))
         return cursor.fetchall()
     except Exception as e:
-        print(f"Error getting conversation: {str(e)}")
+        logger.error("Error getting conversation: %s", e)
         return []
     finally:
         cursor.close()
@@ -3808,7 +3826,7 @@ async def coach_send_message(request: Request, contact_id: int = Form(...), cont
             """, (user["id"], user["user_type"], contact_id, contact_type, message.strip()))
             conn.commit()
         except Exception as e:
-            print(f"Error sending message: {str(e)}")
+            logger.error("Error sending message: %s", e)
             return RedirectResponse(url=f"/coach/messages?contact_id={contact_id}&contact_type={contact_type}&error=send_failed", status_code=303)
         finally:
             cursor.close()
@@ -3816,7 +3834,7 @@ async def coach_send_message(request: Request, contact_id: int = Form(...), cont
         
         return RedirectResponse(url=f"/coach/messages?contact_id={contact_id}&contact_type={contact_type}&success=message_sent", status_code=303)
     except Exception as e:
-        print(f"Unexpected error in coach_send_message: {str(e)}")
+        logger.error("Unexpected error in coach_send_message: %s", e)
         return RedirectResponse(url=f"/coach/messages?error=unexpected_error", status_code=303)
 
 # GYM MESSAGES
@@ -3865,7 +3883,7 @@ async def gym_send_message(request: Request, contact_id: int = Form(...), contac
             """, (user["id"], user["user_type"], contact_id, contact_type, message.strip()))
             conn.commit()
         except Exception as e:
-            print(f"Error sending message: {str(e)}")
+            logger.error("Error sending message: %s", e)
             return RedirectResponse(url=f"/gym/messages?contact_id={contact_id}&contact_type={contact_type}&error=send_failed", status_code=303)
         finally:
             cursor.close()
@@ -3873,7 +3891,7 @@ async def gym_send_message(request: Request, contact_id: int = Form(...), contac
         
         return RedirectResponse(url=f"/gym/messages?contact_id={contact_id}&contact_type={contact_type}&success=message_sent", status_code=303)
     except Exception as e:
-        print(f"Unexpected error in gym_send_message: {str(e)}")
+        logger.error("Unexpected error in gym_send_message: %s", e)
         return RedirectResponse(url=f"/gym/messages?error=unexpected_error", status_code=303)
 
 # MEMBER MESSAGES
@@ -3922,7 +3940,7 @@ async def member_send_message(request: Request, contact_id: int = Form(...), con
             """, (user["id"], user["user_type"], contact_id, contact_type, message.strip()))
             conn.commit()
         except Exception as e:
-            print(f"Error sending message: {str(e)}")
+            logger.error("Error sending message: %s", e)
             return RedirectResponse(url=f"/member/messages?contact_id={contact_id}&contact_type={contact_type}&error=send_failed", status_code=303)
         finally:
             cursor.close()
@@ -3930,7 +3948,7 @@ async def member_send_message(request: Request, contact_id: int = Form(...), con
         
         return RedirectResponse(url=f"/member/messages?contact_id={contact_id}&contact_type={contact_type}&success=message_sent", status_code=303)
     except Exception as e:
-        print(f"Unexpected error in member_send_message: {str(e)}")
+        logger.error("Unexpected error in member_send_message: %s", e)
         return RedirectResponse(url=f"/member/messages?error=unexpected_error", status_code=303)
 
 # DELETE MESSAGE ENDPOINTS
@@ -3955,7 +3973,7 @@ async def coach_delete_message(request: Request, message_id: int, contact_id: in
         cursor.execute("DELETE FROM messages WHERE id = %s", (message_id,))
         conn.commit()
     except Exception as e:
-        print(f"Error deleting message: {str(e)}")
+        logger.error("Error deleting message: %s", e)
         return RedirectResponse(url=f"/coach/messages?contact_id={contact_id}&contact_type={contact_type}&error=delete_failed", status_code=status.HTTP_303_SEE_OTHER)
     finally:
         cursor.close()
@@ -3983,7 +4001,7 @@ async def gym_delete_message(request: Request, message_id: int, contact_id: int
         cursor.execute("DELETE FROM messages WHERE id = %s", (message_id,))
         conn.commit()
     except Exception as e:
-        print(f"Error deleting message: {str(e)}")
+        logger.error("Error deleting message: %s", e)
         return RedirectResponse(url=f"/gym/messages?contact_id={contact_id}&contact_type={contact_type}&error=delete_failed", status_code=status.HTTP_303_SEE_OTHER)
     finally:
         cursor.close()
@@ -4011,7 +4029,7 @@ async def member_delete_message(request: Request, message_id: int, contact_id: i
         cursor.execute("DELETE FROM messages WHERE id = %s", (message_id,))
         conn.commit()
     except Exception as e:
-        print(f"Error deleting message: {str(e)}")
+        logger.error("Error deleting message: %s", e)
         return RedirectResponse(url=f"/member/messages?contact_id={contact_id}&contact_type={contact_type}&error=delete_failed", status_code=status.HTTP_303_SEE_OTHER)
     finally:
         cursor.close()
@@ -4142,7 +4160,7 @@ async def get_user_preferences(current_user: dict = Depends(get_current_user_dep
         }
         
     except Exception as e:
-        print(f"Error getting preferences: {str(e)}")
+        logger.error("Error getting preferences: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get preferences")
     finally:
         if connection:
@@ -4206,7 +4224,7 @@ async def update_user_preferences(request: Request, current_user: dict = Depends
         return {"message": "Preferences updated successfully"}
         
     except Exception as e:
-        print(f"Error updating preferences: {str(e)}")
+        logger.error("Error updating preferences: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update preferences")
     finally:
         if connection:
@@ -4277,9 +4295,7 @@ async def get_member_preferences(member_id: int, current_user: dict = Depends(ge
         }
         
     except Exception as e:
-        print(f"Error getting member preferences: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error getting member preferences: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get member preferences")
     finally:
         if cursor:
@@ -4320,7 +4336,7 @@ async def get_coach_member_sessions(
         """, (member_id,))
         
         count_result = cursor.fetchone()
-        print(f"Debug: count_result = {count_result}, type = {type(count_result)}")
+        logger.debug("count_result = %s, type = %s", count_result, type(count_result))
         
         try:
             if count_result is None:
@@ -4332,7 +4348,7 @@ async def get_coach_member_sessions(
                 # Handle tuple/list result
                 total_sessions = int(count_result[0]) if count_result[0] is not None else 0
         except (IndexError, TypeError, ValueError) as e:
-            print(f"Error parsing count_result: {e}")
+            logger.error("Error parsing count_result: %s", e)
             total_sessions = 0
         
         # Calculate offset
@@ -4419,9 +4435,7 @@ async def get_coach_member_sessions(
         }
         
     except Exception as e:
-        print(f"Error getting member sessions: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error getting member sessions: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get member sessions")
     finally:
         if cursor:
@@ -4454,7 +4468,7 @@ async def get_member_coach_info(current_user: dict = Depends(get_current_user_de
         }
         
     except Exception as e:
-        print(f"Error getting member coach: {str(e)}")
+        logger.error("Error getting member coach: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get coach information")
     finally:
         if connection:
@@ -4506,7 +4520,7 @@ async def get_coach_preferences(coach_id: int, current_user: dict = Depends(get_
         }
         
     except Exception as e:
-        print(f"Error getting coach preferences: {str(e)}")
+        logger.error("Error getting coach preferences: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get coach preferences")
     finally:
         if connection:
@@ -4566,7 +4580,7 @@ async def get_all_members_for_coach(
         }
         
     except Exception as e:
-        print(f"Error getting all members: {str(e)}")
+        logger.error("Error getting all members: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get members")
     finally:
         if connection:
@@ -4623,7 +4637,7 @@ async def get_all_coaches_for_member(
         }
         
     except Exception as e:
-        print(f"Error getting all coaches: {str(e)}")
+        logger.error("Error getting all coaches: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get coaches")
     finally:
         if connection:
@@ -4650,8 +4664,6 @@ async def get_bulk_availability(
         if not user_id_list:
             return {"availability": {}}
 
-        user_ids_str = ','.join(['%s'] * len(user_id_list))
-
         connection = get_db_connection()
         cursor = connection.cursor()
 
@@ -4660,40 +4672,24 @@ async def get_bulk_availability(
         if not end_date:
             end_date = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
 
-        query = f"""
-            SELECT user_id, date, hour, is_available
-            FROM availability_slots
-            WHERE user_id IN ({user_ids_str}) AND user_type = %s AND date BETWEEN %s AND %s
-            ORDER BY user_id, date, hour
-        """
-        params = user_id_list + [current_user.get('user_type'), start_date, end_date]
-        cursor.execute(query, params)
-        slots = cursor.fetchall()
-
-        availability = {}
-        for slot in slots:
-            user_id = slot['user_id']
-            date_str = slot['date'].strftime('%Y-%m-%d') if hasattr(slot['date'], 'strftime') else str(slot['date'])
-            if user_id not in availability:
-                availability[user_id] = {}
-            if date_str not in availability[user_id]:
-                availability[user_id][date_str] = {}
-            availability[user_id][date_str][slot['hour']] = slot['is_available']
-
-        for user_id in user_id_list:
-            if user_id not in availability:
-                availability[user_id] = {}
+        # One row per user and day (availability.py) instead of one per hour
+        days = availability.load_days(cursor, user_id_list, current_user.get('user_type'), start_date, end_date)
+        user_availability = {
+            user_id: {
+                day.strftime('%Y-%m-%d'): availability.day_view(masks)
+                for day, masks in days.get(user_id, {}).items()
+            }
+            for user_id in user_id_list
+        }
 
         return {
-            'availability': availability,
+            'availability': user_availability,
             'start_date': start_date,
             'end_date': end_date
         }
 
     except Exception as e:
-        print(f"Error getting bulk availability: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error getting bulk availability: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get bulk availability")
     finally:
         if connection:
@@ -4720,32 +4716,20 @@ async def get_user_availability(
         if not end_date:
             end_date = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
         
-        # Get availability slots for the date range
-        cursor.execute("""
-            SELECT date, hour, is_available
-            FROM availability_slots
-            WHERE user_id = %s AND user_type = %s AND date BETWEEN %s AND %s
-            ORDER BY date, hour
-        """, (user_id, current_user.get('user_type'), start_date, end_date))
-        
-        slots = cursor.fetchall()
-        
-        # Convert to a more usable format
-        availability = {}
-        for slot in slots:
-            date_str = slot['date'].strftime('%Y-%m-%d')
-            if date_str not in availability:
-                availability[date_str] = {}
-            availability[date_str][slot['hour']] = slot['is_available']
+        # Get availability masks for the date range
+        days = availability.load_days(cursor, [user_id], current_user.get('user_type'), start_date, end_date)
         
         return {
-            'availability': availability,
+            'availability': {
+                day.strftime('%Y-%m-%d'): availability.day_view(masks)
+                for day, masks in days.get(user_id, {}).items()
+            },
             'start_date': start_date,
             'end_date': end_date
         }
         
     except Exception as e:
-        print(f"Error getting user availability: {str(e)}")
+        logger.error("Error getting user availability: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get availability")
     finally:
         if connection:
@@ -4772,19 +4756,16 @@ async def update_user_availability(
         connection = get_db_connection()
         cursor = connection.cursor()
         
-        # Insert or update availability slot
-        cursor.execute("""
-            INSERT INTO availability_slots (user_id, user_type, date, hour, is_available)
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE is_available = VALUES(is_available)
-        """, (current_user.get('id'), current_user.get('user_type'), date, hour, is_available))
+        # Insert or update the hour's entry
+        availability.set_hours(cursor, current_user.get('id'), current_user.get('user_type'), [date],
+                               availability.hours_mask(int(hour), int(hour)), is_available)
         
         connection.commit()
         
         return {"status": "success", "message": "Availability updated successfully"}
         
     except Exception as e:
-        print(f"Error updating user availability: {str(e)}")
+        logger.error("Error updating user availability: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update availability")
     finally:
         if connection:
@@ -4804,18 +4785,16 @@ async def delete_user_availability(
         connection = get_db_connection()
         cursor = connection.cursor()
         
-        # Delete the availability slot (will default to available)
-        cursor.execute("""
-            DELETE FROM availability_slots
-            WHERE user_id = %s AND user_type = %s AND date = %s AND hour = %s
-        """, (current_user.get('id'), current_user.get('user_type'), date, hour))
+        # Remove the hour's entry (will default to available)
+        availability.clear_hours(cursor, current_user.get('id'), current_user.get('user_type'), date,
+                                 availability.hours_mask(hour, hour))
         
         connection.commit()
         
         return {"status": "success", "message": "Availability slot deleted successfully"}
         
     except Exception as e:
-        print(f"Error deleting user availability: {str(e)}")
+        logger.error("Error deleting user availability: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete availability")
     finally:
         if connection:
@@ -4833,7 +4812,7 @@ async def get_user_availability_calendar(
         raise HTTPException(status_code=401, detail="Not authorized")
     
     try:
-        print(f"Calendar request - user_id: {user_id}, current_user: {current_user}")
+        logger.debug("Calendar request - user_id: %s, current_user: %s", user_id, current_user)
         
         if year is None:
             year = datetime.now().year
@@ -4850,24 +4829,15 @@ async def get_user_availability_calendar(
         start_date = first_day.date()
         end_date = last_day.date()
         
-        print(f"Date range: {start_date} to {end_date}")
+        logger.debug("Date range: %s to %s", start_date, end_date)
         
         connection = get_db_connection()
         cursor = connection.cursor()
         
-        # Get availability slots for the month
-        query = """
-            SELECT date, hour, is_available
-            FROM availability_slots
-            WHERE user_id = %s AND user_type = %s AND date BETWEEN %s AND %s
-            ORDER BY date, hour
-        """
-        params = (user_id, current_user.get('user_type'), start_date, end_date)
-        print(f"Executing query: {query} with params: {params}")
-        
-        cursor.execute(query, params)
-        slots = cursor.fetchall()
-        print(f"Found {len(slots)} availability slots")
+        # Get availability masks for the month (one row per day with entries)
+        days = availability.load_days(cursor, [user_id], current_user.get('user_type'), start_date, end_date)
+        days = days.get(user_id, {})
+        logger.debug("Found availability entries on %s days", len(days))
         
         # Organize data by date
         calendar_data = {}
@@ -4884,11 +4854,10 @@ async def get_user_availability_calendar(
             current_date += timedelta(days=1)
         
         # Fill in availability data
-        for slot in slots:
-            date_str = slot['date'].strftime('%Y-%m-%d') if hasattr(slot['date'], 'strftime') else str(slot['date'])
-            hour = slot['hour']
+        for day, masks in days.items():
+            date_str = day.strftime('%Y-%m-%d')
             if date_str in calendar_data:
-                calendar_data[date_str]['slots'][hour] = slot['is_available']
+                calendar_data[date_str]['slots'] = availability.day_view(masks)
         
         # Convert to list and sort by date
         calendar_list = list(calendar_data.values())
@@ -4901,13 +4870,11 @@ async def get_user_availability_calendar(
             'calendar': calendar_list
         }
         
-        print(f"Returning calendar data: {result}")
+        logger.debug("Returning calendar data: %s", result)
         return result
         
     except Exception as e:
-        print(f"Error getting user availability calendar: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error getting user availability calendar: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get availability calendar")
     finally:
         if connection:
@@ -4936,41 +4903,138 @@ async def update_user_availability_bulk(
         connection = get_db_connection()
         cursor = connection.cursor()
         
-        # Convert dates to datetime objects for iteration
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-        
-        # Generate all date-hour combinations
-        current_dt = start_dt
-        while current_dt <= end_dt:
-            current_date = current_dt.strftime('%Y-%m-%d')
-            
-            # Generate all hours in the range
-            for hour in range(start_hour, end_hour + 1):
-                cursor.execute("""
-                    INSERT INTO availability_slots (user_id, user_type, date, hour, is_available)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE is_available = VALUES(is_available)
-                """, (current_user.get('id'), current_user.get('user_type'), current_date, hour, is_available))
-            
-            current_dt += timedelta(days=1)
+        # Every date gets the same hour mask, written as one multi-row upsert
+        dates = availability.date_range(datetime.strptime(start_date, '%Y-%m-%d').date(),
+                                        datetime.strptime(end_date, '%Y-%m-%d').date())
+        availability.set_hours(cursor, current_user.get('id'), current_user.get('user_type'), dates,
+                               availability.hours_mask(start_hour, end_hour), is_available)
         
         connection.commit()
         
         return {"status": "success", "message": "Bulk availability updated successfully"}
         
     except Exception as e:
-        print(f"Error updating bulk user availability: {str(e)}")
+        logger.error("Error updating bulk user availability: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update bulk availability")
     finally:
         if connection:
             connection.close()
-# Load model once at startup for classifier endpoint
-image_processor = AutoImageProcessor.from_pretrained("prithivMLmods/Gym-Workout-Classifier-SigLIP2")
-model = SiglipForImageClassification.from_pretrained("prithivMLmods/Gym-Workout-Classifier-SigLIP2")
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = model.to(device)
+
+@app.get("/api/coach/availability/overlap")
+async def get_coach_availability_overlap(
+    start_date: str = Query(None, description="Start date (YYYY-MM-DD), default today"),
+    end_date: str = Query(None, description="End date (YYYY-MM-DD), default a week after start"),
+    mode: str = Query("members", description="members: rank members by shared hours; windows: rank the coach's free hours"),
+    start_hour: int = Query(0, ge=0, le=23),
+    end_hour: int = Query(23, ge=0, le=23),
+    member_ids: str = Query(None, description="Comma-separated member IDs (default all assigned members)"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=500),
+    current_user: dict = Depends(get_current_user_dependency)
+):
+    """Rank assigned members (or the coach's free hours) by shared availability"""
+    if not current_user or current_user.get('user_type') != 'coach':
+        raise HTTPException(status_code=401, detail="Not authorized")
+    if mode not in ('members', 'windows'):
+        raise HTTPException(status_code=400, detail="mode must be 'members' or 'windows'")
+
+    try:
+        first = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else datetime.now().date()
+        last = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else first + timedelta(days=6)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if last < first or (last - first).days >= availability.OVERLAP_MAX_DAYS:
+        raise HTTPException(status_code=400,
+                            detail=f"Date range must cover 1 to {availability.OVERLAP_MAX_DAYS} days")
+
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        coach_id = current_user.get('id')
+
+        cursor.execute("""
+            SELECT m.id, m.name
+            FROM member_coach mc
+            JOIN members m ON m.id = mc.member_id
+            WHERE mc.coach_id = %s
+        """, (coach_id,))
+        names = {row['id']: row['name'] for row in cursor.fetchall()}
+        if member_ids:
+            wanted = {int(uid) for uid in member_ids.split(',') if uid.strip().isdigit()}
+            names = {member_id: name for member_id, name in names.items() if member_id in wanted}
+        roster = sorted(names)
+
+        # Two queries per side whatever the roster size: the date masks and the weekly pattern
+        dates = availability.date_range(first, last)
+        window = availability.hours_mask(start_hour, end_hour)
+        coach_days = availability.effective_days(
+            availability.load_days(cursor, [coach_id], 'coach', first, last).get(coach_id, {}),
+            availability.load_week_masks(cursor, [coach_id], 'coach')[coach_id], dates)
+        member_days = availability.load_days(cursor, roster, 'member', first, last)
+        member_weeks = availability.load_week_masks(cursor, roster, 'member')
+        members = {
+            member_id: availability.effective_days(member_days.get(member_id, {}), member_weeks[member_id], dates)
+            for member_id in roster
+        }
+
+        offset = (page - 1) * limit
+        if mode == 'members':
+            ranked = availability.overlap_members(coach_days, members, window)
+            results = [
+                {
+                    'member_id': member_id,
+                    'name': names[member_id],
+                    'shared_hours': shared,
+                    'hours': {
+                        day.strftime('%Y-%m-%d'): availability.mask_hours(coach_day & member_day & window)
+                        for day, coach_day, member_day in zip(dates, coach_days, members[member_id])
+                        if coach_day & member_day & window
+                    }
+                }
+                for member_id, shared in ranked[offset:offset + limit]
+            ]
+        else:
+            ranked = availability.overlap_windows(coach_days, members, window)
+            results = [
+                {
+                    'date': dates[index].strftime('%Y-%m-%d'),
+                    'hour': hour,
+                    'member_count': len(free),
+                    'member_ids': free
+                }
+                for index, hour, free in ranked[offset:offset + limit]
+            ]
+
+        return {
+            'mode': mode,
+            'start_date': first.strftime('%Y-%m-%d'),
+            'end_date': last.strftime('%Y-%m-%d'),
+            'results': results,
+            'total': len(ranked),
+            'page': page,
+            'limit': limit,
+            'has_more': offset + limit < len(ranked),
+            'total_pages': (len(ranked) + limit - 1) // limit
+        }
+
+    except Exception as e:
+        logger.exception("Error computing availability overlap: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to compute availability overlap")
+    finally:
+        if connection:
+            connection.close()
+
+@app.on_event("shutdown")
+async def stop_workout_batcher():
+    workout_batcher.stop()
+
+@app.on_event("shutdown")
+async def stop_food_batcher():
+    food_batcher.stop()
+
 @app.post("/api/classify-frame")
+@stay_on_event_loop
 async def classify_frame(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user_dependency)
@@ -4980,21 +5044,137 @@ async def classify_frame(
         raise HTTPException(status_code=403, detail="Members only")
     if current_user.get("membership_type") != "Premium":
         raise HTTPException(status_code=403, detail="Only premium members can use this feature")
-    # Read image bytes
+    # Read image bytes; decoding and inference happen on the batcher thread
     contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    inputs = image_processor(images=rgb_frame, return_tensors="pt").to(device)
-    with torch.no_grad():
-        outputs = model(**inputs)
-    logits = outputs.logits
-    predicted_class_idx = logits.argmax(-1).item()
-    label = model.config.id2label.get(predicted_class_idx, str(predicted_class_idx))
-    score = torch.nn.functional.softmax(logits, dim=-1)[0, predicted_class_idx].item()
-    return {"label": label, "score": score}
+    try:
+        result = await inference_client.classify_workout_frame(contents)
+        return {"label": result["label"], "score": result["score"]}
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Classifier is busy, try again shortly")
+    except InferenceError as e:
+        logger.error("Workout classification failed: %s", e)
+        raise HTTPException(status_code=503, detail="Classifier unavailable")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Streaming classification: one WebSocket per session, binary JPEG frames in,
+# smoothed predictions out. Only the newest frame is classified; frames that
+# arrive while the previous one is still being classified are dropped.
+CLASSIFIER_SMOOTHING_ALPHA = float(os.environ.get("CLASSIFIER_SMOOTHING_ALPHA", "0.4"))
+CLASSIFIER_SESSION_CHECK_SECONDS = float(os.environ.get("CLASSIFIER_SESSION_CHECK_SECONDS", "30"))  # session revalidation
+classifier_streams: Dict[str, WebSocket] = {}
+
+class PredictionSmoother:
+    """Exponential moving average over class probabilities, so one odd frame doesn't flip the label"""
+    def __init__(self, alpha: float = CLASSIFIER_SMOOTHING_ALPHA):
+        self.alpha = alpha
+        self.state = None
+
+    def update(self, probabilities: List[float]) -> Tuple[int, float]:
+        if self.state is None:
+            self.state = list(probabilities)
+        else:
+            self.state = [self.alpha * p + (1 - self.alpha) * s for p, s in zip(probabilities, self.state)]
+        idx = max(range(len(self.state)), key=self.state.__getitem__)
+        return idx, self.state[idx]
+
+@app.websocket("/ws/classify-frame")
+async def classify_frame_stream(websocket: WebSocket):
+    await websocket.accept()
+    current_user = await run_in_db_executor(get_current_user, websocket)
+    session_id = websocket.cookies.get("session_id")
+    # Same checks as /api/classify-frame, reported as close codes
+    if not current_user:
+        await websocket.close(code=4401, reason="Not authenticated")
+        return
+    if current_user.get("user_type") != "member":
+        await websocket.close(code=4403, reason="Members only")
+        return
+    if current_user.get("membership_type") != "Premium":
+        await websocket.close(code=4403, reason="Only premium members can use this feature")
+        return
+
+    # One stream per session: a newer tab or reconnect replaces the old socket
+    previous = classifier_streams.get(session_id)
+    classifier_streams[session_id] = websocket
+    if previous is not None:
+        try:
+            await previous.close(code=4000, reason="Replaced by a newer connection")
+        except Exception:
+            pass
+
+    latest = {"frame": None}
+    counters = {"received": 0, "dropped": 0, "classified": 0}
+    frame_ready = asyncio.Event()
+    smoother = PredictionSmoother()
+
+    async def receive_frames():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            frame = message.get("bytes")
+            if not frame:
+                continue
+            counters["received"] += 1
+            if latest["frame"] is not None:
+                counters["dropped"] += 1
+            latest["frame"] = frame
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    session_checked_at = time.monotonic()
+    try:
+        while True:
+            waiter = asyncio.create_task(frame_ready.wait())
+            done, _ = await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                waiter.cancel()
+                break
+            frame_ready.clear()
+            frame, latest["frame"] = latest["frame"], None
+
+            # Revalidated every CLASSIFIER_SESSION_CHECK_SECONDS, not on every frame
+            if time.monotonic() >= session_checked_at + CLASSIFIER_SESSION_CHECK_SECONDS:
+                if await run_in_db_executor(session_store.get, session_id) is None:
+                    await websocket.close(code=4401, reason="Session expired")
+                    break
+                session_checked_at = time.monotonic()
+
+            try:
+                result = await inference_client.classify_workout_frame(frame)
+            except QueueFullError:
+                counters["dropped"] += 1
+                continue
+            except InferenceError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+            except ValueError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+
+            counters["classified"] += 1
+            idx, score = smoother.update(result["probabilities"])
+            id2label = await inference_client.get_workout_labels()
+            await websocket.send_json({
+                "label": id2label.get(idx, str(idx)),
+                "score": score,
+                "raw_label": result["label"],
+                "raw_score": result["score"],
+                "frames_received": counters["received"],
+                "frames_dropped": counters["dropped"],
+            })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error("Classifier stream error: %s", e)
+    finally:
+        receiver.cancel()
+        if classifier_streams.get(session_id) is websocket:
+            del classifier_streams[session_id]
 
 @app.post("/api/nutrition/classify-food")
+@stay_on_event_loop
 async def classify_food(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user_dependency)
@@ -5010,12 +5190,8 @@ async def classify_food(
         # Read image data
         image_data = await file.read()
         
-        # Load the food classification model if not already loaded
-        if food_model is None:
-            load_food_classification_model()
-        
         # Classify the food
-        classification_result = classify_food_image(image_data)
+        classification_result = await inference_client.classify_food(image_data)
         
         if "error" in classification_result:
             raise HTTPException(status_code=500, detail=classification_result['error'])
@@ -5026,7 +5202,7 @@ async def classify_food(
             confidence = classification_result['top_prediction']['confidence']
             
             # Search USDA database for nutrition
-            nutrition_data = get_food_nutrition_from_usda(detected_food)
+            nutrition_data = await get_food_nutrition_from_usda(detected_food)
             
             if nutrition_data:
                 return {
@@ -5050,7 +5226,7 @@ async def classify_food(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in food classification: {e}")
+        logger.error("Error in food classification: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Add this constant at the top of your file with your actual API key
@@ -5071,12 +5247,8 @@ async def detect_food_type(
         # Read image data
         image_data = await file.read()
         
-        # Load the food classification model if not already loaded
-        if food_model is None:
-            load_food_classification_model()
-        
         # Classify the food
-        classification_result = classify_food_image(image_data)
+        classification_result = await inference_client.classify_food(image_data)
         
         if "error" in classification_result:
             raise HTTPException(status_code=500, detail=classification_result['error'])
@@ -5099,7 +5271,7 @@ async def detect_food_type(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in food type detection: {e}")
+        logger.error("Error in food type detection: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/api/nutrition/detect-food-simple")
@@ -5111,12 +5283,8 @@ async def detect_food_simple(
         # Read image data
         image_data = await file.read()
         
-        # Load the food classification model if not already loaded
-        if food_model is None:
-            load_food_classification_model()
-        
         # Classify the food
-        classification_result = classify_food_image(image_data)
+        classification_result = await inference_client.classify_food(image_data)
         
         if "error" in classification_result:
             raise HTTPException(status_code=500, detail=classification_result['error'])
@@ -5140,10 +5308,11 @@ async def detect_food_simple(
             }
             
     except Exception as e:
-        print(f"Error in simple food detection: {e}")
+        logger.error("Error in simple food detection: %s", e)
         raise HTTPException(status_code=500, detail=f"Detection error: {str(e)}")
 
 @app.post("/api/chat")
+@stay_on_event_loop
 async def chat(request: Request):
     try:
         # Get JSON data from request
@@ -5246,7 +5415,7 @@ async def chat(request: Request):
 
         
         # Make request to OpenRouter API
-        response = requests.post(
+        response = await http_client.post(
             'https://openrouter.ai/api/v1/chat/completions',
             headers=headers,
             json=payload,
@@ -5269,7 +5438,7 @@ async def chat(request: Request):
             
     except HTTPException:
         raise
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Handle network/connection errors
         raise HTTPException(status_code=500, detail=f"Network error: {str(e)}")
     except json.JSONDecodeError as e:
@@ -5465,43 +5634,6 @@ async def chatbot_page():
 </html>
 """
 
-def expand_weekly_availability(free_days):
-    slots = set()
-    for day in free_days:
-        if not day['is_available']:
-            continue
-        # Parse start and end hour
-        start = day['start_time']
-        end = day['end_time']
-        # Handle both string and int (seconds)
-        if isinstance(start, int):
-            start_hour = start // 3600
-        else:
-            start_hour = int(str(start).split(':')[0])
-        if isinstance(end, int):
-            end_hour = end // 3600
-        else:
-            end_hour = int(str(end).split(':')[0])
-        for hour in range(start_hour, end_hour):
-            slots.add((day['day_of_week'], f"{hour:02d}:00"))
-    return slots
-
-def next_occurrence(day_name, hour_str):
-    days_order = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-    today = datetime.now()
-    today_idx = today.weekday()
-    target_idx = days_order.index(day_name)
-    hour, minute = map(int, hour_str.split(':'))
-    # Compute the next date for this day/hour
-    days_ahead = (target_idx - today_idx + 7) % 7
-    candidate_date = today.date() + timedelta(days=days_ahead)
-    candidate_dt = datetime.combine(candidate_date, dt_time(hour, minute))
-    # If it's today and hour is in the past, skip to next week
-    if candidate_dt <= today:
-        candidate_date = candidate_date + timedelta(days=7)
-        candidate_dt = datetime.combine(candidate_date, dt_time(hour, minute))
-    return candidate_dt
-
 @app.post("/api/coach/assign_best_workout")
 async def assign_best_workout_api(
     coach_id: int = Body(...),
@@ -5509,20 +5641,25 @@ async def assign_best_workout_api(
     workout_type: str = Body(...),
     duration: int = Body(...),
     exercises: List[str] = Body([]),
-    notes: str = Body("")
+    notes: str = Body(""),
+    horizon_weeks: int = Body(SCHEDULING_HORIZON_WEEKS),
+    step_minutes: int = Body(60)
 ):
+    if duration <= 0:
+        raise HTTPException(status_code=400, detail="Duration must be positive")
+    if not 1 <= horizon_weeks <= SCHEDULING_MAX_HORIZON_WEEKS:
+        raise HTTPException(status_code=400, detail=f"horizon_weeks must be between 1 and {SCHEDULING_MAX_HORIZON_WEEKS}")
+    if not 5 <= step_minutes <= 240:
+        raise HTTPException(status_code=400, detail="step_minutes must be between 5 and 240")
+
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # Get coach weekly availability
+        # Get coach and member weekly availability
         cursor.execute("SELECT * FROM free_days WHERE user_id = %s AND user_type = 'coach'", (coach_id,))
         coach_free_days = cursor.fetchall()
-        coach_slots = expand_weekly_availability(coach_free_days)
-
-        # Get member weekly availability
         cursor.execute("SELECT * FROM free_days WHERE user_id = %s AND user_type = 'member'", (member_id,))
         member_free_days = cursor.fetchall()
-        member_slots = expand_weekly_availability(member_free_days)
 
         # Get coach preferred time slots
         cursor.execute("SELECT preferred_time_slots FROM user_preferences WHERE user_id = %s AND user_type = 'coach'", (coach_id,))
@@ -5538,206 +5675,211 @@ async def assign_best_workout_api(
         if member_pref and member_pref['preferred_time_slots']:
             member_preferred_times = json.loads(member_pref['preferred_time_slots'])
 
-        # Get existing sessions for coach (to avoid conflicts)
+        # Existing sessions inside the search horizon (to avoid conflicts)
+        horizon_days = horizon_weeks * 7
         cursor.execute("""
             SELECT session_date, session_time, duration 
             FROM sessions 
             WHERE coach_id = %s 
-            AND session_date >= CURDATE() 
+            AND session_date BETWEEN CURDATE() AND DATE_ADD(CURDATE(), INTERVAL %s DAY)
             AND status != 'Cancelled'
-        """, (coach_id,))
+        """, (coach_id, horizon_days))
         coach_sessions = cursor.fetchall()
-
-        # Get existing sessions for member (to avoid conflicts)
         cursor.execute("""
             SELECT session_date, session_time, duration 
             FROM sessions 
             WHERE member_id = %s 
-            AND session_date >= CURDATE() 
+            AND session_date BETWEEN CURDATE() AND DATE_ADD(CURDATE(), INTERVAL %s DAY)
             AND status != 'Cancelled'
-        """, (member_id,))
+        """, (member_id, horizon_days))
         member_sessions = cursor.fetchall()
 
-        # Create sets of unavailable slots for coach and member
-        coach_unavailable = set()
-        member_unavailable = set()
-
-        # Add coach's existing sessions to unavailable slots
-        for session in coach_sessions:
-            # Convert timedelta to time object if needed
-            session_time = session['session_time']
-            if isinstance(session_time, timedelta):
-                # Convert timedelta to time object
-                total_seconds = int(session_time.total_seconds())
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                seconds = total_seconds % 60
-                session_time = dt_time(hours, minutes, seconds)
-            
-            session_datetime = datetime.combine(session['session_date'], session_time)
-            session_duration = session['duration']
-            
-            # Block the session hour and adjacent hours based on duration
-            hours_to_block = max(1, (session_duration + 59) // 60)  # Round up to nearest hour
-            for i in range(hours_to_block):
-                blocked_datetime = session_datetime + timedelta(hours=i)
-                day_name = blocked_datetime.strftime('%A')
-                hour = blocked_datetime.hour
-                coach_unavailable.add((day_name, hour))
-
-        # Add member's existing sessions to unavailable slots
-        for session in member_sessions:
-            # Convert timedelta to time object if needed
-            session_time = session['session_time']
-            if isinstance(session_time, timedelta):
-                # Convert timedelta to time object
-                total_seconds = int(session_time.total_seconds())
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                seconds = total_seconds % 60
-                session_time = dt_time(hours, minutes, seconds)
-            
-            session_datetime = datetime.combine(session['session_date'], session_time)
-            session_duration = session['duration']
-            
-            # Block the session hour and adjacent hours based on duration
-            hours_to_block = max(1, (session_duration + 59) // 60)  # Round up to nearest hour
-            for i in range(hours_to_block):
-                blocked_datetime = session_datetime + timedelta(hours=i)
-                day_name = blocked_datetime.strftime('%A')
-                hour = blocked_datetime.hour
-                member_unavailable.add((day_name, hour))
-
-        # Remove unavailable slots from available slots
-        coach_available_slots = coach_slots - coach_unavailable
-        member_available_slots = member_slots - member_unavailable
-
-        # Find intersection of available slots
-        overlap = coach_available_slots & member_available_slots
-
-        if not overlap:
+        # Busy time is indexed once; each candidate is a binary search (scheduling.py)
+        best_matches = scheduling.best_slots(
+            coach_free_days, member_free_days, coach_sessions, member_sessions, duration,
+            coach_preferred_times, member_preferred_times, horizon_weeks=horizon_weeks, step=step_minutes,
+        )
+        if not best_matches:
             return {"success": False, "message": "This workout cannot be assigned — no matching time slot found after considering existing sessions."}
 
-        # Prioritize slots based on preferences
-        # 1. Both coach and member prefer this time
-        both_preferred = set()
-        # 2. Only coach prefers this time
-        coach_only_preferred = set()
-        # 3. Only member prefers this time
-        member_only_preferred = set()
-        # 4. Neither prefers this time (but both are available)
-        no_preference = set()
-
-        for day, hour in overlap:
-            coach_prefers = hour in coach_preferred_times if coach_preferred_times else False
-            member_prefers = hour in member_preferred_times if member_preferred_times else False
-            
-            if coach_prefers and member_prefers:
-                both_preferred.add((day, hour))
-            elif coach_prefers:
-                coach_only_preferred.add((day, hour))
-            elif member_prefers:
-                member_only_preferred.add((day, hour))
-            else:
-                no_preference.add((day, hour))
-
-        # Combine slots in order of preference
-        slots_to_consider = list(both_preferred) + list(coach_only_preferred) + list(member_only_preferred) + list(no_preference)
-
-        if not slots_to_consider:
-            return {"success": False, "message": "This workout cannot be assigned — no matching time slot found."}
-
-        # For each slot, compute the next occurrence (date+time) in the future
-        slot_datetimes = []
-        for day, hour in slots_to_consider:
-            dt = next_occurrence(day, hour)
-            # Double-check that this specific datetime doesn't conflict with existing sessions
-            is_available = True
-            
-            # Check coach availability for this specific datetime
-            for session in coach_sessions:
-                # Convert timedelta to time object if needed
-                session_time = session['session_time']
-                if isinstance(session_time, timedelta):
-                    # Convert timedelta to time object
-                    total_seconds = int(session_time.total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    seconds = total_seconds % 60
-                    session_time = dt_time(hours, minutes, seconds)
-                
-                session_start = datetime.combine(session['session_date'], session_time)
-                session_end = session_start + timedelta(minutes=session['duration'])
-                proposed_start = dt
-                proposed_end = dt + timedelta(minutes=duration)
-                
-                # Check for overlap
-                if (proposed_start < session_end and proposed_end > session_start):
-                    is_available = False
-                    break
-            
-            # Check member availability for this specific datetime
-            if is_available:
-                for session in member_sessions:
-                    # Convert timedelta to time object if needed
-                    session_time = session['session_time']
-                    if isinstance(session_time, timedelta):
-                        # Convert timedelta to time object
-                        total_seconds = int(session_time.total_seconds())
-                        hours = total_seconds // 3600
-                        minutes = (total_seconds % 3600) // 60
-                        seconds = total_seconds % 60
-                        session_time = dt_time(hours, minutes, seconds)
-                    
-                    session_start = datetime.combine(session['session_date'], session_time)
-                    session_end = session_start + timedelta(minutes=session['duration'])
-                    proposed_start = dt
-                    proposed_end = dt + timedelta(minutes=duration)
-                    
-                    # Check for overlap
-                    if (proposed_start < session_end and proposed_end > session_start):
-                        is_available = False
-                        break
-            
-            if is_available:
-                # Determine preference level for scoring
-                coach_prefers = hour in coach_preferred_times if coach_preferred_times else False
-                member_prefers = hour in member_preferred_times if member_preferred_times else False
-                
-                if coach_prefers and member_prefers:
-                    preference_score = 4
-                elif coach_prefers:
-                    preference_score = 3
-                elif member_prefers:
-                    preference_score = 2
-                else:
-                    preference_score = 1
-                
-                slot_datetimes.append((dt, day, hour, preference_score))
-        
-        # Only keep future slots
-        slot_datetimes = [s for s in slot_datetimes if s[0] > datetime.now()]
-        
-        # Sort by preference score (descending) then by datetime (ascending)
-        slot_datetimes.sort(key=lambda x: (-x[3], x[0]))
-        
-        # Take the best 10
-        best_matches = slot_datetimes[:10]
-        if not best_matches:
-            return {"success": False, "message": "This workout cannot be assigned — no matching time slot found."}
+        return {"success": True, "matches": best_matches}
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.post("/api/coach/auto_schedule")
+async def auto_schedule_roster(
+    request: Request,
+    current_user: dict = Depends(get_current_user_dependency)
+):
+    """
+    Place sessions for several of the coach's members jointly and book them in one transaction.
+
+    Body: {"members": [{"member_id": 5, "sessions": 2, "duration": 60, "workout_type": "Push",
+    "exercises": [...], "notes": ""}, ...], "week_start": "YYYY-MM-DD" (default: the next 7 days),
+    "step_minutes": 60, "dry_run": false}
+    """
+    if current_user["user_type"] != "coach":
+        raise HTTPException(status_code=403, detail="Only coaches can access this endpoint")
+    coach_id = current_user["id"]
+
+    data = await request.json()
+    members = data.get("members")
+    if not isinstance(members, list) or not members:
+        raise HTTPException(status_code=400, detail="members must be a non-empty list")
+    requests_by_member = {}
+    for entry in members:
+        if not isinstance(entry, dict) or not isinstance(entry.get("member_id"), int):
+            raise HTTPException(status_code=400, detail="Each member needs an integer member_id")
+        if entry["member_id"] in requests_by_member:
+            raise HTTPException(status_code=400, detail=f"Member {entry['member_id']} is listed twice")
+        count, duration = entry.get("sessions", 1), entry.get("duration", 60)
+        if not isinstance(count, int) or not 1 <= count <= 7:
+            raise HTTPException(status_code=400, detail="sessions must be between 1 and 7 per member")
+        if not isinstance(duration, int) or not 15 <= duration <= 240:
+            raise HTTPException(status_code=400, detail="duration must be between 15 and 240 minutes")
+        if not isinstance(entry.get("workout_type") or "", str) or not isinstance(entry.get("notes") or "", str):
+            raise HTTPException(status_code=400, detail="workout_type and notes must be strings")
+        exercises = entry.get("exercises") or []
+        if not isinstance(exercises, list) or not all(isinstance(exercise, str) for exercise in exercises):
+            raise HTTPException(status_code=400, detail="exercises must be a list of strings")
+        requests_by_member[entry["member_id"]] = entry
+    step_minutes = data.get("step_minutes", 60)
+    if not isinstance(step_minutes, int) or not 5 <= step_minutes <= 240:
+        raise HTTPException(status_code=400, detail="step_minutes must be between 5 and 240")
+    dry_run = bool(data.get("dry_run", False))
+
+    now = datetime.now()
+    earliest, horizon_days = now, 7
+    if data.get("week_start"):
+        try:
+            week_start = datetime.strptime(data["week_start"], "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="week_start must be YYYY-MM-DD")
+        if week_start + timedelta(days=7) <= now:
+            raise HTTPException(status_code=400, detail="week_start is in the past")
+        earliest = max(now, week_start)
+        horizon_days = (week_start + timedelta(days=7) - earliest) / timedelta(days=1)
+
+    member_ids = list(requests_by_member)
+    placeholders = ", ".join(["%s"] * len(member_ids))
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Locking the coach row serializes batch bookings for this coach; the
+        # reads below then see every session committed before the lock
+        cursor.execute(f"SELECT gym_id FROM coaches WHERE id = %s{'' if dry_run else ' FOR UPDATE'}", (coach_id,))
+        coach = cursor.fetchone()
+        if not coach:
+            raise HTTPException(status_code=404, detail="Coach not found")
+
+        cursor.execute(f"""
+            SELECT member_id FROM member_coach WHERE coach_id = %s AND member_id IN ({placeholders})
+        """, [coach_id] + member_ids)
+        not_assigned = set(member_ids) - {row["member_id"] for row in cursor.fetchall()}
+        if not_assigned:
+            raise HTTPException(status_code=400, detail=f"Members not assigned to this coach: {sorted(not_assigned)}")
+
+        # Availability, preferences and sessions of the coach and every member in three queries
+        user_filter = f"(user_type = 'coach' AND user_id = %s) OR (user_type = 'member' AND user_id IN ({placeholders}))"
+        cursor.execute(f"SELECT * FROM free_days WHERE {user_filter}", [coach_id] + member_ids)
+        free_days = {}
+        for row in cursor.fetchall():
+            free_days.setdefault((row["user_type"], row["user_id"]), []).append(row)
+
+        cursor.execute(f"SELECT user_id, user_type, preferred_time_slots FROM user_preferences WHERE {user_filter}",
+                       [coach_id] + member_ids)
+        preferred = {
+            (row["user_type"], row["user_id"]): json.loads(row["preferred_time_slots"])
+            for row in cursor.fetchall() if row["preferred_time_slots"]
+        }
+
+        last_day = (earliest + timedelta(days=horizon_days)).date()
+        cursor.execute(f"""
+            SELECT coach_id, member_id, session_date, session_time, duration
+            FROM sessions
+            WHERE (coach_id = %s OR member_id IN ({placeholders}))
+            AND session_date BETWEEN %s AND %s
+            AND status != 'Cancelled'
+        """, [coach_id] + member_ids + [earliest.date(), last_day])
+        coach_sessions, member_sessions = [], {}
+        for row in cursor.fetchall():
+            if row["coach_id"] == coach_id:
+                coach_sessions.append(row)
+            if row["member_id"] in requests_by_member:
+                member_sessions.setdefault(row["member_id"], []).append(row)
+
+        placed, unplaced = scheduling.plan_batch(
+            free_days.get(("coach", coach_id), []),
+            coach_sessions,
+            preferred.get(("coach", coach_id), []),
+            [
+                {
+                    "member_id": member_id,
+                    "count": entry.get("sessions", 1),
+                    "duration": entry.get("duration", 60),
+                    "free_days": free_days.get(("member", member_id), []),
+                    "sessions": member_sessions.get(member_id, []),
+                    "preferred": preferred.get(("member", member_id), []),
+                }
+                for member_id, entry in requests_by_member.items()
+            ],
+            earliest,
+            horizon_days,
+            step_minutes,
+        )
+
+        for session in placed:
+            entry = requests_by_member[session["member_id"]]
+            session["session_id"] = None
+            if dry_run:
+                continue
+            cursor.execute("""
+                INSERT INTO sessions (gym_id, coach_id, member_id, session_date, session_time, duration, status, notes)
+                VALUES (%s, %s, %s, %s, %s, %s, 'Scheduled', %s)
+            """, (
+                coach["gym_id"],
+                coach_id,
+                session["member_id"],
+                session["start"].date(),
+                session["start"].strftime("%H:%M"),
+                entry.get("duration", 60),
+                format_workout_notes(entry.get("workout_type") or "Custom", entry.get("exercises") or [],
+                                     entry.get("notes") or "")
+            ))
+            session["session_id"] = cursor.lastrowid
+            gym_stats.session_added(cursor, session["session_id"])
+
+        if dry_run or not placed:
+            conn.rollback()
+        else:
+            conn.commit()
+            cache_events.sessions_written(coach["gym_id"], coach_id, [session["member_id"] for session in placed])
 
         return {
             "success": True,
-            "matches": [
+            "committed": not dry_run and bool(placed),
+            "sessions": [
                 {
-                    "date": dt.strftime("%Y-%m-%d"),
-                    "day": day,
-                    "hour": hour,
-                    "preference_score": preference_score
+                    "session_id": session["session_id"],
+                    "member_id": session["member_id"],
+                    "date": session["start"].strftime("%Y-%m-%d"),
+                    "day": session["start"].strftime("%A"),
+                    "hour": session["start"].strftime("%H:%M"),
+                    "end": session["end"].strftime("%H:%M"),
+                    "preference_score": session["preference_score"]
                 }
-                for dt, day, hour, preference_score in best_matches
-            ]
+                for session in placed
+            ],
+            "unplaced": unplaced
         }
+    except HTTPException:
+        conn.rollback()
+        raise
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error in auto_schedule_roster: %s", e)
+        raise HTTPException(status_code=500, detail="Error scheduling sessions")
     finally:
         cursor.close()
         conn.close()
@@ -5768,278 +5910,266 @@ async def create_session_api(
             raise HTTPException(status_code=400, detail="Coach does not have a gym_id")
         gym_id = row['gym_id']
 
-        # Format notes with workout type and exercises
-        notes_content = f"Workout Type: {workout_type}"
-        
-        # Add exercises if provided
-        if exercises and len(exercises) > 0:
-            notes_content += "\nExercises:\n"
-            for i, exercise in enumerate(exercises, 1):
-                notes_content += f"{i}. {exercise}\n"
-        
-        # Add additional notes if provided
-        if notes:
-            notes_content += f"\n{notes}"
+        notes_content = format_workout_notes(workout_type, exercises, notes)
         
         cursor.execute("""
             INSERT INTO sessions (gym_id, coach_id, member_id, session_date, session_time, duration, status, notes)
             VALUES (%s, %s, %s, %s, %s, %s, 'Scheduled', %s)
         """, (gym_id, coach_id, member_id, session_date, session_time, duration, notes_content))
+        session_id = cursor.lastrowid
+        gym_stats.session_added(cursor, session_id)
         conn.commit()
-        return {"success": True, "session_id": cursor.lastrowid}
+        cache_events.sessions_written(gym_id, coach_id, member_id)
+        return {"success": True, "session_id": session_id}
     finally:
         cursor.close()
         conn.close()
 
+SCHEDULE_VIEW_MAX_WEEKS = int(os.environ.get("SCHEDULE_VIEW_MAX_WEEKS", "8"))  # weeks per compact schedule_view request
+
+SCHEDULE_VIEW_LEGEND = {
+    "preference_scores": {
+        "4": "Both prefer this time",
+        "3": "Coach prefers this time",
+        "2": "Member prefers this time",
+        "1": "Available but no preference"
+    }
+}
+
+def preferred_hours_mask(slots) -> int:
+    """24-bit mask of preferred_time_slots entries ("HH:MM" strings or hour numbers)"""
+    mask = 0
+    for slot in slots or []:
+        try:
+            hour = int(str(slot).split(':')[0])
+        except ValueError:
+            continue
+        if 0 <= hour < 24:
+            mask |= 1 << hour
+    return mask
+
+def free_day_masks(free_days) -> List[int]:
+    """Hour mask per weekday (Monday = 0), the same whole hours availability.week_mask counts"""
+    week = availability.week_mask(free_days)
+    return [availability.week_day(week, weekday) for weekday in range(7)]
+
+def load_schedule_view(cursor, coach_id: int, member_id: int, first_day, last_day) -> Dict:
+    """Everything the schedule view shows for a date range, in four queries however many weeks it covers"""
+    cursor.execute("""
+        SELECT c.name AS coach_name, c.specialization, m.name AS member_name, m.membership_type
+        FROM (SELECT 1) AS one
+        LEFT JOIN coaches c ON c.id = %s
+        LEFT JOIN members m ON m.id = %s
+    """, (coach_id, member_id))
+    names = cursor.fetchone()
+
+    # The coach's and the member's sessions together (a session between the two is in both lists)
+    cursor.execute("""
+        SELECT s.*, m.name as member_name, m.membership_type, c.name as coach_name, c.specialization,
+               DATE_FORMAT(s.session_date, '%%Y-%%m-%%d') as formatted_date,
+               TIME_FORMAT(s.session_time, '%%H:%%i') as formatted_time,
+               DAYNAME(s.session_date) as day_name,
+               HOUR(s.session_time) as hour_slot
+        FROM sessions s
+        JOIN members m ON s.member_id = m.id
+        JOIN coaches c ON s.coach_id = c.id
+        WHERE (s.coach_id = %s OR s.member_id = %s)
+        AND s.session_date BETWEEN %s AND %s
+        AND s.status != 'Cancelled'
+        ORDER BY s.session_date, s.session_time
+    """, (coach_id, member_id, first_day, last_day))
+    sessions = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT user_type, preferred_time_slots FROM user_preferences
+        WHERE (user_id = %s AND user_type = 'coach') OR (user_id = %s AND user_type = 'member')
+    """, (coach_id, member_id))
+    preferred = {'coach': [], 'member': []}
+    for row in cursor.fetchall():
+        if row['preferred_time_slots']:
+            preferred[row['user_type']] = json.loads(row['preferred_time_slots'])
+
+    cursor.execute("""
+        SELECT user_type, day_of_week, is_available, start_time, end_time FROM free_days
+        WHERE (user_id = %s AND user_type = 'coach') OR (user_id = %s AND user_type = 'member')
+    """, (coach_id, member_id))
+    free_days = {'coach': [], 'member': []}
+    for row in cursor.fetchall():
+        free_days[row['user_type']].append(row)
+
+    return {
+        'coach': {
+            'id': coach_id,
+            'name': names['coach_name'] or "Unknown",
+            'specialization': names['specialization'] or "",
+            'preferred_times': preferred['coach'],
+            'sessions': [session for session in sessions if session['coach_id'] == coach_id]
+        },
+        'member': {
+            'id': member_id,
+            'name': names['member_name'] or "Unknown",
+            'membership_type': names['membership_type'] or "Basic",
+            'preferred_times': preferred['member'],
+            'sessions': [session for session in sessions if session['member_id'] == member_id]
+        },
+        'sessions': sessions,
+        'free': {role: free_day_masks(rows) for role, rows in free_days.items()},
+        'preferred': {role: preferred_hours_mask(slots) for role, slots in preferred.items()}
+    }
+
+def schedule_grid(view: Dict) -> Dict:
+    """The 7 x 24 grid of slot objects for one week of load_schedule_view"""
+    by_slot = {'coach': {}, 'member': {}}
+    for role, other in (('coach', 'member_name'), ('member', 'coach_name')):
+        for session in view[role]['sessions']:
+            by_slot[role].setdefault((session['day_name'], session['hour_slot']), []).append({
+                'id': session['id'],
+                other: session[other],
+                'time': session['formatted_time'],
+                'duration': session['duration'],
+                'status': session['status'],
+                'notes': session['notes'],
+                'session_type': session.get('session_type', 'General Training')
+            })
+
+    grid = {}
+    for weekday, day in enumerate(scheduling.DAYS_OF_WEEK):
+        grid[day] = {}
+        for hour in range(24):
+            bit = 1 << hour
+            coach_sessions = by_slot['coach'].get((day, hour), [])
+            member_sessions = by_slot['member'].get((day, hour), [])
+            slot = {
+                'coach_available': bool(view['free']['coach'][weekday] & bit) and not coach_sessions,
+                'member_available': bool(view['free']['member'][weekday] & bit) and not member_sessions,
+                'coach_preferred': bool(view['preferred']['coach'] & bit),
+                'member_preferred': bool(view['preferred']['member'] & bit),
+                # One session keeps the single-object field; several use the *_sessions arrays
+                'coach_session': coach_sessions[0] if len(coach_sessions) == 1 else None,
+                'member_session': member_sessions[0] if len(member_sessions) == 1 else None,
+                'available_for_both': False,
+                'preference_score': 0
+            }
+            if len(coach_sessions) > 1:
+                slot['coach_sessions'] = coach_sessions
+            if len(member_sessions) > 1:
+                slot['member_sessions'] = member_sessions
+            if slot['coach_available'] and slot['member_available']:
+                slot['available_for_both'] = True
+                if slot['coach_preferred'] and slot['member_preferred']:
+                    slot['preference_score'] = 4
+                elif slot['coach_preferred']:
+                    slot['preference_score'] = 3
+                elif slot['member_preferred']:
+                    slot['preference_score'] = 2
+                else:
+                    slot['preference_score'] = 1
+            grid[day][hour] = slot
+    return grid
+
+def compact_schedule_view(view: Dict, coach_id: int, member_id: int, first_day, weeks: int) -> Dict:
+    """
+    Bitmask form of the schedule view: every day is a 24-bit int (bit h = hour h),
+    weeks are 7 such ints Monday first, and sessions are listed once as columns
+    """
+    columns = ('id', 'date', 'time', 'hour', 'duration', 'status', 'notes',
+               'coach_id', 'coach_name', 'member_id', 'member_name')
+    sessions = {column: [] for column in columns}
+    for session in view['sessions']:
+        for column, value in zip(columns, (
+                session['id'], session['formatted_date'], session['formatted_time'], session['hour_slot'],
+                session['duration'], session['status'], session['notes'], session['coach_id'],
+                session['coach_name'], session['member_id'], session['member_name'])):
+            sessions[column].append(value)
+
+    coach_free, member_free = view['free']['coach'], view['free']['member']
+    week_list = []
+    for week in range(weeks):
+        week_start = first_day + timedelta(days=7 * week)
+        week_end = week_start + timedelta(days=6)
+        coach_busy, member_busy = [0] * 7, [0] * 7
+        for session in view['sessions']:
+            if week_start <= session['session_date'] <= week_end:
+                weekday, bit = session['session_date'].weekday(), 1 << session['hour_slot']
+                if session['coach_id'] == coach_id:
+                    coach_busy[weekday] |= bit
+                if session['member_id'] == member_id:
+                    member_busy[weekday] |= bit
+        week_list.append({
+            'week_start': week_start.strftime("%Y-%m-%d"),
+            'week_end': week_end.strftime("%Y-%m-%d"),
+            'coach_busy': coach_busy,
+            'member_busy': member_busy,
+            'available_for_both': [
+                coach_free[d] & member_free[d] & ~coach_busy[d] & ~member_busy[d] for d in range(7)
+            ]
+        })
+
+    return {
+        "success": True,
+        "format": "compact",
+        "week_start": first_day.strftime("%Y-%m-%d"),
+        "coach": {
+            key: view['coach'][key] for key in ('id', 'name', 'specialization', 'preferred_times')
+        } | {"available": coach_free, "preferred": view['preferred']['coach']},
+        "member": {
+            key: view['member'][key] for key in ('id', 'name', 'membership_type', 'preferred_times')
+        } | {"available": member_free, "preferred": view['preferred']['member']},
+        "weeks": week_list,
+        "sessions": sessions,
+        "legend": SCHEDULE_VIEW_LEGEND
+    }
+
+def conditional_json_response(request: Request, result) -> Response:
+    """JSON response with an ETag; 304 without a body when the client already has this one"""
+    body = encode_json(result)
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/api/coach/schedule_view/{coach_id}/{member_id}")
 async def get_schedule_view(
+    request: Request,
     coach_id: int,
     member_id: int,
-    week_start: str = Query(..., description="Week start date in YYYY-MM-DD format")
+    week_start: str = Query(..., description="Week start date in YYYY-MM-DD format"),
+    weeks: int = Query(1, ge=1, le=SCHEDULE_VIEW_MAX_WEEKS, description="Weeks to return (format=compact)"),
+    format: str = Query("grid", description="grid: nested day/hour objects; compact: hour bitmasks")
 ):
     """Get comprehensive schedule view including sessions, preferences, and availability"""
+    if format not in ('grid', 'compact'):
+        raise HTTPException(status_code=400, detail="format must be 'grid' or 'compact'")
+    if format == 'grid' and weeks != 1:
+        raise HTTPException(status_code=400, detail="Several weeks need format=compact")
+    try:
+        week_start_date = datetime.strptime(week_start, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="week_start must be YYYY-MM-DD")
+    last_day = week_start_date + timedelta(days=7 * weeks - 1)
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        from datetime import datetime, timedelta
-        import json
-        
-        # Parse week start date
-        week_start_date = datetime.strptime(week_start, "%Y-%m-%d").date()
-        week_end_date = week_start_date + timedelta(days=6)
-        
-        # Get coach information
-        cursor.execute("SELECT name, specialization FROM coaches WHERE id = %s", (coach_id,))
-        coach_info = cursor.fetchone()
-        
-        # Get member information
-        cursor.execute("SELECT name, membership_type FROM members WHERE id = %s", (member_id,))
-        member_info = cursor.fetchone()
-        
-        # Get coach sessions for the week
-        cursor.execute("""
-            SELECT s.*, m.name as member_name, m.membership_type,
-                   DATE_FORMAT(s.session_date, '%%Y-%%m-%%d') as formatted_date,
-                   TIME_FORMAT(s.session_time, '%%H:%%i') as formatted_time,
-                   DAYNAME(s.session_date) as day_name,
-                   HOUR(s.session_time) as hour_slot
-            FROM sessions s
-            JOIN members m ON s.member_id = m.id
-            WHERE s.coach_id = %s 
-            AND s.session_date BETWEEN %s AND %s
-            AND s.status != 'Cancelled'
-            ORDER BY s.session_date, s.session_time
-        """, (coach_id, week_start_date, week_end_date))
-        coach_sessions = cursor.fetchall()
-        
-        # Get member sessions for the week
-        cursor.execute("""
-            SELECT s.*, c.name as coach_name, c.specialization,
-                   DATE_FORMAT(s.session_date, '%%Y-%%m-%%d') as formatted_date,
-                   TIME_FORMAT(s.session_time, '%%H:%%i') as formatted_time,
-                   DAYNAME(s.session_date) as day_name,
-                   HOUR(s.session_time) as hour_slot
-            FROM sessions s
-            JOIN coaches c ON s.coach_id = c.id
-            WHERE s.member_id = %s 
-            AND s.session_date BETWEEN %s AND %s
-            AND s.status != 'Cancelled'
-            ORDER BY s.session_date, s.session_time
-        """, (member_id, week_start_date, week_end_date))
-        member_sessions = cursor.fetchall()
-        
-        # Get coach preferences and availability
-        cursor.execute("SELECT * FROM user_preferences WHERE user_id = %s AND user_type = 'coach'", (coach_id,))
-        coach_preferences = cursor.fetchone()
-        
-        cursor.execute("SELECT * FROM free_days WHERE user_id = %s AND user_type = 'coach'", (coach_id,))
-        coach_availability = cursor.fetchall()
-        
-        # Get member preferences and availability
-        cursor.execute("SELECT * FROM user_preferences WHERE user_id = %s AND user_type = 'member'", (member_id,))
-        member_preferences = cursor.fetchone()
-        
-        cursor.execute("SELECT * FROM free_days WHERE user_id = %s AND user_type = 'member'", (member_id,))
-        member_availability = cursor.fetchall()
-        
-        # Parse preferred time slots
-        coach_preferred_times = []
-        if coach_preferences and coach_preferences.get('preferred_time_slots'):
-            coach_preferred_times = json.loads(coach_preferences['preferred_time_slots'])
-            
-        member_preferred_times = []
-        if member_preferences and member_preferences.get('preferred_time_slots'):
-            member_preferred_times = json.loads(member_preferences['preferred_time_slots'])
-        
-        # Create a weekly schedule grid (7 days x 24 hours)
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        schedule_grid = {}
-        
-        for day in days:
-            schedule_grid[day] = {}
-            for hour in range(24):
-                schedule_grid[day][hour] = {
-                    'coach_available': False,
-                    'member_available': False,
-                    'coach_preferred': hour in coach_preferred_times,
-                    'member_preferred': hour in member_preferred_times,
-                    'coach_session': None,
-                    'member_session': None,
-                    'available_for_both': False,
-                    'preference_score': 0
-                }
-        
-        # Mark coach availability
-        for avail in coach_availability:
-            if avail['is_available']:
-                day = avail['day_of_week']
-                start_hour = avail['start_time'].seconds // 3600
-                end_hour = avail['end_time'].seconds // 3600
-                
-                for hour in range(start_hour, min(end_hour, 24)):
-                    if day in schedule_grid:
-                        schedule_grid[day][hour]['coach_available'] = True
-        
-        # Mark member availability
-        for avail in member_availability:
-            if avail['is_available']:
-                day = avail['day_of_week']
-                start_hour = avail['start_time'].seconds // 3600
-                end_hour = avail['end_time'].seconds // 3600
-                
-                for hour in range(start_hour, min(end_hour, 24)):
-                    if day in schedule_grid:
-                        schedule_grid[day][hour]['member_available'] = True
-        
-        # Group coach sessions by day and hour
-        coach_sessions_by_slot = {}
-        for session in coach_sessions:
-            day = session['day_name']
-            hour = session['hour_slot']
-            slot_key = f"{day}_{hour}"
-            
-            if slot_key not in coach_sessions_by_slot:
-                coach_sessions_by_slot[slot_key] = []
-            
-            coach_sessions_by_slot[slot_key].append({
-                'id': session['id'],
-                'member_name': session['member_name'],
-                'time': session['formatted_time'],
-                'duration': session['duration'],
-                'status': session['status'],
-                'notes': session['notes'],
-                'session_type': session.get('session_type', 'General Training')
-            })
-        
-        # Group member sessions by day and hour
-        member_sessions_by_slot = {}
-        for session in member_sessions:
-            day = session['day_name']
-            hour = session['hour_slot']
-            slot_key = f"{day}_{hour}"
-            
-            if slot_key not in member_sessions_by_slot:
-                member_sessions_by_slot[slot_key] = []
-            
-            member_sessions_by_slot[slot_key].append({
-                'id': session['id'],
-                'coach_name': session['coach_name'],
-                'time': session['formatted_time'],
-                'duration': session['duration'],
-                'status': session['status'],
-                'notes': session['notes'],
-                'session_type': session.get('session_type', 'General Training')
-            })
-        
-        # Mark coach sessions in schedule grid
-        for slot_key, sessions in coach_sessions_by_slot.items():
-            day, hour = slot_key.split('_')
-            hour = int(hour)
-            
-            if day in schedule_grid and 0 <= hour < 24:
-                if len(sessions) == 1:
-                    # Single session - use backward compatibility
-                    schedule_grid[day][hour]['coach_session'] = sessions[0]
-                else:
-                    # Multiple sessions - use new array format
-                    schedule_grid[day][hour]['coach_sessions'] = sessions
-                
-                schedule_grid[day][hour]['coach_available'] = False
-        
-        # Mark member sessions in schedule grid
-        for slot_key, sessions in member_sessions_by_slot.items():
-            day, hour = slot_key.split('_')
-            hour = int(hour)
-            
-            if day in schedule_grid and 0 <= hour < 24:
-                if len(sessions) == 1:
-                    # Single session - use backward compatibility
-                    schedule_grid[day][hour]['member_session'] = sessions[0]
-                else:
-                    # Multiple sessions - use new array format
-                    schedule_grid[day][hour]['member_sessions'] = sessions
-                
-                schedule_grid[day][hour]['member_available'] = False
-        
-        # Calculate availability for both and preference scores
-        for day in days:
-            for hour in range(24):
-                slot = schedule_grid[day][hour]
-                
-                # Check if there are any sessions (single or multiple)
-                has_coach_session = slot.get('coach_session') is not None or slot.get('coach_sessions') is not None
-                has_member_session = slot.get('member_session') is not None or slot.get('member_sessions') is not None
-                
-                slot['available_for_both'] = (
-                    slot['coach_available'] and 
-                    slot['member_available'] and
-                    not has_coach_session and 
-                    not has_member_session
-                )
-                
-                # Calculate preference score
-                if slot['available_for_both']:
-                    if slot['coach_preferred'] and slot['member_preferred']:
-                        slot['preference_score'] = 4
-                    elif slot['coach_preferred']:
-                        slot['preference_score'] = 3
-                    elif slot['member_preferred']:
-                        slot['preference_score'] = 2
-                    else:
-                        slot['preference_score'] = 1
-        
-        return {
+        view = load_schedule_view(cursor, coach_id, member_id, week_start_date, last_day)
+        if format == 'compact':
+            return conditional_json_response(
+                request, compact_schedule_view(view, coach_id, member_id, week_start_date, weeks))
+
+        return conditional_json_response(request, {
             "success": True,
             "week_start": week_start,
-            "week_end": week_end_date.strftime("%Y-%m-%d"),
-            "coach": {
-                "id": coach_id,
-                "name": coach_info['name'] if coach_info else "Unknown",
-                "specialization": coach_info['specialization'] if coach_info else "",
-                "preferred_times": coach_preferred_times,
-                "sessions": coach_sessions
-            },
-            "member": {
-                "id": member_id,
-                "name": member_info['name'] if member_info else "Unknown", 
-                "membership_type": member_info['membership_type'] if member_info else "Basic",
-                "preferred_times": member_preferred_times,
-                "sessions": member_sessions
-            },
-            "schedule_grid": schedule_grid,
-            "legend": {
-                "preference_scores": {
-                    "4": "Both prefer this time",
-                    "3": "Coach prefers this time", 
-                    "2": "Member prefers this time",
-                    "1": "Available but no preference"
-                }
-            }
-        }
+            "week_end": last_day.strftime("%Y-%m-%d"),
+            "coach": view['coach'],
+            "member": view['member'],
+            "schedule_grid": schedule_grid(view),
+            "legend": SCHEDULE_VIEW_LEGEND
+        })
         
     except Exception as e:
-        print(f"Error getting schedule view: {str(e)}")
+        logger.error("Error getting schedule view: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -6099,18 +6229,7 @@ async def assign_workout_from_schedule(
         if not gym_data:
             raise HTTPException(status_code=400, detail="Coach not found")
         
-        # Format notes with workout type and exercises
-        notes_content = f"Workout Type: {workout_type}"
-        
-        # Add exercises if provided
-        if exercises and len(exercises) > 0:
-            notes_content += "\nExercises:\n"
-            for i, exercise in enumerate(exercises, 1):
-                notes_content += f"{i}. {exercise}\n"
-        
-        # Add additional notes if provided
-        if notes:
-            notes_content += f"\n{notes}"
+        notes_content = format_workout_notes(workout_type, exercises, notes)
         
         # Create the session
         cursor.execute("""
@@ -6137,7 +6256,9 @@ async def assign_workout_from_schedule(
         ))
         
         session_id = cursor.lastrowid
+        gym_stats.session_added(cursor, session_id)
         conn.commit()
+        cache_events.sessions_written(gym_data['gym_id'], coach_id, member_id)
         
         # Get the created session details
         cursor.execute("""
@@ -6173,7 +6294,7 @@ async def assign_workout_from_schedule(
         raise he
     except Exception as e:
         conn.rollback()
-        print(f"Error assigning workout from schedule: {str(e)}")
+        logger.error("Error assigning workout from schedule: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -6231,7 +6352,7 @@ async def get_coach_preferences(request: Request):
         }
         
     except Exception as e:
-        print(f"Error getting coach preferences: {str(e)}")
+        logger.error("Error getting coach preferences: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -6323,7 +6444,7 @@ async def analyze_food_photo(
             total_fat += float(food['fat'])
         
         # Generate free AI feedback and save meal analysis
-        ai_feedback = generate_free_nutrition_feedback(user['id'], total_calories, total_protein, total_carbs, total_fat)
+        ai_feedback = generate_free_nutrition_feedback(user['id'], total_calories, total_protein, total_carbs, total_fat, cursor=cursor)
         suggestions = "Great job tracking your nutrition! Keep logging your meals for better insights."
         
         cursor.execute("""
@@ -6366,7 +6487,7 @@ async def analyze_food_photo(
         }
         
     except Exception as e:
-        print(f"Error analyzing food photo: {str(e)}")
+        logger.error("Error analyzing food photo: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if 'cursor' in locals():
@@ -6376,6 +6497,7 @@ async def analyze_food_photo(
 
 # Food Search using Open Food Facts API
 @app.get("/api/nutrition/search-food")
+@stay_on_event_loop
 async def search_food(
     request: Request,
     query: str = Query(..., description="Food name or barcode"),
@@ -6383,8 +6505,19 @@ async def search_food(
 ):
     """Search for foods using USDA database"""
     try:
+        # Foods imported by food_import.py answer locally without a network call.
+        # This route stays on the event loop while USDA answers, so the query goes to the executor
+        local_foods = await run_in_db_executor(find_local_foods, query, limit)
+        if local_foods:
+            return {
+                "success": True,
+                "data": local_foods,
+                "source": "local",
+                "message": f"Found {len(local_foods)} foods in local USDA database"
+            }
+        
         # Search USDA database
-        usda_foods = search_usda_foods(query, max_results=limit)
+        usda_foods = await search_usda_foods(query, max_results=limit)
         
         if usda_foods:
             return {
@@ -6409,6 +6542,7 @@ async def search_food(
         }
 
 @app.get("/api/nutrition/get-food-nutrition")
+@stay_on_event_loop
 async def get_food_nutrition(
     request: Request,
     food_name: str = Query(..., description="Food name to get nutrition for")
@@ -6416,7 +6550,7 @@ async def get_food_nutrition(
     """Get detailed nutrition information for a specific food from USDA database"""
     try:
         # Try USDA database first
-        nutrition_data = search_and_get_nutrition(food_name)
+        nutrition_data = await search_and_get_nutrition(food_name)
         
         if nutrition_data:
             return {
@@ -6442,20 +6576,25 @@ async def get_food_nutrition(
         }
 
 @app.get("/api/nutrition/get-food-nutrition-by-id")
+@stay_on_event_loop
 async def get_food_nutrition_by_id(
     request: Request,
     fdc_id: int = Query(..., description="USDA FDC ID to get nutrition for")
 ):
     """Get detailed nutrition information for a specific food by USDA FDC ID"""
     try:
-        # Get nutrition data directly by FDC ID
-        nutrition_data = get_usda_food_details(fdc_id)
+        # Get nutrition data directly by FDC ID, from the local import when available
+        nutrition_data = await run_in_db_executor(find_local_food_nutrition, fdc_id)
+        source = "local"
+        if not nutrition_data:
+            nutrition_data = await get_usda_food_details(fdc_id)
+            source = "USDA"
         
         if nutrition_data:
             return {
                 "success": True,
                 "data": nutrition_data,
-                "source": "USDA",
+                "source": source,
                 "message": "Nutrition data retrieved from USDA database"
             }
         else:
@@ -6491,7 +6630,7 @@ async def get_food_nutrition_by_id(
             }
         
         # Make request to Open Food Facts API
-        response = requests.get(url, params=params if not query.isdigit() else None, timeout=10)
+        response = await http_client.get(url, params=params if not query.isdigit() else None)
         response.raise_for_status()
         
         data = response.json()
@@ -6536,7 +6675,7 @@ async def get_food_nutrition_by_id(
         }
         
     except Exception as e:
-        print(f"Error searching food: {str(e)}")
+        logger.error("Error searching food: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Add food manually
@@ -6591,7 +6730,7 @@ async def add_food_manually(
         ))
         
         # Update daily meal analysis
-        ai_feedback = generate_free_nutrition_feedback(user['id'], calories, protein, carbs, fat)
+        ai_feedback = generate_free_nutrition_feedback(user['id'], calories, protein, carbs, fat, cursor=cursor)
         
         cursor.execute("""
             INSERT INTO meal_analysis 
@@ -6629,7 +6768,7 @@ async def add_food_manually(
         }
         
     except Exception as e:
-        print(f"Error adding food manually: {str(e)}")
+        logger.error("Error adding food manually: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -6710,7 +6849,7 @@ async def get_weekly_nutrition_progress(request: Request, member_id: int):
         }
         
     except Exception as e:
-        print(f"Error getting weekly nutrition progress: {str(e)}")
+        logger.error("Error getting weekly nutrition progress: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -6761,7 +6900,7 @@ async def get_nutrition_dashboard(request: Request, member_id: int):
                 'goal_type': 'Maintenance'
             }
         except Exception as e:
-            print(f"Warning: nutrition_goals table not found or error: {e}")
+            logger.warning("nutrition_goals table not found or error: %s", e)
             goals = {
                 'daily_calorie_goal': 2000,
                 'daily_protein_goal': 150,
@@ -6780,7 +6919,7 @@ async def get_nutrition_dashboard(request: Request, member_id: int):
             """, (member_id,))
             weekly_analysis = cursor.fetchall()
         except Exception as e:
-            print(f"Warning: meal_analysis table not found or error: {e}")
+            logger.warning("meal_analysis table not found or error: %s", e)
             weekly_analysis = []
         
         # Calculate totals for today
@@ -6811,19 +6950,24 @@ async def get_nutrition_dashboard(request: Request, member_id: int):
         }
         
     except Exception as e:
-        print(f"Error getting nutrition dashboard: {str(e)}")
+        logger.error("Error getting nutrition dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
         conn.close()
 
 # Helper functions - FREE VERSION
-def generate_free_nutrition_feedback(member_id: int, calories: float, protein: float, carbs: float, fat: float) -> str:
-    """Generate free nutrition feedback using rule-based logic"""
+def generate_free_nutrition_feedback(member_id: int, calories: float, protein: float, carbs: float, fat: float, cursor=None) -> str:
+    """Generate free nutrition feedback using rule-based logic
+
+    Pass the caller's cursor to reuse its connection instead of checking out a second one.
+    """
+    owns_connection = cursor is None
     try:
         # Get member goals
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        if owns_connection:
+            conn = get_db_connection()
+            cursor = conn.cursor()
         
         cursor.execute("""
             SELECT daily_calorie_goal, daily_protein_goal, daily_carbs_goal, daily_fat_goal,
@@ -6877,13 +7021,14 @@ def generate_free_nutrition_feedback(member_id: int, calories: float, protein: f
         return " ".join(feedback_parts)
         
     except Exception as e:
-        print(f"Error generating feedback: {str(e)}")
+        logger.error("Error generating feedback: %s", e)
         return "Keep up the great work with your nutrition tracking!"
     finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
+        if owns_connection:
+            if cursor is not None:
+                cursor.close()
+            if 'conn' in locals():
+                conn.close()
 
 def calculate_health_score(calories: float, protein: float, carbs: float, fat: float) -> float:
     """Calculate a simple health score based on macronutrient balance"""
@@ -6951,7 +7096,7 @@ async def get_coach_nutrition_members(request: Request):
         }
         
     except Exception as e:
-        print(f"Error getting coach nutrition members: {str(e)}")
+        logger.error("Error getting coach nutrition members: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -7006,7 +7151,7 @@ async def create_sample_nutrition_data():
         }
         
     except Exception as e:
-        print(f"Error creating sample nutrition data: {str(e)}")
+        logger.error("Error creating sample nutrition data: %s", e)
         return {"success": False, "detail": str(e)}
     finally:
         cursor.close()
@@ -7128,7 +7273,7 @@ async def get_coach_nutrition_dashboard(request: Request):
         }
         
     except Exception as e:
-        print(f"Error getting coach nutrition dashboard: {e}")
+        logger.error("Error getting coach nutrition dashboard: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/coach/nutrition/member/{member_id}")
@@ -7219,7 +7364,7 @@ async def get_coach_member_nutrition(request: Request, member_id: int):
         }
         
     except Exception as e:
-        print(f"Error getting member nutrition: {e}")
+        logger.error("Error getting member nutrition: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/api/coach/nutrition/feedback")
@@ -7272,7 +7417,7 @@ async def add_nutrition_feedback(
         }
         
     except Exception as e:
-        print(f"Error adding nutrition feedback: {e}")
+        logger.error("Error adding nutrition feedback: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/coach/nutrition/analytics")
@@ -7362,7 +7507,7 @@ async def get_coach_nutrition_analytics(
         }
         
     except Exception as e:
-        print(f"Error getting nutrition analytics: {e}")
+        logger.error("Error getting nutrition analytics: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.post("/api/coach/nutrition/plan")
@@ -7418,7 +7563,7 @@ async def create_nutrition_plan(
         }
         
     except Exception as e:
-        print(f"Error creating nutrition plan: {e}")
+        logger.error("Error creating nutrition plan: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 @app.get("/api/coach/nutrition/plans/{member_id}")
 async def get_member_nutrition_plans(request: Request, member_id: int):
@@ -7431,7 +7576,7 @@ async def get_member_nutrition_plans(request: Request, member_id: int):
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
-        print(f"Debug: Checking member {member_id} for coach {user['id']}")
+        logger.debug("Checking member %s for coach %s", member_id, user['id'])
         
         # First check if the member exists at all
         member_exists_query = """
@@ -7443,7 +7588,7 @@ async def get_member_nutrition_plans(request: Request, member_id: int):
         member_exists = cursor.fetchone()
         
         if not member_exists:
-            print(f"Debug: Member {member_id} does not exist in database")
+            logger.debug("Member %s does not exist in database", member_id)
             raise HTTPException(status_code=404, detail="Member not found")
         
         # Then verify member belongs to this coach and get member details
@@ -7457,10 +7602,10 @@ async def get_member_nutrition_plans(request: Request, member_id: int):
         member = cursor.fetchone()
         
         if not member:
-            print(f"Debug: Member {member_id} exists but not assigned to coach {user['id']}")
+            logger.debug("Member %s exists but not assigned to coach %s", member_id, user['id'])
             raise HTTPException(status_code=403, detail="Member not assigned to this coach")
         
-        print(f"Debug: Found member {member['name']}")
+        logger.debug("Found member %s", member['name'])
         
         # Get nutrition plans
         plans_query = """
@@ -7483,7 +7628,7 @@ async def get_member_nutrition_plans(request: Request, member_id: int):
         cursor.execute(plans_query, (member_id,))
         plans = cursor.fetchall()
         
-        print(f"Debug: Found {len(plans)} nutrition plans for member {member_id}")
+        logger.debug("Found %s nutrition plans for member %s", len(plans), member_id)
         
         # Convert datetime objects and boolean status to string
         for plan in plans:
@@ -7509,10 +7654,7 @@ async def get_member_nutrition_plans(request: Request, member_id: int):
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        print(f"Error getting nutrition plans: {e}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error getting nutrition plans: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Get single nutrition plan for editing
@@ -7556,7 +7698,7 @@ async def get_nutrition_plan(plan_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error getting nutrition plan: {e}")
+        logger.error("Error getting nutrition plan: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Update nutrition plan
@@ -7618,7 +7760,7 @@ async def update_nutrition_plan(plan_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating nutrition plan: {e}")
+        logger.error("Error updating nutrition plan: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Delete nutrition plan
@@ -7662,7 +7804,7 @@ async def delete_nutrition_plan(plan_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting nutrition plan: {e}")
+        logger.error("Error deleting nutrition plan: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Member nutrition plans endpoint
@@ -7715,7 +7857,7 @@ async def get_member_nutrition_plans_for_current_user(request: Request):
         }
         
     except Exception as e:
-        print(f"Error getting member nutrition plans: {e}")
+        logger.error("Error getting member nutrition plans: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Get detailed nutrition plan with meal data
@@ -7778,7 +7920,7 @@ async def get_member_nutrition_plan_details(plan_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error getting nutrition plan details: {e}")
+        logger.error("Error getting nutrition plan details: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Get member's selected nutrition plan (for coaches)
@@ -7885,7 +8027,7 @@ async def get_coach_member_selected_plan(member_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error getting coach member selected plan: {e}")
+        logger.error("Error getting coach member selected plan: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Get member's selected nutrition plan
@@ -7978,7 +8120,7 @@ async def get_member_selected_plan(request: Request):
         }
         
     except Exception as e:
-        print(f"Error getting member selected plan: {e}")
+        logger.error("Error getting member selected plan: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Set member's selected nutrition plan
@@ -8055,7 +8197,7 @@ async def select_member_plan(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error selecting member plan: {e}")
+        logger.error("Error selecting member plan: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Member today's nutrition data endpoint
@@ -8212,7 +8354,7 @@ async def get_member_today_nutrition(request: Request):
         }
         
     except Exception as e:
-        print(f"Error getting member today's nutrition: {e}")
+        logger.error("Error getting member today's nutrition: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Coach member today's nutrition data endpoint
@@ -8297,7 +8439,7 @@ async def get_coach_member_today_nutrition(request: Request, member_id: int):
         }
         
     except Exception as e:
-        print(f"Error getting coach member today's nutrition: {e}")
+        logger.error("Error getting coach member today's nutrition: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Coach nutrition plans for all members endpoint
@@ -8369,7 +8511,7 @@ async def get_all_member_nutrition_plans(request: Request):
         }
         
     except Exception as e:
-        print(f"Error getting all member nutrition plans: {e}")
+        logger.error("Error getting all member nutrition plans: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # AI Meal Planning Endpoints
@@ -8526,7 +8668,7 @@ async def generate_ai_meal_plan(request: Request):
                 ))
                 conn.commit()
             except Exception as e:
-                print(f"Error saving meal plan: {e}")
+                logger.error("Error saving meal plan: %s", e)
             finally:
                 cursor.close()
                 conn.close()
@@ -8536,7 +8678,7 @@ async def generate_ai_meal_plan(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error generating meal plan: {e}")
+        logger.error("Error generating meal plan: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.delete("/api/member/nutrition/plans/{plan_id}")
@@ -8572,7 +8714,7 @@ async def delete_member_nutrition_plan(plan_id: int, request: Request):
             return {"success": True, "message": "Nutrition plan deleted successfully"}
             
         except Exception as e:
-            print(f"Error deleting nutrition plan: {e}")
+            logger.error("Error deleting nutrition plan: %s", e)
             raise HTTPException(status_code=500, detail="Internal server error")
         finally:
             cursor.close()
@@ -8581,7 +8723,7 @@ async def delete_member_nutrition_plan(plan_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting nutrition plan: {e}")
+        logger.error("Error deleting nutrition plan: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 @app.put("/api/member/nutrition/meals/{meal_id}")
 async def update_member_meal(meal_id: int, request: Request):
@@ -8669,7 +8811,7 @@ async def update_member_meal(meal_id: int, request: Request):
             }
             
         except Exception as e:
-            print(f"Error updating meal: {e}")
+            logger.error("Error updating meal: %s", e)
             raise HTTPException(status_code=500, detail="Internal server error")
         finally:
             cursor.close()
@@ -8678,7 +8820,7 @@ async def update_member_meal(meal_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error updating meal: {e}")
+        logger.error("Error updating meal: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.delete("/api/member/nutrition/meals/{meal_id}")
@@ -8731,7 +8873,7 @@ async def delete_member_meal(meal_id: int, request: Request):
             }
             
         except Exception as e:
-            print(f"Error deleting meal: {e}")
+            logger.error("Error deleting meal: %s", e)
             conn.rollback()
             raise HTTPException(status_code=500, detail=f"Error deleting meal: {str(e)}")
         finally:
@@ -8741,7 +8883,7 @@ async def delete_member_meal(meal_id: int, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting meal: {e}")
+        logger.error("Error deleting meal: %s", e)
         raise HTTPException(status_code=500, detail=f"Error deleting meal: {str(e)}")
 
 @app.post("/api/nutrition/generate-custom-meal")
@@ -8824,10 +8966,67 @@ async def generate_custom_meal(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error generating custom meal: {e}")
+        logger.error("Error generating custom meal: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def fetch_membership_type(member_id: int) -> Optional[str]:
+    """membership_type of a member, or None when the member doesn't exist"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        cursor.execute("SELECT membership_type FROM members WHERE id = %s", (member_id,))
+        member = cursor.fetchone()
+        cursor.close()
+        return member['membership_type'] if member else None
+    finally:
+        conn.close()
+
+def save_enhanced_nutrition_analysis(member_id: int, meal_type: str, photo_data: bytes, analysis_result: Dict) -> bool:
+    """Store the photo and a nutrition_logs row for an enhanced analysis; False if saving failed"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Save the photo
+        photo_filename = f"nutrition_enhanced_{member_id}_{int(time.time())}.jpg"
+        photo_path = os.path.join("static", "images", photo_filename)
+        
+        # Ensure directory exists
+        os.makedirs(os.path.dirname(photo_path), exist_ok=True)
+        
+        with open(photo_path, "wb") as f:
+            f.write(photo_data)
+        
+        # Save nutrition data
+        nutrition = analysis_result['nutrition']
+        cursor.execute("""
+            INSERT INTO nutrition_logs
+            (member_id, meal_type, custom_food_name, quantity, unit, calories, protein, carbs, fat, photo_path, notes, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+        """, (
+            member_id,
+            meal_type,
+            analysis_result['detected_food'],
+            1,
+            "serving",
+            nutrition.get('calories', 0),
+            nutrition.get('protein', 0),
+            nutrition.get('carbs', 0),
+            nutrition.get('fat', 0),
+            photo_filename,
+            f"Enhanced AI Analysis: {analysis_result['detected_food']} (Confidence: {analysis_result['confidence']:.2f}) - Source: {nutrition.get('source', 'Unknown')}"
+        ))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error("Error saving enhanced nutrition analysis: %s", e)
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
 @app.post("/api/nutrition/analyze-photo-ai")
+@stay_on_event_loop
 async def analyze_nutrition_photo_ai(
     request: Request,
     file: UploadFile = File(...),
@@ -8836,93 +9035,47 @@ async def analyze_nutrition_photo_ai(
 ):
     """Enhanced nutrition photo analysis using Hugging Face model + USDA database"""
     try:
-        # Get user from session
-        user = get_current_user(request)
+        # This route stays on the event loop while USDA answers, so database work goes to the executor
+        user = await run_in_db_executor(get_current_user, request)
         if not user:
             raise HTTPException(status_code=401, detail="Unauthorized")
         
         # Check premium membership for members
         if user['user_type'] == 'member':
-            conn = get_db_connection()
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
-            cursor.execute("SELECT membership_type FROM members WHERE id = %s", (user['id'],))
-            member = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            if not member or member['membership_type'] not in ['Premium', 'VIP']:
+            membership_type = await run_in_db_executor(fetch_membership_type, user['id'])
+            if membership_type not in ['Premium', 'VIP']:
                 raise HTTPException(status_code=403, detail="AI photo analysis requires Premium or VIP membership")
         
         # Read photo data
         photo_data = await file.read()
         
-        # Load the food classification model if not already loaded
-        if food_model is None:
-            load_food_classification_model()
-        
         # Analyze photo with enhanced AI + USDA database
-        analysis_result = analyze_food_photo_enhanced(photo_data)
+        analysis_result = await analyze_food_photo_enhanced(photo_data)
         
         if "error" in analysis_result:
             raise HTTPException(status_code=500, detail=analysis_result['error'])
         
         # Save to nutrition logs if analysis is successful
         if analysis_result.get('success'):
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            try:
-                # Save the photo
-                photo_filename = f"nutrition_enhanced_{user['id']}_{int(time.time())}.jpg"
-                photo_path = os.path.join("static", "images", photo_filename)
-                
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(photo_path), exist_ok=True)
-                
-                with open(photo_path, "wb") as f:
-                    f.write(photo_data)
-                
-                # Save nutrition data
-                nutrition = analysis_result['nutrition']
-                cursor.execute("""
-                    INSERT INTO nutrition_logs
-                    (member_id, meal_type, custom_food_name, quantity, unit, calories, protein, carbs, fat, photo_path, notes, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-                """, (
-                    user['id'],
-                    meal_type,
-                    analysis_result['detected_food'],
-                    1,
-                    "serving",
-                    nutrition.get('calories', 0),
-                    nutrition.get('protein', 0),
-                    nutrition.get('carbs', 0),
-                    nutrition.get('fat', 0),
-                    photo_filename,
-                    f"Enhanced AI Analysis: {analysis_result['detected_food']} (Confidence: {analysis_result['confidence']:.2f}) - Source: {nutrition.get('source', 'Unknown')}"
-                ))
-                conn.commit()
-                
+            saved = await run_in_db_executor(
+                save_enhanced_nutrition_analysis, user['id'], meal_type, photo_data, analysis_result
+            )
+            if saved:
                 # Add insights
+                nutrition = analysis_result['nutrition']
                 analysis_result['insights'] = {
                     'detection_confidence': analysis_result['confidence'],
                     'data_source': nutrition.get('source', 'Unknown'),
                     'analysis_method': analysis_result['analysis_method'],
                     'recommendations': generate_nutrition_recommendations(nutrition)
                 }
-                
-            except Exception as e:
-                print(f"Error saving enhanced nutrition analysis: {e}")
-            finally:
-                cursor.close()
-                conn.close()
         
         return analysis_result
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error analyzing nutrition photo with enhanced AI: {e}")
+        logger.error("Error analyzing nutrition photo with enhanced AI: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 def generate_nutrition_recommendations(nutrition: Dict) -> List[str]:
@@ -8998,7 +9151,7 @@ async def get_nutrition_insights(request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error getting nutrition insights: {e}")
+        logger.error("Error getting nutrition insights: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/api/nutrition/calculate-needs")
@@ -9036,7 +9189,7 @@ async def calculate_nutritional_needs(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error calculating nutritional needs: {e}")
+        logger.error("Error calculating nutritional needs: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Additional CRUD endpoints for Members
@@ -9075,8 +9228,10 @@ async def update_gym_member(member_id: int, request: Request):
         
         try:
             # Check if member exists and belongs to this gym
-            cursor.execute("SELECT id FROM members WHERE id = %s AND gym_id = %s", (member_id, user["id"]))
-            if not cursor.fetchone():
+            cursor.execute("SELECT id, gym_id, membership_type, join_date FROM members WHERE id = %s AND gym_id = %s",
+                           (member_id, user["id"]))
+            before = cursor.fetchone()
+            if not before:
                 raise HTTPException(status_code=404, detail="Member not found")
             
             # Check if email already exists for other members
@@ -9110,9 +9265,14 @@ async def update_gym_member(member_id: int, request: Request):
                     member_id,
                     user["id"]
                 ))
+            gym_stats.member_updated(cursor, before, member_id)
             
             # Handle coach assignment update
+            coach_ids = []
             if "coach_id" in data:
+                cursor.execute("SELECT coach_id FROM member_coach WHERE member_id = %s", (member_id,))
+                coach_ids = [row["coach_id"] for row in cursor.fetchall()] + [data["coach_id"]]
+                
                 # First, remove any existing coach assignment
                 cursor.execute("DELETE FROM member_coach WHERE member_id = %s", (member_id,))
                 
@@ -9124,6 +9284,9 @@ async def update_gym_member(member_id: int, request: Request):
                     """, (member_id, data["coach_id"]))
             
             conn.commit()
+            cache_events.member_written(user["id"], member_id)
+            if coach_ids:
+                cache_events.assignment_written(member_id, coach_ids)
             
             return {"message": "Member updated successfully"}
             
@@ -9132,7 +9295,7 @@ async def update_gym_member(member_id: int, request: Request):
             raise he
         except Exception as e:
             conn.rollback()
-            print(f"Error updating member: {str(e)}")
+            logger.error("Error updating member: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
         finally:
             cursor.close()
@@ -9141,7 +9304,7 @@ async def update_gym_member(member_id: int, request: Request):
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/gym/members/{member_id}")
@@ -9156,19 +9319,33 @@ async def delete_gym_member(member_id: int, request: Request):
     
     try:
         # Check if member exists and belongs to this gym
-        cursor.execute("SELECT id FROM members WHERE id = %s AND gym_id = %s", (member_id, user["id"]))
-        if not cursor.fetchone():
+        cursor.execute("SELECT id, gym_id, membership_type, join_date FROM members WHERE id = %s AND gym_id = %s",
+                       (member_id, user["id"]))
+        before = cursor.fetchone()
+        if not before:
             raise HTTPException(status_code=404, detail="Member not found")
         
+        # Coaches whose dashboards show this member
+        cursor.execute("""
+            SELECT coach_id FROM member_coach WHERE member_id = %s
+            UNION SELECT coach_id FROM sessions WHERE member_id = %s
+        """, (member_id, member_id))
+        coach_ids = [row["coach_id"] for row in cursor.fetchall()]
+        
         # Delete related records first
         cursor.execute("DELETE FROM member_coach WHERE member_id = %s", (member_id,))
+        gym_stats.sessions_removed(cursor, "member_id", member_id)
         cursor.execute("DELETE FROM sessions WHERE member_id = %s", (member_id,))
         cursor.execute("DELETE FROM payments WHERE member_id = %s", (member_id,))
         
         # Delete member
         cursor.execute("DELETE FROM members WHERE id = %s AND gym_id = %s", (member_id, user["id"]))
+        gym_stats.member_removed(cursor, before)
         
         conn.commit()
+        cache_events.member_written(user["id"], member_id)
+        cache_events.assignment_written(member_id, coach_ids)
+        cache_events.sessions_written(user["id"], coach_ids, member_id)
         
         return {"message": "Member deleted successfully"}
         
@@ -9177,7 +9354,7 @@ async def delete_gym_member(member_id: int, request: Request):
         raise he
     except Exception as e:
         conn.rollback()
-        print(f"Error deleting member: {str(e)}")
+        logger.error("Error deleting member: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -9233,7 +9410,9 @@ async def add_gym_coach(request: Request):
             ))
             
             coach_id = cursor.lastrowid
+            gym_stats.coach_added(cursor, coach_id)
             conn.commit()
+            cache_events.coach_written(user["id"], coach_id)
             
             return {
                 "message": "Coach added successfully",
@@ -9245,7 +9424,7 @@ async def add_gym_coach(request: Request):
             raise he
         except Exception as e:
             conn.rollback()
-            print(f"Error adding coach: {str(e)}")
+            logger.error("Error adding coach: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
         finally:
             cursor.close()
@@ -9254,7 +9433,7 @@ async def add_gym_coach(request: Request):
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/gym/coaches/{coach_id}")
@@ -9292,8 +9471,9 @@ async def update_gym_coach(coach_id: int, request: Request):
         
         try:
             # Check if coach exists and belongs to this gym
-            cursor.execute("SELECT id FROM coaches WHERE id = %s AND gym_id = %s", (coach_id, user["id"]))
-            if not cursor.fetchone():
+            cursor.execute("SELECT id, gym_id, status FROM coaches WHERE id = %s AND gym_id = %s", (coach_id, user["id"]))
+            before = cursor.fetchone()
+            if not before:
                 raise HTTPException(status_code=404, detail="Coach not found")
             
             # Check if email already exists for other coaches
@@ -9329,8 +9509,10 @@ async def update_gym_coach(coach_id: int, request: Request):
                     coach_id,
                     user["id"]
                 ))
+            gym_stats.coach_updated(cursor, before, coach_id)
             
             conn.commit()
+            cache_events.coach_written(user["id"], coach_id)
             
             return {"message": "Coach updated successfully"}
             
@@ -9339,7 +9521,7 @@ async def update_gym_coach(coach_id: int, request: Request):
             raise he
         except Exception as e:
             conn.rollback()
-            print(f"Error updating coach: {str(e)}")
+            logger.error("Error updating coach: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
         finally:
             cursor.close()
@@ -9348,7 +9530,7 @@ async def update_gym_coach(coach_id: int, request: Request):
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/gym/coaches/{coach_id}")
@@ -9363,18 +9545,32 @@ async def delete_gym_coach(coach_id: int, request: Request):
     
     try:
         # Check if coach exists and belongs to this gym
-        cursor.execute("SELECT id FROM coaches WHERE id = %s AND gym_id = %s", (coach_id, user["id"]))
-        if not cursor.fetchone():
+        cursor.execute("SELECT id, gym_id, status FROM coaches WHERE id = %s AND gym_id = %s", (coach_id, user["id"]))
+        before = cursor.fetchone()
+        if not before:
             raise HTTPException(status_code=404, detail="Coach not found")
         
+        # Members whose dashboards show this coach
+        cursor.execute("""
+            SELECT member_id FROM member_coach WHERE coach_id = %s
+            UNION SELECT member_id FROM sessions WHERE coach_id = %s
+        """, (coach_id, coach_id))
+        member_ids = [row["member_id"] for row in cursor.fetchall()]
+        
         # Delete related records first
         cursor.execute("DELETE FROM member_coach WHERE coach_id = %s", (coach_id,))
+        gym_stats.sessions_removed(cursor, "coach_id", coach_id)
         cursor.execute("DELETE FROM sessions WHERE coach_id = %s", (coach_id,))
         
         # Delete coach
         cursor.execute("DELETE FROM coaches WHERE id = %s AND gym_id = %s", (coach_id, user["id"]))
+        gym_stats.coach_removed(cursor, before)
         
         conn.commit()
+        cache_events.coach_written(user["id"], coach_id)
+        for member_id in member_ids:
+            cache_events.assignment_written(member_id, coach_id)
+        cache_events.sessions_written(user["id"], coach_id, member_ids)
         
         return {"message": "Coach deleted successfully"}
         
@@ -9383,7 +9579,7 @@ async def delete_gym_coach(coach_id: int, request: Request):
         raise he
     except Exception as e:
         conn.rollback()
-        print(f"Error deleting coach: {str(e)}")
+        logger.error("Error deleting coach: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
@@ -10085,13 +10281,13 @@ async def export_member_nutrition(
 ):
     """Export member nutrition data to Excel"""
     try:
-        print(f"Export member nutrition called with current_user: {current_user}")  # Debug log
+        logger.debug("Export member nutrition called with current_user: %s", current_user)
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
         # Get member ID from current user
         member_id = current_user.get('id')  # Changed from 'user_id' to 'id'
-        print(f"Member ID: {member_id}")  # Debug log
+        logger.debug("Member ID: %s", member_id)
         
         query = """
         SELECT 
@@ -10111,28 +10307,28 @@ async def export_member_nutrition(
         ORDER BY nl.created_at DESC, nl.meal_type
         """
         
-        print(f"Executing query with member_id: {member_id}")  # Debug log
+        logger.debug("Executing query with member_id: %s", member_id)
         cursor.execute(query, [member_id])
         entries = cursor.fetchall()
-        print(f"Found {len(entries)} nutrition entries")  # Debug log
+        logger.debug("Found %s nutrition entries", len(entries))
         
         if not entries:
             # Create empty DataFrame with the same columns
             df = pd.DataFrame(columns=['entry_date', 'meal_type', 'food_name', 'quantity', 'unit', 'calories', 'protein', 'carbs', 'fat', 'notes'])
-            print("Created empty DataFrame")  # Debug log
+            logger.debug("Created empty DataFrame")
         else:
             df = pd.DataFrame(entries)
-            print(f"Created DataFrame with {len(df)} rows")  # Debug log
+            logger.debug("Created DataFrame with %s rows", len(df))
         
         # Create Excel file in memory
-        print("Creating Excel file...")  # Debug log
+        logger.debug("Creating Excel file...")
         output = io.BytesIO()
         try:
             with pd.ExcelWriter(output, engine='openpyxl') as writer:
                 df.to_excel(writer, sheet_name='My Nutrition', index=False)
-            print("Excel file created successfully")  # Debug log
+            logger.debug("Excel file created successfully")
         except Exception as e:
-            print(f"Error creating Excel file: {str(e)}")  # Debug log
+            logger.error("Error creating Excel file: %s", e)
             raise
         
         output.seek(0)
@@ -10145,10 +10341,7 @@ async def export_member_nutrition(
         )
         
     except Exception as e:
-        print(f"Export failed with error: {str(e)}")  # Debug log
-        print(f"Error type: {type(e)}")  # Debug log
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")  # Debug log
+        logger.exception("Export failed with error: %s", e)
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
     finally:
         if 'conn' in locals():
@@ -10161,13 +10354,13 @@ async def export_coach_dashboard(
 ):
     """Export coach dashboard data to Excel"""
     try:
-        print(f"Export dashboard called with current_user: {current_user}")  # Debug log
+        logger.debug("Export dashboard called with current_user: %s", current_user)
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
         # Get coach ID from current user
         coach_id = current_user.get('id')  # Changed from 'user_id' to 'id'
-        print(f"Coach ID: {coach_id}")  # Debug log
+        logger.debug("Coach ID: %s", coach_id)
         
         # Get recent sessions
         query = """
@@ -10186,29 +10379,29 @@ async def export_coach_dashboard(
         LIMIT 50
         """
         
-        print(f"Executing query with coach_id: {coach_id}")  # Debug log
+        logger.debug("Executing query with coach_id: %s", coach_id)
         cursor.execute(query, [coach_id])
         sessions = cursor.fetchall()
-        print(f"Found {len(sessions)} sessions")  # Debug log
+        logger.debug("Found %s sessions", len(sessions))
         
         # Convert to DataFrame
         if not sessions:
             # Create empty DataFrame with the same columns
             df = pd.DataFrame(columns=['member_name', 'member_email', 'session_date', 'session_time', 'workout_type', 'status', 'duration'])
-            print("Created empty DataFrame")  # Debug log
+            logger.debug("Created empty DataFrame")
         else:
             df = pd.DataFrame(sessions)
-            print(f"Created DataFrame with {len(df)} rows")  # Debug log
+            logger.debug("Created DataFrame with %s rows", len(df))
         
         # Create Excel file in memory
-        print("Creating Excel file...")  # Debug log
+        logger.debug("Creating Excel file...")
         output = io.BytesIO()
         try:
             with pd.ExcelWriter(output, engine='openpyxl') as writer:
                 df.to_excel(writer, sheet_name='Coach Dashboard', index=False)
-            print("Excel file created successfully")  # Debug log
+            logger.debug("Excel file created successfully")
         except Exception as e:
-            print(f"Error creating Excel file: {str(e)}")  # Debug log
+            logger.error("Error creating Excel file: %s", e)
             raise
         
         output.seek(0)
@@ -10221,10 +10414,7 @@ async def export_coach_dashboard(
         )
         
     except Exception as e:
-        print(f"Export failed with error: {str(e)}")  # Debug log
-        print(f"Error type: {type(e)}")  # Debug log
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")  # Debug log
+        logger.exception("Export failed with error: %s", e)
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
     finally:
         if 'conn' in locals():
@@ -10421,7 +10611,7 @@ async def export_gym_analytics(
 async def test_export():
     """Test export functionality without authentication"""
     try:
-        print("Test export called")  # Debug log
+        logger.debug("Test export called")
         conn = get_db_connection()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
         
@@ -10447,7 +10637,7 @@ async def test_export():
         )
         
     except Exception as e:
-        print(f"Test export error: {str(e)}")  # Debug log
+        logger.error("Test export error: %s", e)
         raise HTTPException(status_code=500, detail=f"Test export failed: {str(e)}")
     finally:
         if 'conn' in locals():
@@ -10544,6 +10734,61 @@ async def debug_members():
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@app.get("/api/debug/db-pool")
+async def debug_db_pool():
+    """Debug endpoint exposing connection pool metrics"""
+    return {"success": True, "pools": pool_stats(), "max_concurrency": DB_MAX_CONCURRENCY}
+
+@app.get("/api/debug/sessions")
+async def debug_sessions():
+    """Debug endpoint exposing session store backend and counters"""
+    return {"success": True, "sessions": session_store.stats()}
+
+@app.get("/api/debug/logging")
+async def debug_logging():
+    """Debug endpoint exposing log levels, queue depth and dropped/sampled record counts"""
+    return {"success": True, "logging": logging_stats()}
+
+@app.get("/api/debug/query-report")
+async def debug_query_report(format: str = "json", limit: int = 20):
+    """Slow queries, N+1 statements and N+1 API calls seen since startup (or the last reset)"""
+    report = query_profiler.report(limit)
+    if format == "text":
+        return PlainTextResponse(format_report(report))
+    return {"success": True, "report": report}
+
+@app.post("/api/debug/query-report/reset")
+async def reset_query_report():
+    query_profiler.reset()
+    return {"success": True}
+
+@app.get("/api/debug/http-client")
+async def debug_http_client():
+    """Debug endpoint exposing shared HTTP client counters"""
+    return {"success": True, "http_client": http_client.http_stats()}
+
+@app.get("/api/debug/nutrition-cache")
+async def debug_nutrition_cache():
+    """Debug endpoint exposing USDA nutrition cache hit/miss counters"""
+    return {"success": True, "nutrition_cache": nutrition_cache.stats()}
+
+@app.get("/api/debug/gym-stats")
+async def debug_gym_stats():
+    """Debug endpoint exposing gym statistics rebuild/drift counters"""
+    return {"success": True, "gym_stats": gym_stats.stats()}
+
+@app.get("/api/debug/response-cache")
+async def debug_response_cache():
+    """Debug endpoint exposing dashboard response cache hit/invalidation counters"""
+    return {"success": True, "response_cache": response_cache.stats()}
+
+@app.get("/api/debug/workout-classifier")
+async def debug_workout_classifier():
+    """Debug endpoint exposing classifier batching throughput and latency histograms"""
+    if inference_client.remote_inference_enabled():
+        return {"success": True, "inference_servers": inference_client.inference_servers()}
+    return {"success": True, "workout_classifier": workout_batcher.stats()}
+
 @app.get("/api/debug/nutrition-table")
 async def debug_nutrition_table():
     """Debug endpoint to check nutrition_logs table structure"""
@@ -10570,6 +10815,8 @@ async def debug_nutrition_table():
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+record_import_time(time.perf_counter() - _api_import_started)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000) 
\ No newline at end of file
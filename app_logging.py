@@ -0,0 +1,167 @@
+"""
+Application Logging
+Leveled logging for the API and its helpers. Records that pass the level
+check have their message merged with its arguments in the calling thread
+(QueueHandler.prepare, so arguments changed later can't alter the line)
+and go on a bounded queue; a listener thread adds the timestamp and level,
+renders text or JSON and writes it, so request handlers never block on
+stdout. Levels can be set per module, and DEBUG output can be sampled to
+keep it affordable under load.
+
+Usage:
+    from app_logging import get_logger
+    logger = get_logger(__name__)
+    logger.debug("Stats result: %s", stats)   # formatted only if DEBUG is enabled
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+# Logging settings
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")                  # per-module overrides, e.g. "api=DEBUG,http_client=WARNING"
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")              # "text" or "json"
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "1.0"))  # fraction of DEBUG records kept
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))  # records buffered before new ones are dropped
+
+# Third-party loggers that are too chatty at INFO (LOG_LEVELS can still override them)
+_DEFAULT_MODULE_LEVELS = {"httpx": "WARNING", "httpcore": "WARNING"}
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+_setup_lock = threading.Lock()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DebugSampler(logging.Filter):
+    """Keeps roughly `rate` of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        if random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are included as keys"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: str = LOG_LEVEL, module_levels: str = LOG_LEVELS, fmt: str = LOG_FORMAT):
+    """Route the root logger through the queue (idempotent; called by api.py and inference_server.py)"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler(sys.stdout)
+        if fmt == "json":
+            stream.setFormatter(JSONFormatter())
+        else:
+            stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+        _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE_RATE))
+
+        root = logging.getLogger()
+        root.handlers = [_queue_handler]
+        root.setLevel(level.upper())
+        for name, module_level in {**_DEFAULT_MODULE_LEVELS, **_parse_levels(module_levels)}.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    # Modules run as scripts still log under their own name
+    if name == "__main__":
+        name = os.path.splitext(os.path.basename(sys.argv[0]))[0] or name
+    return logging.getLogger(name)
+
+
+def logging_stats() -> Dict:
+    if _queue_handler is None:
+        return {"configured": False}
+    sampler = next(f for f in _queue_handler.filters if isinstance(f, DebugSampler))
+    return {
+        "configured": True,
+        "level": logging.getLevelName(logging.getLogger().level),
+        "module_levels": _parse_levels(LOG_LEVELS),
+        "format": LOG_FORMAT,
+        "queue_depth": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "debug_sample_rate": sampler.rate,
+        "debug_sampled_out": sampler.sampled_out,
+    }
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Availability Masks
+Date-based availability as bitmasks: one availability_days row per user and
+day instead of one availability_slots row per hour.
+
+- hours_set:       bit h is set when hour h has an explicit entry
+- hours_available: bit h tells whether that entry is available
+
+Hours without an entry count as available, as they did with
+availability_slots (deleting a slot marked the hour available again). The
+/api/availability endpoints keep their JSON shapes ({hour: is_available}
+for the hours with entries) as a view on top of the masks.
+
+Weekly free_days windows become 168-bit week masks (bit day * 24 + hour,
+Monday = 0). Masks are plain Python ints, so intersecting or merging the
+availability of any number of users is a single bitwise operation per user
+over the whole day or week. The coach overlap search ranks a whole roster
+that way server-side (see overlap_members / overlap_windows).
+
+Usage:
+    python availability.py migrate     # copy availability_slots rows into availability_days (once)
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+from functools import reduce
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from scheduling import DAYS_OF_WEEK, to_minutes
+
+HOURS_PER_DAY = 24
+FULL_DAY = (1 << HOURS_PER_DAY) - 1
+FULL_WEEK = (1 << (7 * HOURS_PER_DAY)) - 1
+
+OVERLAP_MAX_DAYS = int(os.environ.get("AVAILABILITY_OVERLAP_MAX_DAYS", "62"))  # longest overlap search range
+
+DayMasks = Tuple[int, int]  # (hours_set, hours_available)
+
+
+def ensure_availability_tables(cursor):
+    """Create availability_days if it does not exist (also done by seed_database.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS availability_days (
+            user_id INT NOT NULL,
+            user_type ENUM('coach', 'member') NOT NULL,
+            date DATE NOT NULL,
+            hours_set INT UNSIGNED NOT NULL DEFAULT 0,
+            hours_available INT UNSIGNED NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, user_type, date),
+            INDEX idx_type_date (user_type, date)
+        )
+    """)
+
+
+def _table_exists(cursor, table: str) -> bool:
+    cursor.execute("SHOW TABLES LIKE %s", (table,))
+    return cursor.fetchone() is not None
+
+
+def migrate_availability_slots(cursor) -> int:
+    """
+    Fold availability_slots rows into availability_days, once.
+
+    The slot table is renamed to availability_slots_migrated afterwards (or
+    dropped if that backup already exists), so running this again, as every
+    seed_database.py run does, can't bring back hours cleared since.
+    Returns the number of user-days copied; days already present are kept.
+    """
+    if not _table_exists(cursor, "availability_slots"):
+        return 0
+    cursor.execute("""
+        INSERT IGNORE INTO availability_days (user_id, user_type, date, hours_set, hours_available)
+        SELECT user_id, user_type, date,
+               BIT_OR(1 << hour),
+               BIT_OR(IF(is_available, 1 << hour, 0))
+        FROM availability_slots
+        GROUP BY user_id, user_type, date
+    """)
+    days = cursor.rowcount
+    if _table_exists(cursor, "availability_slots_migrated"):
+        cursor.execute("DROP TABLE availability_slots")
+    else:
+        cursor.execute("RENAME TABLE availability_slots TO availability_slots_migrated")
+    return days
+
+
+# Mask arithmetic
+
+def hours_mask(start_hour: int, end_hour: int) -> int:
+    """Bits start_hour..end_hour, inclusive (clamped to the day)"""
+    start_hour, end_hour = max(start_hour, 0), min(end_hour, HOURS_PER_DAY - 1)
+    if end_hour < start_hour:
+        return 0
+    return ((1 << (end_hour - start_hour + 1)) - 1) << start_hour
+
+
+def mask_hours(mask: int) -> List[int]:
+    hours = []
+    while mask:
+        low = mask & -mask
+        hours.append(low.bit_length() - 1)
+        mask ^= low
+    return hours
+
+
+def free_mask(masks: DayMasks) -> int:
+    """Hours of a day that count as available (no entry, or an available one)"""
+    hours_set, hours_available = masks
+    return (FULL_DAY & ~hours_set) | hours_available
+
+
+def day_view(masks: DayMasks) -> Dict[int, bool]:
+    """The {hour: is_available} shape the API has always returned for a day"""
+    hours_set, hours_available = masks
+    return {hour: bool(hours_available >> hour & 1) for hour in mask_hours(hours_set)}
+
+
+def intersect(masks: Iterable[int], full: int = FULL_DAY) -> int:
+    return reduce(lambda a, b: a & b, masks, full)
+
+
+def union(masks: Iterable[int]) -> int:
+    return reduce(lambda a, b: a | b, masks, 0)
+
+
+def week_mask(free_days: Iterable[Dict]) -> int:
+    """168-bit mask of the whole hours covered by weekly free_days rows"""
+    mask = 0
+    for row in free_days:
+        if not row["is_available"]:
+            continue
+        first = -(-to_minutes(row["start_time"]) // 60)
+        last = to_minutes(row["end_time"]) // 60 - 1
+        mask |= hours_mask(first, last) << (DAYS_OF_WEEK.index(row["day_of_week"]) * HOURS_PER_DAY)
+    return mask
+
+
+def week_day(mask: int, weekday: int) -> int:
+    """The 24-bit day out of a week mask"""
+    return mask >> (weekday * HOURS_PER_DAY) & FULL_DAY
+
+
+def effective_days(days: Dict[date, DayMasks], weekly: int, dates: Sequence[date]) -> List[int]:
+    """
+    Available hours of each date: the date's own entries where it has them,
+    the weekly free_days pattern for the other hours (as the coach pages show it)
+    """
+    result = []
+    for day in dates:
+        hours_set, hours_available = days.get(day, (0, 0))
+        result.append(week_day(weekly, day.weekday()) & ~hours_set | hours_available)
+    return result
+
+
+def overlap_members(coach: Sequence[int], members: Dict[int, Sequence[int]], window: int = FULL_DAY) -> List[Tuple[int, int]]:
+    """(member_id, shared hours) for every member, most shared first (ties by id)"""
+    ranked = [
+        (member_id, sum((c & m & window).bit_count() for c, m in zip(coach, days)))
+        for member_id, days in members.items()
+    ]
+    ranked.sort(key=lambda item: (-item[1], item[0]))
+    return ranked
+
+
+def overlap_windows(coach: Sequence[int], members: Dict[int, Sequence[int]], window: int = FULL_DAY) -> List[Tuple[int, int, List[int]]]:
+    """
+    (date index, hour, member ids free then) for every hour the coach is free,
+    most members first, then chronological
+    """
+    slots = []
+    for index, coach_day in enumerate(coach):
+        for hour in mask_hours(coach_day & window):
+            bit = 1 << hour
+            slots.append((index, hour, [member_id for member_id, days in members.items() if days[index] & bit]))
+    slots.sort(key=lambda slot: (-len(slot[2]), slot[0], slot[1]))
+    return slots
+
+
+# Storage
+
+def load_days(cursor, user_ids: List[int], user_type: str, start_date, end_date) -> Dict[int, Dict[date, DayMasks]]:
+    """user_id -> date -> (hours_set, hours_available), one row per user and day"""
+    if not user_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"""
+        SELECT user_id, date, hours_set, hours_available
+        FROM availability_days
+        WHERE user_id IN ({placeholders}) AND user_type = %s AND date BETWEEN %s AND %s
+        ORDER BY user_id, date
+    """, list(user_ids) + [user_type, start_date, end_date])
+    days: Dict[int, Dict[date, DayMasks]] = {}
+    for row in cursor.fetchall():
+        days.setdefault(row["user_id"], {})[row["date"]] = (row["hours_set"], row["hours_available"])
+    return days
+
+
+def load_week_masks(cursor, user_ids: List[int], user_type: str) -> Dict[int, int]:
+    """user_id -> week mask of their free_days rows (0 for users without any)"""
+    if not user_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"""
+        SELECT user_id, day_of_week, is_available, start_time, end_time
+        FROM free_days
+        WHERE user_id IN ({placeholders}) AND user_type = %s
+    """, list(user_ids) + [user_type])
+    rows: Dict[int, List[Dict]] = {}
+    for row in cursor.fetchall():
+        rows.setdefault(row["user_id"], []).append(row)
+    return {user_id: week_mask(rows.get(user_id, ())) for user_id in user_ids}
+
+
+def set_hours(cursor, user_id: int, user_type: str, dates: Iterable, mask: int, is_available: bool) -> int:
+    """Give the hours in mask an explicit entry on every date, in one multi-row statement"""
+    available = mask if is_available else 0
+    rows = [(user_id, user_type, day, mask, available) for day in dates]
+    if not rows or not mask:
+        return 0
+    # Assignments run left to right, so hours_available is computed before hours_set changes
+    return cursor.executemany("""
+        INSERT INTO availability_days (user_id, user_type, date, hours_set, hours_available)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            hours_available = (hours_available & ~VALUES(hours_set)) | VALUES(hours_available),
+            hours_set = hours_set | VALUES(hours_set)
+    """, rows)
+
+
+def clear_hours(cursor, user_id: int, user_type: str, day, mask: int):
+    """Remove the entries for the hours in mask (they count as available again)"""
+    cursor.execute("""
+        UPDATE availability_days
+        SET hours_set = hours_set & ~%s, hours_available = hours_available & ~%s
+        WHERE user_id = %s AND user_type = %s AND date = %s
+    """, (mask, mask, user_id, user_type, day))
+    cursor.execute("""
+        DELETE FROM availability_days
+        WHERE user_id = %s AND user_type = %s AND date = %s AND hours_set = 0
+    """, (user_id, user_type, day))
+
+
+def date_range(start_date: date, end_date: date) -> List[date]:
+    return [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+
+
+def main():
+    if sys.argv[1:] != ["migrate"]:
+        print(__doc__)
+        sys.exit(1)
+    from db_pool import create_raw_connection
+    connection = create_raw_connection()
+    try:
+        cursor = connection.cursor()
+        ensure_availability_tables(cursor)
+        days = migrate_availability_slots(cursor)
+        connection.commit()
+        print(f"Migrated {days} user-days from availability_slots")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Non-blocking Route Execution
+Runs async route handlers, together with the blocking pymysql calls inside
+them, on a bounded pool of worker threads so a slow query never stalls the
+event loop that serves every other request.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+
+from db_pool import DB_POOL_SIZE
+
+# Max number of handlers running database work at the same time per worker.
+# Defaults to the pool size so offloaded handlers never queue on the pool.
+DB_MAX_CONCURRENCY = int(os.environ.get("DB_MAX_CONCURRENCY", str(DB_POOL_SIZE)))
+
+_executor = None
+_executor_lock = threading.Lock()
+_thread_state = threading.local()
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get (or lazily create) the bounded executor used for database work"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=DB_MAX_CONCURRENCY,
+                    thread_name_prefix="db-worker",
+                )
+    return _executor
+
+
+def shutdown_db_executor():
+    """Stop the executor (used on application shutdown)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    """Each worker thread keeps one private event loop for the coroutines it runs"""
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _thread_state.loop = loop
+    return loop
+
+
+def _run_on_worker_loop(coro: Coroutine) -> Any:
+    return _worker_loop().run_until_complete(coro)
+
+
+def on_db_worker() -> bool:
+    """True when called from code already running on a database worker thread"""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return running is getattr(_thread_state, "loop", None)
+
+
+async def run_in_db_executor(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function on the database executor and await its result"""
+    if on_db_worker():
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_db_executor(), call)
+
+
+async def run_coroutine_offloaded(coro: Coroutine) -> Any:
+    """Drive a coroutine to completion on a database worker thread"""
+    if on_db_worker():
+        return await coro
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_db_executor(), ctx.run, _run_on_worker_loop, coro)
+
+
+def offload(endpoint: Callable) -> Callable:
+    """Wrap an async endpoint so its body runs on the database executor"""
+    @functools.wraps(endpoint)
+    async def offloaded_endpoint(*args, **kwargs):
+        return await run_coroutine_offloaded(endpoint(*args, **kwargs))
+    offloaded_endpoint._offloaded = True
+    return offloaded_endpoint
+
+
+def stay_on_event_loop(endpoint: Callable) -> Callable:
+    """
+    Mark an async endpoint that does no blocking work so OffloadedRoute leaves
+    it on the event loop (apply below the @app.get/@app.post decorator).
+    """
+    endpoint._stay_on_event_loop = True
+    return endpoint
+
+
+class OffloadedRoute(APIRoute):
+    """
+    APIRoute that runs async endpoints on the database executor.
+
+    The request body is read on the event loop before the endpoint is
+    dispatched, because the worker thread's loop cannot await the server's
+    receive channel. Handlers can keep using `await request.json()` and
+    `await file.read()` unchanged.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        self.offloaded = (
+            asyncio.iscoroutinefunction(endpoint)
+            and not getattr(endpoint, "_stay_on_event_loop", False)
+            and not getattr(endpoint, "_offloaded", False)
+        )
+        if self.offloaded:
+            endpoint = offload(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not self.offloaded:
+            return handler
+
+        async def buffered_body_handler(request: Request):
+            await request.body()
+            return await handler(request)
+
+        return buffered_body_handler
@@ -0,0 +1,395 @@
+"""
+Database Connection Pool
+Bounded, thread-safe pool of pymysql connections shared by api.py and seed_database.py.
+"""
+
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import pymysql
+import pymysql.cursors
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+
+def get_db_config() -> Dict:
+    """Connection settings shared by every database user in the project"""
+    return {
+        "host": os.environ.get("DB_HOST", "localhost"),
+        "port": int(os.environ.get("DB_PORT", "3306")),
+        "user": os.environ.get("DB_USER", "root"),
+        "password": os.environ.get("DB_PASSWORD", "omaromar"),
+        "database": os.environ.get("DB_NAME", "trainer_app"),
+        "cursorclass": pymysql.cursors.DictCursor,
+    }
+
+
+def create_raw_connection(**overrides) -> pymysql.connections.Connection:
+    """Open a new, unpooled connection using the shared configuration"""
+    config = get_db_config()
+    config.update(overrides)
+    return pymysql.connect(**config)
+
+
+# Pool settings
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))            # seconds to wait for a free connection
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", "300"))  # close connections idle longer than this
+DB_POOL_PING_INTERVAL = float(os.environ.get("DB_POOL_PING_INTERVAL", "30"))  # ping idle connections before reuse
+
+
+# Called as listener(sql, params, seconds, error) after every statement run on a pooled cursor
+_query_listeners: List[Callable] = []
+
+
+def add_query_listener(listener: Callable):
+    """Register a callback for statements executed through pooled connections (see metrics.py)"""
+    if listener not in _query_listeners:
+        _query_listeners.append(listener)
+
+
+def remove_query_listener(listener: Callable):
+    if listener in _query_listeners:
+        _query_listeners.remove(listener)
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute()/executemany() and reports to the query listeners"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def _run(self, method, query, args):
+        started = time.perf_counter()
+        error = None
+        try:
+            return method(query, args)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            for listener in list(_query_listeners):
+                try:
+                    listener(query, args, elapsed, error)
+                except Exception:
+                    pass  # instrumentation must never fail the query
+
+    def execute(self, query, args=None):
+        return self._run(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._run(self._cursor.executemany, query, args)
+
+
+class PoolTimeoutError(pymysql.err.OperationalError):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class _IdleConnection:
+    __slots__ = ("raw", "returned_at")
+
+    def __init__(self, raw, returned_at: float):
+        self.raw = raw
+        self.returned_at = returned_at
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled pymysql connection.
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool instead of closing the socket. A connection
+    that is dropped without close() is reclaimed when the proxy is garbage
+    collected, so handlers that bail out early cannot drain the pool.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw):
+        self._pool = pool
+        self._raw = raw
+        self._finalizer = weakref.finalize(self, pool._reclaim, raw)
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise pymysql.err.InterfaceError(0, "Connection already returned to the pool")
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise pymysql.err.InterfaceError(0, "Connection already returned to the pool")
+        cursor = raw.cursor(*args, **kwargs)
+        return InstrumentedCursor(cursor) if _query_listeners else cursor
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        if self._raw is None:
+            return
+        self._finalizer.detach()
+        raw, self._raw = self._raw, None
+        self._pool._release(raw)
+
+    @property
+    def open(self) -> bool:
+        return self._raw is not None and self._raw.open
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _close_quietly(raws: List):
+    for raw in raws:
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections.
+
+    Connections are checked out with get_connection() and returned with
+    close() on the returned proxy. Idle connections are pinged before reuse
+    once they have been idle for ping_interval seconds, and closed once they
+    have been idle for idle_timeout seconds.
+    """
+
+    def __init__(
+        self,
+        name: str = "default",
+        max_size: int = DB_POOL_SIZE,
+        checkout_timeout: float = DB_POOL_TIMEOUT,
+        idle_timeout: float = DB_POOL_IDLE_TIMEOUT,
+        ping_interval: float = DB_POOL_PING_INTERVAL,
+        connect: Callable = create_raw_connection,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.name = name
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self._connect = connect
+        self._idle = deque()
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "returns": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "evicted_idle": 0,
+            "reclaimed": 0,
+            "peak_in_use": 0,
+        }
+
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, waiting up to timeout seconds for one to free up"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited_since = None
+
+        evicted = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise pymysql.err.InterfaceError(0, f"Connection pool '{self.name}' is closed")
+                    evicted.extend(self._evict_idle_locked())
+                    if self._idle:
+                        entry = self._idle.pop()  # LIFO keeps the warmest connections busy
+                        break
+                    if self._in_use < self.max_size:
+                        entry = None
+                        break
+                    if waited_since is None:
+                        waited_since = time.monotonic()
+                        self._stats["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            2003, f"Timed out after {timeout}s waiting for a connection from pool '{self.name}'"
+                        )
+                    self._cond.wait(remaining)
+
+                # Reserve the slot before doing any I/O outside the lock
+                self._in_use += 1
+                self._stats["checkouts"] += 1
+                self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+                if waited_since is not None:
+                    self._stats["wait_time_total"] += time.monotonic() - waited_since
+        finally:
+            # Socket closes are I/O: never done while other checkouts wait on the lock
+            _close_quietly(evicted)
+
+        try:
+            raw = self._prepare(entry)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw)
+
+    def _prepare(self, entry: Optional[_IdleConnection]):
+        """Health-check a reused connection, or open a new one"""
+        if entry is not None:
+            if time.monotonic() - entry.returned_at < self.ping_interval:
+                return entry.raw
+            try:
+                entry.raw.ping(reconnect=False)
+                return entry.raw
+            except Exception:
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                self._close_raw(entry.raw)
+        raw = self._connect()
+        with self._cond:
+            self._stats["created"] += 1
+        return raw
+
+    def _release(self, raw):
+        """Put a connection back into the idle set (or drop it if unusable)"""
+        reusable = False
+        if raw.open:
+            try:
+                # End any transaction the caller left open so the next user
+                # starts from a clean snapshot
+                raw.rollback()
+                reusable = True
+            except Exception:
+                reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            self._stats["returns"] += 1
+            if reusable and not self._closed:
+                self._idle.append(_IdleConnection(raw, time.monotonic()))
+                raw = None
+            self._cond.notify()
+        if raw is not None:
+            self._close_raw(raw)
+
+    def _reclaim(self, raw):
+        """Finalizer callback for proxies that were never closed"""
+        with self._cond:
+            self._stats["reclaimed"] += 1
+        self._release(raw)
+
+    def _evict_idle_locked(self) -> List:
+        """Take connections idle longer than idle_timeout out of the pool; the caller closes them unlocked"""
+        if not self._idle:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = []
+        # The deque is ordered oldest-returned first
+        while self._idle and self._idle[0].returned_at < cutoff:
+            evicted.append(self._idle.popleft().raw)
+        self._stats["evicted_idle"] += len(evicted)
+        self._stats["closed"] += len(evicted)
+        return evicted
+
+    def evict_idle(self) -> int:
+        """Close connections that have been idle longer than idle_timeout"""
+        with self._cond:
+            evicted = self._evict_idle_locked()
+        _close_quietly(evicted)
+        return len(evicted)
+
+    def _close_raw(self, raw):
+        with self._cond:
+            self._stats["closed"] += 1
+        _close_quietly([raw])
+
+    def close_all(self):
+        """Close idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = [entry.raw for entry in self._idle]
+            self._idle.clear()
+            self._stats["closed"] += len(idle)
+            self._cond.notify_all()
+        _close_quietly(idle)
+
+    def stats(self) -> Dict:
+        """Snapshot of pool metrics"""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "name": self.name,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "closed_pool": self._closed,
+            })
+        snapshot["avg_wait_ms"] = (
+            round(snapshot["wait_time_total"] / snapshot["waits"] * 1000, 2) if snapshot["waits"] else 0.0
+        )
+        return snapshot
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str = "default") -> ConnectionPool:
+    """Get (or lazily create) the named process-wide pool"""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ConnectionPool(name=name)
+                _pools[name] = pool
+    return pool
+
+
+def get_db_connection() -> PooledConnection:
+    """Check out a connection from the default pool; close() returns it"""
+    return get_pool().get_connection()
+
+
+def pool_stats() -> Dict[str, Dict]:
+    """Metrics for every pool created in this process"""
+    return {name: pool.stats() for name, pool in list(_pools.items())}
+
+
+def close_all_pools():
+    """Close every pool (used on application shutdown)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
@@ -4,11 +4,9 @@ Food Detection Module using YOLOv5
 Integrates with existing FastAPI backend for food item detection and classification.
 """
 
+import importlib.util
 import os
 import sys
-import cv2
-import torch
-import numpy as np
 from PIL import Image
 import io
 import base64
@@ -16,15 +14,18 @@ from typing import List, Dict, Optional, Tuple
 import json
 from pathlib import Path
 
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
 # Add the current directory to Python path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
-    print("Warning: Ultralytics YOLO not available. Install with: pip install ultralytics")
+# torch, cv2 and ultralytics are imported when a detector is created, not on
+# import, so loading the API routes stays fast
+YOLO_AVAILABLE = importlib.util.find_spec("ultralytics") is not None
+if not YOLO_AVAILABLE:
+    logger.warning("Ultralytics YOLO not available. Install with: pip install ultralytics")
 
 class FoodDetector:
     """
@@ -39,6 +40,8 @@ class FoodDetector:
             model_path: Path to YOLO model or model name
             confidence_threshold: Minimum confidence for detections
         """
+        import torch
+        
         self.confidence_threshold = confidence_threshold
         self.model = None
         self.model_path = model_path
@@ -127,19 +130,20 @@ class FoodDetector:
             if not YOLO_AVAILABLE:
                 raise ImportError("Ultralytics YOLO not available")
             
-            print(f"Loading YOLO model: {self.model_path}")
-            print(f"Current working directory: {os.getcwd()}")
-            print(f"Model file exists: {os.path.exists(self.model_path)}")
+            logger.info("Loading YOLO model: %s", self.model_path)
+            logger.debug("Current working directory: %s", os.getcwd())
+            logger.debug("Model file exists: %s", os.path.exists(self.model_path))
             
             # Load the actual YOLO model
+            from ultralytics import YOLO
             self.model = YOLO(self.model_path)
-            print(f"✅ YOLO model loaded successfully on device: {self.device}")
+            logger.info("✅ YOLO model loaded successfully on device: %s", self.device)
             
         except Exception as e:
-            print(f"Error loading YOLO model: {e}")
+            logger.error("Error loading YOLO model: %s", e)
             import traceback
             traceback.print_exc()
-            print("Falling back to PyTorch Hub YOLOv5")
+            logger.warning("Falling back to PyTorch Hub YOLOv5")
             self.load_pytorch_hub_model()
     
 
@@ -153,27 +157,27 @@ class FoodDetector:
             self.model.eval()
             if torch.cuda.is_available():
                 self.model.cuda()
-            print("PyTorch Hub YOLOv5 model loaded successfully")
+            logger.info("PyTorch Hub YOLOv5 model loaded successfully")
         except Exception as e:
-            print(f"Error loading PyTorch Hub model: {e}")
+            logger.error("Error loading PyTorch Hub model: %s", e)
             # Try with trust_repo parameter
             try:
                 self.model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True, trust_repo=True)
                 self.model.eval()
                 if torch.cuda.is_available():
                     self.model.cuda()
-                print("PyTorch Hub YOLOv5 model loaded successfully (with trust_repo)")
+                logger.info("PyTorch Hub YOLOv5 model loaded successfully (with trust_repo)")
             except Exception as e2:
-                print(f"Error loading PyTorch Hub model (with trust_repo): {e2}")
+                logger.error("Error loading PyTorch Hub model (with trust_repo): %s", e2)
                 # Try force reload
                 try:
                     self.model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True, force_reload=True)
                     self.model.eval()
                     if torch.cuda.is_available():
                         self.model.cuda()
-                    print("PyTorch Hub YOLOv5 model loaded successfully (force reload)")
+                    logger.info("PyTorch Hub YOLOv5 model loaded successfully (force reload)")
                 except Exception as e3:
-                    print(f"Error loading PyTorch Hub model (force reload): {e3}")
+                    logger.error("Error loading PyTorch Hub model (force reload): %s", e3)
                     self.model = None
     
     def is_food_item(self, class_id: int, class_name: str) -> bool:
@@ -202,16 +206,20 @@ class FoodDetector:
         class_name_lower = class_name.lower()
         return any(keyword in class_name_lower for keyword in food_keywords)
     
-    def detect_food(self, image_data: bytes) -> Dict:
+    def detect_food(self, image_data: bytes, confidence_threshold: Optional[float] = None) -> Dict:
         """
         Detect food items in image
         
         Args:
             image_data: Image bytes
+            confidence_threshold: Per-call override of the detector's threshold
             
         Returns:
             Dict with detection results
         """
+        if confidence_threshold is None:
+            confidence_threshold = self.confidence_threshold
+        
         if self.model is None:
             return {
                 "error": "Model not loaded",
@@ -225,12 +233,11 @@ class FoodDetector:
             # Run inference
             if hasattr(self.model, 'predict'):
                 # Ultralytics YOLO
-                results = self.model.predict(image, conf=self.confidence_threshold)
-                detections = self._process_ultralytics_results(results)
+                results = self.model.predict(image, conf=confidence_threshold)
+                detections = self._process_ultralytics_results(results, confidence_threshold)
             elif hasattr(self.model, '__call__'):
                 # PyTorch Hub YOLOv5
-                results = self.model(image)
-                detections = self._process_pytorch_hub_results(image)
+                detections = self._process_pytorch_hub_results(image, confidence_threshold)
             else:
                 detections = []
             
@@ -247,7 +254,7 @@ class FoodDetector:
                 "detections": []
             }
     
-    def _process_ultralytics_results(self, results) -> List[Dict]:
+    def _process_ultralytics_results(self, results, confidence_threshold: float) -> List[Dict]:
         """Process Ultralytics YOLO results"""
         detections = []
         
@@ -256,7 +263,7 @@ class FoodDetector:
                 boxes = result.boxes
                 if hasattr(boxes, 'xyxy') and boxes.xyxy is not None:
                     for i, (box, conf, cls) in enumerate(zip(boxes.xyxy, boxes.conf, boxes.cls)):
-                        if conf >= self.confidence_threshold:
+                        if conf >= confidence_threshold:
                             class_id = int(cls.item())
                             class_name = self.food_classes.get(class_id, f"class_{class_id}")
                             is_food = self.is_food_item(class_id, class_name)
@@ -279,7 +286,7 @@ class FoodDetector:
     
 
     
-    def _process_pytorch_hub_results(self, image) -> List[Dict]:
+    def _process_pytorch_hub_results(self, image, confidence_threshold: float) -> List[Dict]:
         """Process PyTorch Hub YOLOv5 results"""
         detections = []
         
@@ -289,7 +296,7 @@ class FoodDetector:
             
             for pred in predictions:
                 x1, y1, x2, y2, conf, cls = pred
-                if conf >= self.confidence_threshold:
+                if conf >= confidence_threshold:
                     class_id = int(cls.item())
                     class_name = self.food_classes.get(class_id, f"class_{class_id}")
                     is_food = self.is_food_item(class_id, class_name)
@@ -309,11 +316,12 @@ class FoodDetector:
                     detections.append(detection)
         
         except Exception as e:
-            print(f"Error processing PyTorch Hub results: {e}")
+            logger.error("Error processing PyTorch Hub results: %s", e)
         
         return detections
     
-    def save_annotated_image(self, image_data: bytes, detections: List[Dict], output_path: str) -> str:
+    @staticmethod
+    def save_annotated_image(image_data: bytes, detections: List[Dict], output_path: str) -> str:
         """
         Save image with bounding boxes drawn
         
@@ -326,6 +334,9 @@ class FoodDetector:
             str: Path to saved image
         """
         try:
+            import cv2
+            import numpy as np
+            
             # Convert bytes to OpenCV image
             nparr = np.frombuffer(image_data, np.uint8)
             img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
@@ -348,7 +359,7 @@ class FoodDetector:
             return output_path
             
         except Exception as e:
-            print(f"Error saving annotated image: {e}")
+            logger.error("Error saving annotated image: %s", e)
             return ""
 
 def main():
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+USDA FoodData Central Bulk Importer
+Streams FoodData Central CSV or JSON dumps into the food_items table and
+provides the local full-text search used by the nutrition endpoints.
+
+Usage:
+    python food_import.py --csv-dir FoodData_Central_csv_2024-04-18
+    python food_import.py --json FoodData_Central_foundation_food_json_2024-04-18.json
+    python food_import.py --csv-dir ... --data-types foundation_food,sr_legacy_food --batch-size 10000
+
+Rows are read one at a time and written in multi-row batches, so memory
+stays bounded by --batch-size no matter how large the dump is. Nutrients
+and branded-food details are merged through temporary staging tables and
+applied with a single set-based UPDATE at the end.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+
+from db_pool import create_raw_connection
+
+DEFAULT_BATCH_SIZE = 5000
+
+# FDC nutrient ids (nutrient.csv "id") and their legacy SR numbers
+NUTRIENT_COLUMNS = {
+    1008: "calories_per_100g",  # Energy (kcal)
+    2047: "atwater_kcal",       # Energy (Atwater General Factors), Foundation foods only
+    2048: "atwater_kcal",       # Energy (Atwater Specific Factors), Foundation foods only
+    1003: "protein_per_100g",
+    1005: "carbs_per_100g",
+    1004: "fat_per_100g",
+    1079: "fiber_per_100g",
+    2000: "sugar_per_100g",
+    1093: "sodium_per_100g",
+}
+LEGACY_NUTRIENT_NUMBERS = {
+    "208": 1008, "203": 1003, "205": 1005, "204": 1004,
+    "291": 1079, "269": 2000, "307": 1093,
+}
+NUTRIENT_FIELDS = ["calories_per_100g", "protein_per_100g", "carbs_per_100g", "fat_per_100g",
+                   "fiber_per_100g", "sugar_per_100g", "sodium_per_100g"]
+
+# CSV data_type values worth serving to members; the rest are lab sub-samples
+DEFAULT_DATA_TYPES = ["foundation_food", "sr_legacy_food", "survey_fndds_food", "branded_food"]
+JSON_DATA_TYPES = {
+    "Foundation": "foundation_food",
+    "SR Legacy": "sr_legacy_food",
+    "Survey (FNDDS)": "survey_fndds_food",
+    "Branded": "branded_food",
+}
+# Generic foods rank above branded products in search results, like the USDA API does
+PREFERRED_DATA_TYPES = ("foundation_food", "sr_legacy_food")
+
+
+# Schema
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute("""
+        SELECT COUNT(*) AS n FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()["n"] > 0
+
+
+def _index_exists(cursor, table: str, index: str) -> bool:
+    cursor.execute("""
+        SELECT COUNT(*) AS n FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cursor.fetchone()["n"] > 0
+
+
+def ensure_food_items_schema(cursor):
+    """Add the USDA columns and search indexes to food_items tables created before they existed"""
+    if not _column_exists(cursor, "food_items", "fdc_id"):
+        cursor.execute("ALTER TABLE food_items ADD COLUMN fdc_id INT NULL AFTER id")
+    if not _column_exists(cursor, "food_items", "data_type"):
+        cursor.execute("ALTER TABLE food_items ADD COLUMN data_type VARCHAR(30) NULL AFTER category")
+    cursor.execute("""
+        ALTER TABLE food_items MODIFY source
+        ENUM('OpenFoodFacts', 'Manual', 'AI_Generated', 'USDA') DEFAULT 'Manual'
+    """)
+    if not _index_exists(cursor, "food_items", "idx_fdc_id"):
+        cursor.execute("ALTER TABLE food_items ADD UNIQUE INDEX idx_fdc_id (fdc_id)")
+    if not _index_exists(cursor, "food_items", "ft_name"):
+        cursor.execute("ALTER TABLE food_items ADD FULLTEXT INDEX ft_name (name)")
+
+
+# Readers
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _iter_csv(path: str) -> Iterator[Dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _open_csv(csv_dir: str, name: str) -> Optional[Iterator[Dict]]:
+    path = os.path.join(csv_dir, name)
+    if not os.path.exists(path):
+        return None
+    return _iter_csv(path)
+
+
+_ITEM_SEPARATOR = re.compile(r"[ \t\r\n,]*")
+
+
+def iter_json_array_items(path: str, chunk_size: int = 1 << 20) -> Iterator[Dict]:
+    """
+    Yield the elements of the top-level food array in an FDC JSON dump
+    (e.g. {"FoundationFoods": [...]}) without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = ""
+        # Skip to the opening bracket of the first array
+        while "[" not in buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buffer += chunk
+        buffer = buffer[buffer.index("[") + 1:]
+        # Items are decoded in place at `pos`; the consumed prefix is only
+        # dropped when the next chunk is appended, so each byte is copied once
+        # per chunk rather than once per item
+        pos = 0
+        eof = False
+        while True:
+            pos = _ITEM_SEPARATOR.match(buffer, pos).end()
+            if pos < len(buffer):
+                if buffer[pos] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield item
+                    pos = end
+                    continue
+            elif eof:
+                raise json.JSONDecodeError("Unterminated array", buffer, pos)
+            # At least double a pending partial item, so one larger than a chunk
+            # is re-decoded a logarithmic number of times, not once per chunk
+            chunk = f.read(max(chunk_size, len(buffer) - pos))
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def _json_food_row(food: Dict) -> Optional[Dict]:
+    data_type = JSON_DATA_TYPES.get(food.get("dataType"), food.get("dataType"))
+    category = food.get("foodCategory") or food.get("brandedFoodCategory") or ""
+    if isinstance(category, dict):
+        category = category.get("description", "")
+    row = {
+        "fdc_id": food.get("fdcId"),
+        "name": (food.get("description") or "").strip()[:200],
+        "brand": (food.get("brandOwner") or food.get("brandName") or "")[:100] or None,
+        "barcode": (food.get("gtinUpc") or "")[:50] or None,
+        "category": (category or "")[:100] or None,
+        "data_type": data_type,
+    }
+    if not row["fdc_id"] or not row["name"]:
+        return None
+    nutrients = {}
+    for nutrient in food.get("foodNutrients", []):
+        info = nutrient.get("nutrient", {})
+        nutrient_id = info.get("id") or LEGACY_NUTRIENT_NUMBERS.get(str(info.get("number", "")))
+        column = NUTRIENT_COLUMNS.get(nutrient_id)
+        amount = _to_float(nutrient.get("amount"))
+        if column and amount is not None:
+            nutrients[column] = amount
+    for field in NUTRIENT_FIELDS:
+        row[field] = nutrients.get(field)
+    # Foundation foods often only report Atwater energy
+    if row["calories_per_100g"] is None:
+        row["calories_per_100g"] = nutrients.get("atwater_kcal")
+    return row
+
+
+# Writers
+
+FOOD_INSERT_COLUMNS = ["fdc_id", "name", "brand", "barcode", "category", "data_type"] + NUTRIENT_FIELDS
+
+
+class FoodImporter:
+    """Batched writer for food_items and its staging tables"""
+
+    def __init__(self, connection, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.batch_size = batch_size
+        self.counts = {"foods": 0, "nutrients": 0, "branded": 0, "skipped": 0}
+
+    def _flush(self, sql: str, rows: List[tuple]):
+        if rows:
+            self.cursor.executemany(sql, rows)
+            self.connection.commit()
+            rows.clear()
+
+    def import_foods(self, rows: Iterator[Dict], with_nutrients: bool):
+        """Upsert food rows; nutrient columns are only written when with_nutrients is set"""
+        columns = FOOD_INSERT_COLUMNS if with_nutrients else FOOD_INSERT_COLUMNS[:6]
+        updates = ", ".join(f"{c} = VALUES({c})" for c in columns if c != "fdc_id")
+        value_columns = columns + ([] if with_nutrients else ["calories_per_100g"]) + ["source"]
+        # Every value is a placeholder so pymysql can rewrite executemany() into one multi-row INSERT
+        sql = (
+            f"INSERT INTO food_items ({', '.join(value_columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(value_columns))}) "
+            f"ON DUPLICATE KEY UPDATE {updates}"
+        )
+        batch = []
+        for row in rows:
+            if row is None:
+                self.counts["skipped"] += 1
+                continue
+            # Nutrient columns are NOT NULL / default 0 in food_items
+            values = [row.get(c) if c not in NUTRIENT_FIELDS else (row.get(c) or 0) for c in columns]
+            if not with_nutrients:
+                values.append(0)
+            values.append("USDA")
+            batch.append(tuple(values))
+            self.counts["foods"] += 1
+            if len(batch) >= self.batch_size:
+                self._flush(sql, batch)
+                print(f"  {self.counts['foods']} foods written")
+        self._flush(sql, batch)
+
+    def stage_nutrients(self, rows: Iterator[Dict]):
+        """Collect the nutrients we keep into a staging table keyed by fdc_id"""
+        self.cursor.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS fdc_nutrient_stage (
+                fdc_id INT PRIMARY KEY,
+                calories_per_100g DECIMAL(9,2), atwater_kcal DECIMAL(9,2), protein_per_100g DECIMAL(9,2),
+                carbs_per_100g DECIMAL(9,2), fat_per_100g DECIMAL(9,2),
+                fiber_per_100g DECIMAL(9,2), sugar_per_100g DECIMAL(9,2),
+                sodium_per_100g DECIMAL(9,2)
+            )
+        """)
+        staged_columns = NUTRIENT_FIELDS + ["atwater_kcal"]
+        sql_by_column = {
+            column: (
+                f"INSERT INTO fdc_nutrient_stage (fdc_id, {column}) VALUES (%s, %s) "
+                f"ON DUPLICATE KEY UPDATE {column} = VALUES({column})"
+            )
+            for column in staged_columns
+        }
+        batches = {column: [] for column in staged_columns}
+        for row in rows:
+            nutrient_id = int(row["nutrient_id"]) if row.get("nutrient_id", "").isdigit() else None
+            column = NUTRIENT_COLUMNS.get(nutrient_id)
+            amount = _to_float(row.get("amount"))
+            if not column or amount is None:
+                continue
+            batches[column].append((int(row["fdc_id"]), amount))
+            self.counts["nutrients"] += 1
+            if len(batches[column]) >= self.batch_size:
+                self._flush(sql_by_column[column], batches[column])
+                if self.counts["nutrients"] % (self.batch_size * 20) == 0:
+                    print(f"  {self.counts['nutrients']} nutrient values staged")
+        for column, batch in batches.items():
+            self._flush(sql_by_column[column], batch)
+
+        # Prefer plain kcal, falling back to Atwater energy when that is all we have
+        assignments = ", ".join(
+            f"f.{c} = COALESCE(s.{c}, s.atwater_kcal, f.{c})" if c == "calories_per_100g"
+            else f"f.{c} = COALESCE(s.{c}, f.{c})"
+            for c in NUTRIENT_FIELDS
+        )
+        self.cursor.execute(f"""
+            UPDATE food_items f JOIN fdc_nutrient_stage s ON f.fdc_id = s.fdc_id
+            SET {assignments}
+        """)
+        self.connection.commit()
+        self.cursor.execute("DROP TEMPORARY TABLE fdc_nutrient_stage")
+
+    def stage_branded(self, rows: Iterator[Dict]):
+        """Merge brand owner and barcode from branded_food.csv"""
+        self.cursor.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS fdc_branded_stage (
+                fdc_id INT PRIMARY KEY,
+                brand VARCHAR(100),
+                barcode VARCHAR(50),
+                category VARCHAR(100)
+            )
+        """)
+        sql = (
+            "INSERT INTO fdc_branded_stage (fdc_id, brand, barcode, category) VALUES (%s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE brand = VALUES(brand), barcode = VALUES(barcode), category = VALUES(category)"
+        )
+        batch = []
+        for row in rows:
+            batch.append((
+                int(row["fdc_id"]),
+                (row.get("brand_owner") or row.get("brand_name") or "")[:100] or None,
+                (row.get("gtin_upc") or "")[:50] or None,
+                (row.get("branded_food_category") or "")[:100] or None,
+            ))
+            self.counts["branded"] += 1
+            if len(batch) >= self.batch_size:
+                self._flush(sql, batch)
+        self._flush(sql, batch)
+        self.cursor.execute("""
+            UPDATE food_items f JOIN fdc_branded_stage s ON f.fdc_id = s.fdc_id
+            SET f.brand = s.brand, f.barcode = s.barcode, f.category = COALESCE(s.category, f.category)
+        """)
+        self.connection.commit()
+        self.cursor.execute("DROP TEMPORARY TABLE fdc_branded_stage")
+
+
+def import_csv_dir(importer: FoodImporter, csv_dir: str, data_types: List[str]):
+    categories = {}
+    category_rows = _open_csv(csv_dir, "food_category.csv")
+    if category_rows is not None:
+        categories = {row["id"]: row["description"] for row in category_rows}
+
+    food_rows = _open_csv(csv_dir, "food.csv")
+    if food_rows is None:
+        raise FileNotFoundError(f"food.csv not found in {csv_dir}")
+
+    def foods():
+        for row in food_rows:
+            if data_types and row.get("data_type") not in data_types:
+                continue
+            name = (row.get("description") or "").strip()[:200]
+            if not name:
+                yield None
+                continue
+            yield {
+                "fdc_id": int(row["fdc_id"]),
+                "name": name,
+                "brand": None,
+                "barcode": None,
+                "category": (categories.get(row.get("food_category_id")) or "")[:100] or None,
+                "data_type": row.get("data_type"),
+            }
+
+    print("Importing foods...")
+    importer.import_foods(foods(), with_nutrients=False)
+
+    branded_rows = _open_csv(csv_dir, "branded_food.csv")
+    if branded_rows is not None and (not data_types or "branded_food" in data_types):
+        print("Merging branded food details...")
+        importer.stage_branded(branded_rows)
+
+    nutrient_rows = _open_csv(csv_dir, "food_nutrient.csv")
+    if nutrient_rows is not None:
+        print("Merging nutrients...")
+        importer.stage_nutrients(nutrient_rows)
+
+
+def import_json_file(importer: FoodImporter, path: str, data_types: List[str]):
+    def foods():
+        for food in iter_json_array_items(path):
+            row = _json_food_row(food)
+            if row is not None and data_types and row["data_type"] not in data_types:
+                continue
+            yield row
+
+    print("Importing foods...")
+    importer.import_foods(foods(), with_nutrients=True)
+
+
+# Local search used by api.py
+
+def _fulltext_terms(query: str) -> str:
+    """Turn 'Chicken breast' into '+chicken* +breast*' for a boolean prefix match"""
+    tokens = re.findall(r"[a-z0-9]+", query.lower())
+    return " ".join(f"+{token}*" for token in tokens if len(token) >= 3)
+
+
+def _like_prefix(query: str) -> str:
+    """LIKE pattern matching names that start with query, with % and _ taken literally (ESCAPE '!')"""
+    escaped = query.strip().replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return escaped + "%"
+
+
+def search_local_foods(cursor, query: str, limit: int = 10) -> List[Dict]:
+    """
+    Search imported foods by name.
+
+    Uses the ft_name FULLTEXT index for word-prefix matches and falls back to
+    a name prefix scan on idx_name for queries made only of short words.
+    Returns the same shape as api.search_usda_foods.
+    """
+    terms = _fulltext_terms(query)
+    preferred = ", ".join(["%s"] * len(PREFERRED_DATA_TYPES))
+    if terms:
+        cursor.execute(f"""
+            SELECT fdc_id, name, brand, category, data_type,
+                   MATCH(name) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM food_items
+            WHERE fdc_id IS NOT NULL AND MATCH(name) AGAINST (%s IN BOOLEAN MODE)
+            ORDER BY data_type IN ({preferred}) DESC, score DESC, CHAR_LENGTH(name)
+            LIMIT %s
+        """, (terms, terms, *PREFERRED_DATA_TYPES, limit))
+    else:
+        cursor.execute(f"""
+            SELECT fdc_id, name, brand, category, data_type
+            FROM food_items
+            WHERE fdc_id IS NOT NULL AND name LIKE %s ESCAPE '!'
+            ORDER BY data_type IN ({preferred}) DESC, CHAR_LENGTH(name)
+            LIMIT %s
+        """, (_like_prefix(query), *PREFERRED_DATA_TYPES, limit))
+    return [
+        {
+            "fdc_id": row["fdc_id"],
+            "name": row["name"],
+            "brand": row["brand"] or "",
+            "category": row["category"] or "",
+            "data_type": row["data_type"] or "",
+            "published_date": "",
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def get_local_food_nutrition(cursor, fdc_id: int) -> Optional[Dict]:
+    """Nutrition for an imported food, in the same shape as api.get_usda_food_details"""
+    cursor.execute("""
+        SELECT fdc_id, name, brand, category, calories_per_100g, protein_per_100g,
+               carbs_per_100g, fat_per_100g, fiber_per_100g, sugar_per_100g, sodium_per_100g
+        FROM food_items
+        WHERE fdc_id = %s
+    """, (fdc_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        "fdc_id": row["fdc_id"],
+        "name": row["name"],
+        "brand": row["brand"] or "",
+        "category": row["category"] or "",
+        "serving_size": 100,
+        "calories": int(round(float(row["calories_per_100g"] or 0))),
+        "protein": int(round(float(row["protein_per_100g"] or 0))),
+        "carbs": int(round(float(row["carbs_per_100g"] or 0))),
+        "fat": int(round(float(row["fat_per_100g"] or 0))),
+        "fiber": int(round(float(row["fiber_per_100g"] or 0))),
+        "sugar": int(round(float(row["sugar_per_100g"] or 0))),
+        "sodium": int(round(float(row["sodium_per_100g"] or 0))),
+        "vitamin_c": 0,
+        "calcium": 0,
+        "iron": 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import USDA FoodData Central dumps into food_items")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv-dir", help="Directory of an extracted FDC CSV download")
+    source.add_argument("--json", help="FDC JSON download (Foundation, SR Legacy, Survey or Branded)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per INSERT batch")
+    parser.add_argument("--data-types", default=",".join(DEFAULT_DATA_TYPES),
+                        help="Comma-separated FDC data types to keep (empty for all)")
+    args = parser.parse_args()
+
+    data_types = [t.strip() for t in args.data_types.split(",") if t.strip()]
+    connection = create_raw_connection()
+    started = time.time()
+    try:
+        importer = FoodImporter(connection, batch_size=args.batch_size)
+        ensure_food_items_schema(importer.cursor)
+        if args.csv_dir:
+            import_csv_dir(importer, args.csv_dir, data_types)
+        else:
+            import_json_file(importer, args.json, data_types)
+        print(f"Import finished in {time.time() - started:.1f}s: {importer.counts}")
+    except Exception as e:
+        print(f"Import failed: {e}")
+        connection.rollback()
+        sys.exit(1)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
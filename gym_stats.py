@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+"""
+Gym Statistics
+Per-gym counters behind /api/gym/dashboard and /api/gym/reports, kept up to
+date by the write paths instead of being aggregated from members and
+sessions on every page load.
+
+- gym_stats:             member counts by membership type, active coaches
+- gym_member_joins:      members joined per gym, day and membership type
+- gym_session_daily:     sessions per gym and session date, by status
+- coach_session_daily:   sessions per coach and session date
+- session_pair_activity: latest session date per coach and member, for the
+                         "distinct members/coaches in the last 30 days" figures
+
+Day buckets keep the sliding windows (today, last 30 days) exact while a
+report reads at most a few dozen rows. Write hooks run on the handler's
+cursor, inside its transaction; a failing hook is logged and never fails
+the write. A gym's rows are built from the base tables when the
+reconciliation job starts (for gyms that have none), in the background
+after a read finds them missing, and by the periodic reconciliation job,
+which also corrects any drift (bulk loads, manual SQL). Rebuilds read the
+base tables without locking them.
+
+Usage:
+    python gym_stats.py rebuild             # rebuild every gym
+    python gym_stats.py rebuild --gym 3
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pymysql
+
+from db_pool import get_pool
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+GYM_STATS_RECONCILE_INTERVAL = float(os.environ.get("GYM_STATS_RECONCILE_INTERVAL", "3600"))  # seconds, 0 disables
+GYM_STATS_WINDOW_DAYS = 30
+
+MYSQL_DEADLOCK = 1213
+
+# What the dashboard has always counted as monthly revenue per member
+# (renewal payments use MEMBERSHIP_PRICES in api.py)
+MEMBERSHIP_FEES = {"Basic": 50.00, "Premium": 100.00, "VIP": 150.00}
+MEMBERSHIP_COLUMNS = {"Basic": "basic_members", "Premium": "premium_members", "VIP": "vip_members"}
+
+_stats = {"hook_errors": 0, "rebuilds": 0, "drifted": 0, "last_reconcile": None}
+_reconciler: Optional[threading.Thread] = None
+_stop = threading.Event()
+_pending_rebuilds = set()
+_pending_lock = threading.Lock()
+
+
+def ensure_gym_stats_tables(cursor):
+    """Create the statistics tables if they do not exist (also done by seed_database.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS gym_stats (
+            gym_id INT PRIMARY KEY,
+            total_members INT NOT NULL DEFAULT 0,
+            basic_members INT NOT NULL DEFAULT 0,
+            premium_members INT NOT NULL DEFAULT 0,
+            vip_members INT NOT NULL DEFAULT 0,
+            active_coaches INT NOT NULL DEFAULT 0,
+            reconciled_at DATETIME NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS gym_member_joins (
+            gym_id INT NOT NULL,
+            join_date DATE NOT NULL,
+            membership_type VARCHAR(20) NOT NULL,
+            members INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (gym_id, join_date, membership_type)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS gym_session_daily (
+            gym_id INT NOT NULL,
+            session_date DATE NOT NULL,
+            total_sessions INT NOT NULL DEFAULT 0,
+            completed_sessions INT NOT NULL DEFAULT 0,
+            cancelled_sessions INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (gym_id, session_date)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS coach_session_daily (
+            gym_id INT NOT NULL,
+            coach_id INT NOT NULL,
+            session_date DATE NOT NULL,
+            total_sessions INT NOT NULL DEFAULT 0,
+            completed_sessions INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (gym_id, coach_id, session_date),
+            INDEX idx_coach (coach_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS session_pair_activity (
+            gym_id INT NOT NULL,
+            coach_id INT NOT NULL,
+            member_id INT NOT NULL,
+            last_session_date DATE NOT NULL,
+            PRIMARY KEY (gym_id, coach_id, member_id),
+            INDEX idx_gym_last (gym_id, last_session_date),
+            INDEX idx_coach (coach_id),
+            INDEX idx_member (member_id)
+        )
+    """)
+
+
+def _status(value: Optional[str]) -> str:
+    # update_session_status writes lowercase values; the ENUM stores them capitalized
+    return (value or "Scheduled").capitalize()
+
+
+# Snapshots of the rows the hooks need, read on the handler's cursor
+
+def load_member(cursor, member_id: int) -> Optional[Dict]:
+    cursor.execute("SELECT id, gym_id, membership_type, join_date FROM members WHERE id = %s", (member_id,))
+    return cursor.fetchone()
+
+
+def load_coach(cursor, coach_id: int) -> Optional[Dict]:
+    cursor.execute("SELECT id, gym_id, status FROM coaches WHERE id = %s", (coach_id,))
+    return cursor.fetchone()
+
+
+def load_session(cursor, session_id: int) -> Optional[Dict]:
+    cursor.execute(
+        "SELECT id, gym_id, coach_id, member_id, session_date, status FROM sessions WHERE id = %s", (session_id,))
+    return cursor.fetchone()
+
+
+# Incremental updates
+
+def _apply_member(cursor, member: Dict, sign: int):
+    column = MEMBERSHIP_COLUMNS.get(member["membership_type"])
+    type_update = f", {column} = {column} + %s" if column else ""
+    cursor.execute(
+        f"UPDATE gym_stats SET total_members = total_members + %s{type_update} WHERE gym_id = %s",
+        (sign, sign, member["gym_id"]) if column else (sign, member["gym_id"]),
+    )
+    if member.get("join_date") is not None:
+        cursor.execute("""
+            INSERT INTO gym_member_joins (gym_id, join_date, membership_type, members) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE members = members + VALUES(members)
+        """, (member["gym_id"], member["join_date"], member["membership_type"], sign))
+
+
+def _apply_coach(cursor, coach: Dict, sign: int):
+    if coach["status"] == "Active":
+        cursor.execute("UPDATE gym_stats SET active_coaches = active_coaches + %s WHERE gym_id = %s",
+                       (sign, coach["gym_id"]))
+
+
+def _apply_session(cursor, session: Dict, sign: int):
+    status = _status(session["status"])
+    completed = sign if status == "Completed" else 0
+    cancelled = sign if status == "Cancelled" else 0
+    cursor.execute("""
+        INSERT INTO gym_session_daily (gym_id, session_date, total_sessions, completed_sessions, cancelled_sessions)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_sessions = total_sessions + VALUES(total_sessions),
+            completed_sessions = completed_sessions + VALUES(completed_sessions),
+            cancelled_sessions = cancelled_sessions + VALUES(cancelled_sessions)
+    """, (session["gym_id"], session["session_date"], sign, completed, cancelled))
+    cursor.execute("""
+        INSERT INTO coach_session_daily (gym_id, coach_id, session_date, total_sessions, completed_sessions)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_sessions = total_sessions + VALUES(total_sessions),
+            completed_sessions = completed_sessions + VALUES(completed_sessions)
+    """, (session["gym_id"], session["coach_id"], session["session_date"], sign, completed))
+
+
+def _touch_pair(cursor, session: Dict):
+    cursor.execute("""
+        INSERT INTO session_pair_activity (gym_id, coach_id, member_id, last_session_date) VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_session_date = GREATEST(last_session_date, VALUES(last_session_date))
+    """, (session["gym_id"], session["coach_id"], session["member_id"], session["session_date"]))
+
+
+def _refresh_pair(cursor, gym_id: int, coach_id: int, member_id: int):
+    """Recompute a pair's latest session date after one of its sessions moved or went away"""
+    cursor.execute(
+        "SELECT MAX(session_date) AS last_date FROM sessions WHERE gym_id = %s AND coach_id = %s AND member_id = %s",
+        (gym_id, coach_id, member_id),
+    )
+    last_date = cursor.fetchone()["last_date"]
+    if last_date is None:
+        cursor.execute("DELETE FROM session_pair_activity WHERE gym_id = %s AND coach_id = %s AND member_id = %s",
+                       (gym_id, coach_id, member_id))
+    else:
+        cursor.execute("""
+            INSERT INTO session_pair_activity (gym_id, coach_id, member_id, last_session_date) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE last_session_date = VALUES(last_session_date)
+        """, (gym_id, coach_id, member_id, last_date))
+
+
+def _hook(func):
+    """Stats must never fail a write: log, count, and leave the fix to reconciliation"""
+    def wrapper(*args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except pymysql.err.OperationalError as e:
+            # A deadlock has already rolled back the whole transaction; the write must fail too
+            if e.args and e.args[0] == MYSQL_DEADLOCK:
+                raise
+            _stats["hook_errors"] += 1
+            logger.error("Gym stats update %s failed (reconciliation will correct it): %s", func.__name__, e)
+        except Exception as e:
+            _stats["hook_errors"] += 1
+            logger.error("Gym stats update %s failed (reconciliation will correct it): %s", func.__name__, e)
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+@_hook
+def member_added(cursor, member_id: int):
+    """Call after inserting a member"""
+    member = load_member(cursor, member_id)
+    if member:
+        _apply_member(cursor, member, 1)
+
+
+@_hook
+def member_updated(cursor, before: Optional[Dict], member_id: int):
+    """Call after updating a member, with load_member() taken before the update"""
+    after = load_member(cursor, member_id)
+    if before and after and (before["membership_type"], before["gym_id"]) != (after["membership_type"], after["gym_id"]):
+        _apply_member(cursor, before, -1)
+        _apply_member(cursor, after, 1)
+
+
+@_hook
+def member_removed(cursor, before: Optional[Dict]):
+    """Call with load_member() taken before the delete (and after sessions_removed for its sessions)"""
+    if before:
+        _apply_member(cursor, before, -1)
+
+
+@_hook
+def coach_added(cursor, coach_id: int):
+    coach = load_coach(cursor, coach_id)
+    if coach:
+        _apply_coach(cursor, coach, 1)
+
+
+@_hook
+def coach_updated(cursor, before: Optional[Dict], coach_id: int):
+    after = load_coach(cursor, coach_id)
+    if before and after and (before["status"], before["gym_id"]) != (after["status"], after["gym_id"]):
+        _apply_coach(cursor, before, -1)
+        _apply_coach(cursor, after, 1)
+
+
+@_hook
+def coach_removed(cursor, before: Optional[Dict]):
+    if before:
+        _apply_coach(cursor, before, -1)
+
+
+@_hook
+def session_added(cursor, session_id: int):
+    """Call after inserting a session"""
+    session = load_session(cursor, session_id)
+    if session:
+        _apply_session(cursor, session, 1)
+        _touch_pair(cursor, session)
+
+
+@_hook
+def session_updated(cursor, before: Optional[Dict], session_id: int):
+    """Call after updating a session, with load_session() taken before the update"""
+    after = load_session(cursor, session_id)
+    if not before or not after:
+        return
+    keys = ("gym_id", "coach_id", "member_id", "session_date")
+    if [before[k] for k in keys] == [after[k] for k in keys] and _status(before["status"]) == _status(after["status"]):
+        return
+    _apply_session(cursor, before, -1)
+    _apply_session(cursor, after, 1)
+    if [before[k] for k in keys] != [after[k] for k in keys]:
+        _refresh_pair(cursor, before["gym_id"], before["coach_id"], before["member_id"])
+        _touch_pair(cursor, after)
+
+
+@_hook
+def sessions_removed(cursor, column: str, value: int):
+    """Call before deleting every session of a member or coach (column is "member_id" or "coach_id")"""
+    if column not in ("member_id", "coach_id"):
+        raise ValueError(f"Unsupported column {column}")
+    cursor.execute(f"""
+        UPDATE gym_session_daily d
+        JOIN (
+            SELECT gym_id, session_date, COUNT(*) AS total,
+                   SUM(status = 'Completed') AS completed, SUM(status = 'Cancelled') AS cancelled
+            FROM sessions WHERE {column} = %s GROUP BY gym_id, session_date
+        ) s ON s.gym_id = d.gym_id AND s.session_date = d.session_date
+        SET d.total_sessions = d.total_sessions - s.total,
+            d.completed_sessions = d.completed_sessions - s.completed,
+            d.cancelled_sessions = d.cancelled_sessions - s.cancelled
+    """, (value,))
+    cursor.execute(f"""
+        UPDATE coach_session_daily d
+        JOIN (
+            SELECT gym_id, coach_id, session_date, COUNT(*) AS total, SUM(status = 'Completed') AS completed
+            FROM sessions WHERE {column} = %s GROUP BY gym_id, coach_id, session_date
+        ) s ON s.gym_id = d.gym_id AND s.coach_id = d.coach_id AND s.session_date = d.session_date
+        SET d.total_sessions = d.total_sessions - s.total,
+            d.completed_sessions = d.completed_sessions - s.completed
+    """, (value,))
+    cursor.execute(f"DELETE FROM session_pair_activity WHERE {column} = %s", (value,))
+
+
+# Rebuild / reconciliation
+
+def _summary(cursor, gym_id: int) -> Optional[tuple]:
+    cursor.execute("SELECT total_members, basic_members, premium_members, vip_members, active_coaches "
+                   "FROM gym_stats WHERE gym_id = %s", (gym_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    cursor.execute("SELECT COALESCE(SUM(total_sessions), 0) AS total, COALESCE(SUM(completed_sessions), 0) AS done "
+                   "FROM gym_session_daily WHERE gym_id = %s", (gym_id,))
+    sessions = cursor.fetchone()
+    return tuple(row.values()) + (int(sessions["total"]), int(sessions["done"]))
+
+
+def _aggregate(cursor, gym_id: int) -> Dict[str, List[tuple]]:
+    """
+    The rows rebuild_gym() writes, computed with plain SELECTs. These are
+    consistent (non-locking) reads, unlike INSERT ... SELECT, which takes
+    shared next-key locks on every member and session row of the gym and
+    stalls bookings and status updates until the rebuild commits.
+    """
+    def rows(sql: str, params: tuple) -> List[tuple]:
+        cursor.execute(sql, params)
+        return [tuple(row.values()) for row in cursor.fetchall()]
+
+    return {
+        "gym_stats": rows("""
+            SELECT %s, COUNT(*), COALESCE(SUM(membership_type = 'Basic'), 0),
+                   COALESCE(SUM(membership_type = 'Premium'), 0), COALESCE(SUM(membership_type = 'VIP'), 0),
+                   (SELECT COUNT(*) FROM coaches WHERE gym_id = %s AND status = 'Active')
+            FROM members WHERE gym_id = %s
+        """, (gym_id, gym_id, gym_id)),
+        "gym_member_joins": rows("""
+            SELECT gym_id, join_date, membership_type, COUNT(*)
+            FROM members WHERE gym_id = %s AND join_date IS NOT NULL
+            GROUP BY gym_id, join_date, membership_type
+        """, (gym_id,)),
+        "gym_session_daily": rows("""
+            SELECT gym_id, session_date, COUNT(*), SUM(status = 'Completed'), SUM(status = 'Cancelled')
+            FROM sessions WHERE gym_id = %s
+            GROUP BY gym_id, session_date
+        """, (gym_id,)),
+        "coach_session_daily": rows("""
+            SELECT gym_id, coach_id, session_date, COUNT(*), SUM(status = 'Completed')
+            FROM sessions WHERE gym_id = %s
+            GROUP BY gym_id, coach_id, session_date
+        """, (gym_id,)),
+        "session_pair_activity": rows("""
+            SELECT gym_id, coach_id, member_id, MAX(session_date)
+            FROM sessions WHERE gym_id = %s
+            GROUP BY gym_id, coach_id, member_id
+        """, (gym_id,)),
+    }
+
+
+_REBUILD_INSERTS = {
+    "gym_stats": "INSERT INTO gym_stats (gym_id, total_members, basic_members, premium_members, vip_members, "
+                 "active_coaches, reconciled_at) VALUES (%s, %s, %s, %s, %s, %s, NOW())",
+    "gym_member_joins": "INSERT INTO gym_member_joins (gym_id, join_date, membership_type, members) "
+                        "VALUES (%s, %s, %s, %s)",
+    "gym_session_daily": "INSERT INTO gym_session_daily (gym_id, session_date, total_sessions, completed_sessions, "
+                         "cancelled_sessions) VALUES (%s, %s, %s, %s, %s)",
+    "coach_session_daily": "INSERT INTO coach_session_daily (gym_id, coach_id, session_date, total_sessions, "
+                           "completed_sessions) VALUES (%s, %s, %s, %s, %s)",
+    "session_pair_activity": "INSERT INTO session_pair_activity (gym_id, coach_id, member_id, last_session_date) "
+                             "VALUES (%s, %s, %s, %s)",
+}
+
+
+def rebuild_gym(cursor, gym_id: int) -> bool:
+    """
+    Recompute every statistics row of one gym from the base tables; returns
+    True if they had drifted. Only the statistics rows are locked: the base
+    tables are read without locks first, then the results are written.
+    """
+    before = _summary(cursor, gym_id)
+    rows = _aggregate(cursor, gym_id)
+    for table, insert in _REBUILD_INSERTS.items():
+        cursor.execute(f"DELETE FROM {table} WHERE gym_id = %s", (gym_id,))
+        if rows[table]:
+            cursor.executemany(insert, rows[table])
+    _stats["rebuilds"] += 1
+    drifted = before is not None and before != _summary(cursor, gym_id)
+    if drifted:
+        _stats["drifted"] += 1
+        logger.warning("Gym %s statistics had drifted and were rebuilt", gym_id)
+    return drifted
+
+
+def reconcile(gym_ids: Optional[List[int]] = None, missing_only: bool = False) -> Dict:
+    """
+    Rebuild the given gyms (all gyms by default, or with missing_only those
+    that have no statistics yet), one transaction per gym
+    """
+    started = time.time()
+    conn = get_pool().get_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            if gym_ids is None:
+                if missing_only:
+                    cursor.execute("SELECT g.id FROM gyms g LEFT JOIN gym_stats s ON s.gym_id = g.id "
+                                   "WHERE s.gym_id IS NULL ORDER BY g.id")
+                else:
+                    cursor.execute("SELECT id FROM gyms ORDER BY id")
+                gym_ids = [row["id"] for row in cursor.fetchall()]
+                conn.commit()  # each gym's rebuild reads from a fresh snapshot
+            drifted = []
+            for gym_id in gym_ids:
+                try:
+                    if rebuild_gym(cursor, gym_id):
+                        drifted.append(gym_id)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    logger.error("Rebuilding statistics of gym %s failed: %s", gym_id, e)
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+    _stats["last_reconcile"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    result = {"gyms": len(gym_ids), "drifted": drifted, "seconds": round(time.time() - started, 2)}
+    logger.info("Gym statistics reconciled: %s", result)
+    return result
+
+
+def ensure_tables():
+    """Create the tables on a pooled connection (called at API startup)"""
+    conn = get_pool().get_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            ensure_gym_stats_tables(cursor)
+            conn.commit()
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+
+
+def start_reconciler(interval: float = GYM_STATS_RECONCILE_INTERVAL):
+    global _reconciler
+    if interval <= 0 or (_reconciler is not None and _reconciler.is_alive()):
+        return
+    _stop.clear()
+
+    def run():
+        # Gyms that were never built get their rows now, so first reads don't find them empty
+        try:
+            reconcile(missing_only=True)
+        except Exception as e:
+            logger.error("Gym statistics reconciliation failed: %s", e)
+        while not _stop.wait(interval):
+            try:
+                reconcile()
+            except Exception as e:
+                logger.error("Gym statistics reconciliation failed: %s", e)
+
+    _reconciler = threading.Thread(target=run, name="gym-stats-reconciler", daemon=True)
+    _reconciler.start()
+
+
+def schedule_rebuild(gym_id: int):
+    """Rebuild one gym on a background thread (at most one pending rebuild per gym)"""
+    with _pending_lock:
+        if gym_id in _pending_rebuilds:
+            return
+        _pending_rebuilds.add(gym_id)
+
+    def run():
+        try:
+            reconcile([gym_id])
+        except Exception as e:
+            logger.error("Rebuilding statistics of gym %s failed: %s", gym_id, e)
+        finally:
+            with _pending_lock:
+                _pending_rebuilds.discard(gym_id)
+
+    threading.Thread(target=run, name=f"gym-stats-rebuild-{gym_id}", daemon=True).start()
+
+
+def stop_reconciler():
+    _stop.set()
+
+
+# Reads
+
+def _empty_row(gym_id: int) -> Dict:
+    return {"gym_id": gym_id, "total_members": 0, "basic_members": 0, "premium_members": 0,
+            "vip_members": 0, "active_coaches": 0, "reconciled_at": None}
+
+
+def _with_gym_stats(gym_id: int, read, conn=None):
+    """
+    Run read(cursor, row). Pass the caller's connection when it holds one,
+    so a request never waits on the pool for a second connection; otherwise
+    one is checked out. A gym without statistics yet (e.g. created since
+    startup) reads as empty while schedule_rebuild() builds its rows in the
+    background, off the request and its transaction.
+    """
+    own = conn is None
+    if own:
+        conn = get_pool().get_connection()
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT * FROM gym_stats WHERE gym_id = %s", (gym_id,))
+            row = cursor.fetchone()
+            if row is None:
+                schedule_rebuild(gym_id)
+                row = _empty_row(gym_id)
+            return read(cursor, row)
+        finally:
+            cursor.close()
+    finally:
+        if own:
+            conn.close()
+
+
+def _revenue(row: Dict) -> float:
+    return sum(row[column] * MEMBERSHIP_FEES[kind] for kind, column in MEMBERSHIP_COLUMNS.items())
+
+
+def dashboard_stats(gym_id: int, conn=None) -> Dict:
+    """The stats block of /api/gym/dashboard (on conn if given)"""
+    def read(cursor, row):
+        cursor.execute("SELECT total_sessions FROM gym_session_daily WHERE gym_id = %s AND session_date = CURDATE()",
+                       (gym_id,))
+        today = cursor.fetchone()
+        return {
+            "total_members": row["total_members"],
+            "active_coaches": row["active_coaches"],
+            "today_sessions": today["total_sessions"] if today else 0,
+            "monthly_revenue": _revenue(row),
+        }
+    return _with_gym_stats(gym_id, read, conn)
+
+
+def report_stats(gym_id: int, conn=None) -> Dict:
+    """membership_stats, session_stats, revenue_stats and coach_stats of /api/gym/reports (on conn if given)"""
+    window = (gym_id, GYM_STATS_WINDOW_DAYS)
+
+    def read(cursor, row):
+        cursor.execute("""
+            SELECT membership_type, SUM(members) AS new_members FROM gym_member_joins
+            WHERE gym_id = %s AND join_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+            GROUP BY membership_type
+        """, window)
+        joined = {r["membership_type"]: int(r["new_members"]) for r in cursor.fetchall()}
+        membership_stats = [
+            {"membership_type": kind, "count": row[column], "new_members": joined.get(kind, 0)}
+            for kind, column in MEMBERSHIP_COLUMNS.items() if row[column] > 0
+        ]
+
+        cursor.execute("""
+            SELECT COALESCE(SUM(total_sessions), 0) AS total_sessions,
+                   COALESCE(SUM(completed_sessions), 0) AS completed_sessions,
+                   COALESCE(SUM(cancelled_sessions), 0) AS cancelled_sessions
+            FROM gym_session_daily
+            WHERE gym_id = %s AND session_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        """, window)
+        session_stats = {key: int(value) for key, value in cursor.fetchone().items()}
+        cursor.execute("""
+            SELECT COUNT(DISTINCT member_id) AS active_members, COUNT(DISTINCT coach_id) AS active_coaches
+            FROM session_pair_activity
+            WHERE gym_id = %s AND last_session_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        """, window)
+        session_stats.update(cursor.fetchone())
+
+        cursor.execute("""
+            SELECT c.name AS coach_name,
+                   COALESCE(d.total_sessions, 0) AS total_sessions,
+                   COALESCE(d.completed_sessions, 0) AS completed_sessions,
+                   COALESCE(p.unique_members, 0) AS unique_members
+            FROM coaches c
+            LEFT JOIN (
+                SELECT coach_id, SUM(total_sessions) AS total_sessions, SUM(completed_sessions) AS completed_sessions
+                FROM coach_session_daily
+                WHERE gym_id = %s AND session_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+                GROUP BY coach_id
+            ) d ON d.coach_id = c.id
+            LEFT JOIN (
+                SELECT coach_id, COUNT(*) AS unique_members
+                FROM session_pair_activity
+                WHERE gym_id = %s AND last_session_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
+                GROUP BY coach_id
+            ) p ON p.coach_id = c.id
+            WHERE c.gym_id = %s
+            ORDER BY c.id
+        """, window + window + (gym_id,))
+        coach_stats = [
+            {key: int(value) if key != "coach_name" else value for key, value in coach.items()}
+            for coach in cursor.fetchall()
+        ]
+
+        return {
+            "membership_stats": membership_stats,
+            "session_stats": session_stats,
+            "revenue_stats": {
+                "monthly_revenue": _revenue(row),
+                "basic_members": row["basic_members"],
+                "premium_members": row["premium_members"],
+                "vip_members": row["vip_members"],
+            },
+            "coach_stats": coach_stats,
+        }
+    return _with_gym_stats(gym_id, read, conn)
+
+
+def stats() -> Dict:
+    snapshot = dict(_stats)
+    snapshot["reconcile_interval_seconds"] = GYM_STATS_RECONCILE_INTERVAL
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the precomputed gym statistics")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild")
+    rebuild.add_argument("--gym", type=int, action="append", help="gym id (repeatable; default all gyms)")
+    args = parser.parse_args()
+    ensure_tables()
+    result = reconcile(args.gym)
+    print(f"Rebuilt {result['gyms']} gym(s) in {result['seconds']}s; drifted: {result['drifted'] or 'none'}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Shared Async HTTP Client
+Process-wide httpx.AsyncClient for outbound calls (USDA FoodData Central,
+OpenRouter, Open Food Facts) with keep-alive connection pooling, per-host
+concurrency limits, timeouts and retry/backoff on 429.
+"""
+
+import asyncio
+import os
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import metrics
+
+# Client settings
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "10"))                  # default total timeout (seconds)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_MAX_PER_HOST = int(os.environ.get("HTTP_MAX_PER_HOST", "8"))           # concurrent requests per host
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", "0.5"))       # seconds, doubled per attempt
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "10"))
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+# Per-host overrides, e.g. DEMO_KEY on the USDA API is heavily rate limited
+HOST_LIMITS: Dict[str, int] = {
+    "api.nal.usda.gov": int(os.environ.get("HTTP_MAX_PER_HOST_USDA", "4")),
+}
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+_lock = threading.Lock()
+_stats = {"requests": 0, "retries": 0, "errors": 0}
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        headers={"User-Agent": "PowerFit/1.0"},
+    )
+
+
+async def start_http_client():
+    """Create the shared client on the application's event loop (call at startup)"""
+    global _client, _client_loop
+    with _lock:
+        if _client is None:
+            _client = _build_client()
+            _client_loop = asyncio.get_running_loop()
+
+
+async def close_http_client():
+    """Close the shared client and its pooled connections (call at shutdown)"""
+    global _client, _client_loop
+    with _lock:
+        client, _client, _client_loop = _client, None, None
+        _host_semaphores.clear()
+    if client is not None:
+        await client.aclose()
+
+
+def _host_semaphore(host: str) -> asyncio.Semaphore:
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(HOST_LIMITS.get(host, HTTP_MAX_PER_HOST))
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+
+def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """Honour Retry-After when present, otherwise exponential backoff with jitter"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), HTTP_BACKOFF_MAX)
+            except ValueError:
+                try:
+                    when = parsedate_to_datetime(retry_after)
+                    delta = (when - datetime.now(timezone.utc)).total_seconds()
+                    return min(max(delta, 0.0), HTTP_BACKOFF_MAX)
+                except (TypeError, ValueError):
+                    pass
+    delay = HTTP_BACKOFF_BASE * (2 ** attempt)
+    return min(delay, HTTP_BACKOFF_MAX) * (0.5 + random.random() / 2)
+
+
+async def _send(method: str, url: str, max_retries: int = HTTP_MAX_RETRIES, **kwargs) -> httpx.Response:
+    global _client, _client_loop
+    if _client is None:
+        # Scripts and tests that never ran the startup hook
+        with _lock:
+            if _client is None:
+                _client = _build_client()
+                _client_loop = asyncio.get_running_loop()
+
+    host = urlsplit(url).hostname or ""
+    async with _host_semaphore(host):
+        attempt = 0
+        while True:
+            _stats["requests"] += 1
+            try:
+                response = await _client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= max_retries:
+                    _stats["errors"] += 1
+                    raise
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+                await response.aclose()
+            _stats["retries"] += 1
+            await asyncio.sleep(_retry_delay(response, attempt))
+            attempt += 1
+
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared client.
+
+    Accepts the usual httpx arguments (params, json, headers, timeout, ...)
+    plus max_retries to override HTTP_MAX_RETRIES for this call.
+    Handlers running on a database worker loop (see db_offload.py) are
+    bridged onto the loop that owns the client, so every caller shares one
+    connection pool and one set of per-host limits.
+    """
+    loop = asyncio.get_running_loop()
+    with metrics.timed("external", urlsplit(url).hostname or ""):
+        if _client_loop is not None and loop is not _client_loop and _client_loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(_send(method, url, **kwargs), _client_loop)
+            return await asyncio.wrap_future(future)
+        return await _send(method, url, **kwargs)
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+
+def http_stats() -> Dict:
+    """Counters and per-host limits for the shared client"""
+    return {
+        **_stats,
+        "client_started": _client is not None,
+        "hosts": {
+            host: {"limit": HOST_LIMITS.get(host, HTTP_MAX_PER_HOST)}
+            for host in list(_host_semaphores)
+        },
+    }
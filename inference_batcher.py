@@ -0,0 +1,225 @@
+"""
+Micro-batching Inference Queue
+Collects single-item inference requests from concurrent handlers for a few
+milliseconds and runs them as one batched forward pass on a dedicated worker
+thread, resolving each caller's future with its own result.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Batching settings
+CLASSIFIER_MAX_BATCH_SIZE = int(os.environ.get("CLASSIFIER_MAX_BATCH_SIZE", "16"))
+CLASSIFIER_MAX_WAIT_MS = float(os.environ.get("CLASSIFIER_MAX_WAIT_MS", "10"))   # wait after the first item
+CLASSIFIER_QUEUE_SIZE = int(os.environ.get("CLASSIFIER_QUEUE_SIZE", "256"))      # pending items before rejecting
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the batcher already holds max_queue_size pending items"""
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts, Prometheus style)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "avg": round(total / count, 3) if count else 0.0,
+            "buckets": buckets,
+        }
+
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued_at")
+
+    def __init__(self, item: Any, future: Future, enqueued_at: float):
+        self.item = item
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class MicroBatcher:
+    """
+    Dynamic batching queue in front of a batch inference function.
+
+    batch_fn receives a list of items and must return a list of results in
+    the same order. A result that is an Exception instance is raised to that
+    item's caller only; an exception raised by batch_fn fails the whole batch.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        name: str = "batcher",
+        max_batch_size: int = CLASSIFIER_MAX_BATCH_SIZE,
+        max_wait_ms: float = CLASSIFIER_MAX_WAIT_MS,
+        max_queue_size: int = CLASSIFIER_QUEUE_SIZE,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._completed = deque(maxlen=10000)  # (finished_at, items) per batch for the throughput window
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "batches": 0}
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)     # submit -> result, per item
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)  # submit -> batch start, per item
+        self.inference_ms = Histogram(LATENCY_BUCKETS_MS)   # batch_fn duration, per batch
+        self.batch_size = Histogram([1, 2, 4, 8, 16, 32, 64])
+
+    def start(self):
+        """Start the worker thread (submit() starts it on first use)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Finish the items already queued, then stop the worker thread"""
+        with self._lock:
+            thread, self._stopped = self._thread, True
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass  # the worker sees _stopped once it has drained the queue
+            thread.join(timeout)
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item and return a future for its result"""
+        if self._stopped:
+            raise RuntimeError(f"Batcher '{self.name}' is stopped")
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait(_Pending(item, future, time.monotonic()))
+        except queue.Full:
+            self._stats["rejected"] += 1
+            raise QueueFullError(f"Batcher '{self.name}' queue is full")
+        self._stats["submitted"] += 1
+        return future
+
+    async def infer(self, item: Any) -> Any:
+        """Await the result for one item from any event loop"""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect(self, first: _Pending) -> List[_Pending]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                # Shutdown sentinel: run what we have, then let _run see it again
+                self._queue.put(None)
+                break
+            batch.append(pending)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            # Callers that gave up (cancelled futures) are dropped before inference
+            batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+            if batch:
+                self._run_batch(batch)
+            if self._stopped and self._queue.empty():
+                return
+
+    def _run_batch(self, batch: List[_Pending]):
+        started = time.monotonic()
+        for pending in batch:
+            self.queue_wait_ms.observe((started - pending.enqueued_at) * 1000)
+        try:
+            results = self.batch_fn([pending.item for pending in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error("Batch inference failed in '%s' (%s items): %s", self.name, len(batch), e)
+            results = [e] * len(batch)
+        finished = time.monotonic()
+
+        self._stats["batches"] += 1
+        self.batch_size.observe(len(batch))
+        self.inference_ms.observe((finished - started) * 1000)
+        for pending, result in zip(batch, results):
+            self.latency_ms.observe((finished - pending.enqueued_at) * 1000)
+            if isinstance(result, Exception):
+                self._stats["failed"] += 1
+                pending.future.set_exception(result)
+            else:
+                self._stats["completed"] += 1
+                pending.future.set_result(result)
+        self._completed.append((finished, len(batch)))
+
+    def stats(self) -> Dict:
+        """Counters, throughput over the last minute and latency histograms"""
+        now = time.monotonic()
+        recent = sum(items for finished, items in list(self._completed) if now - finished <= 60)
+        snapshot = dict(self._stats)
+        snapshot.update({
+            "name": self.name,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queue_depth": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "avg_batch_size": (
+                round((snapshot["completed"] + snapshot["failed"]) / snapshot["batches"], 3)
+                if snapshot["batches"] else 0.0
+            ),
+            "throughput_per_second_1m": round(recent / 60, 3),
+            "histograms": {
+                "latency_ms": self.latency_ms.snapshot(),
+                "queue_wait_ms": self.queue_wait_ms.snapshot(),
+                "inference_ms": self.inference_ms.snapshot(),
+                "batch_size": self.batch_size.snapshot(),
+            },
+        })
+        return snapshot
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Inference Benchmark
+Cold-load time, per-image latency, throughput and peak RSS of the CPU
+models: the food classifier (classify_food_image), the SigLIP workout
+classifier behind /api/classify-frame (classify_workout_batch) and
+FoodDetector.detect_food for each YOLO variant in /api/food-detect/models.
+
+Usage:
+    python inference_bench.py run                                  # every model, defaults below
+    python inference_bench.py run --models yolov8n,yolov8s --threads 1,2,4 --batch-sizes 1,4,8
+    python inference_bench.py run --resolutions 320,640,1280 --images img --output bench.json
+    python inference_bench.py compare before.json after.json      # throughput change per scenario
+
+Every (model, thread count, resolution) combination runs in a fresh
+interpreter, so the cold load includes imports and weight loading, and
+peak RSS belongs to that model alone. Batch sizes are then measured in
+that same process. Batch size 1 calls the same function the API does.
+Larger batches use one batched forward pass of the same model, which is
+what inference_batcher.py does for the workout classifier. Resolution is
+the longest side the source images are resized to before encoding, i.e.
+the size of the uploads or webcam frames the API receives.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from routes.food_detect import VALID_MODELS as YOLO_MODELS  # the variants /api/food-detect/models lists
+
+MODELS = ["food-classifier", "workout-classifier"] + YOLO_MODELS
+
+DEFAULT_THREADS = "1,2,4"
+DEFAULT_BATCH_SIZES = "1,4,8"
+DEFAULT_RESOLUTIONS = "640"
+DEFAULT_IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "img")
+RESULT_PREFIX = "inference-bench "
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _load_images(images_dir: str, resolution: int) -> List[bytes]:
+    """JPEG bytes of every image in images_dir, resized so the longest side is resolution"""
+    from PIL import Image
+    frames = []
+    for name in sorted(os.listdir(images_dir)):
+        if not name.lower().endswith((".jpg", ".jpeg", ".png")):
+            continue
+        image = Image.open(os.path.join(images_dir, name)).convert("RGB")
+        scale = resolution / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        frames.append(buffer.getvalue())
+    if not frames:
+        raise FileNotFoundError(f"No .jpg/.png images in {images_dir}")
+    return frames
+
+
+# Model runners: load the model, return a function that processes a list of encoded images
+
+def _food_classifier_runner() -> Callable[[List[bytes]], object]:
+    from PIL import Image
+    import torch
+    import ml_models
+    processor, model = ml_models.food_classifier.get()
+
+    def run(frames: List[bytes]):
+        if len(frames) == 1:
+            result = ml_models.classify_food_image(frames[0])
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            return result
+        images = [Image.open(io.BytesIO(frame)) for frame in frames]
+        inputs = processor(images=images, return_tensors="pt").to(ml_models.get_torch_device())
+        with torch.no_grad():
+            return torch.nn.functional.softmax(model(**inputs).logits, dim=-1).topk(3)
+
+    return run
+
+
+def _workout_classifier_runner() -> Callable[[List[bytes]], object]:
+    import ml_models
+    ml_models.workout_classifier.get()
+
+    def run(frames: List[bytes]):
+        results = ml_models.classify_workout_batch(frames)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+        return results
+
+    return run
+
+
+def _yolo_runner(model_name: str) -> Callable[[List[bytes]], object]:
+    from PIL import Image
+    from food_detect import FoodDetector
+    detector = FoodDetector(model_path=f"{model_name}.pt")
+    if detector.model is None:
+        raise RuntimeError(f"{model_name} did not load")
+    ultralytics = hasattr(detector.model, "predict")
+
+    def run(frames: List[bytes]):
+        if len(frames) == 1:
+            result = detector.detect_food(frames[0])
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            return result
+        if not ultralytics:
+            return [detector.detect_food(frame) for frame in frames]
+        # detect_food's own predict() call, given the whole batch
+        images = [Image.open(io.BytesIO(frame)) for frame in frames]
+        results = detector.model.predict(images, conf=detector.confidence_threshold, verbose=False)
+        return detector._process_ultralytics_results(results, detector.confidence_threshold)
+
+    return run
+
+
+def _runner(model: str) -> Callable[[List[bytes]], object]:
+    if model == "food-classifier":
+        return _food_classifier_runner()
+    if model == "workout-classifier":
+        return _workout_classifier_runner()
+    return _yolo_runner(model)
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))]
+
+
+def run_scenario(spec: Dict) -> Dict:
+    """Runs in the worker process: load one model and measure each batch size"""
+    result = {key: spec[key] for key in ("model", "threads", "resolution")}
+    frames = _load_images(spec["images"], spec["resolution"])
+    started = time.perf_counter()
+    import torch
+    torch.set_num_threads(spec["threads"])
+    run = _runner(spec["model"])
+    result["cold_load_s"] = round(time.perf_counter() - started, 3)
+    result["rss_after_load_mb"] = _peak_rss_mb()
+
+    started = time.perf_counter()
+    run(frames[:1])
+    result["first_inference_s"] = round(time.perf_counter() - started, 3)
+
+    result["batches"] = []
+    for batch_size in spec["batch_sizes"]:
+        batch = [frames[i % len(frames)] for i in range(batch_size)]
+        for _ in range(spec["warmup"]):
+            run(batch)
+        latencies = []
+        measure_start = time.perf_counter()
+        while len(latencies) < spec["iterations"] or time.perf_counter() - measure_start < spec["min_seconds"]:
+            started = time.perf_counter()
+            run(batch)
+            latencies.append(time.perf_counter() - started)
+        elapsed = time.perf_counter() - measure_start
+        result["batches"].append({
+            "batch_size": batch_size,
+            "iterations": len(latencies),
+            "batch_p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "batch_p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+            "image_p50_ms": round(_percentile(latencies, 0.50) * 1000 / batch_size, 2),
+            "images_per_s": round(len(latencies) * batch_size / elapsed, 2),
+        })
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _run_in_subprocess(spec: Dict, timeout: float) -> Dict:
+    env = dict(os.environ, OMP_NUM_THREADS=str(spec["threads"]), MKL_NUM_THREADS=str(spec["threads"]),
+               LOG_LEVEL="WARNING")
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "worker", json.dumps(spec)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {**spec, "error": f"timed out after {timeout:.0f}s"}
+    # Model loading logs to stdout too; pick our line out of the output
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    error = (completed.stderr.strip().splitlines() or ["worker exited without a result"])[-1]
+    return {**{key: spec[key] for key in ("model", "threads", "resolution")}, "error": error}
+
+
+def environment() -> Dict:
+    info = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+    for module in ("torch", "transformers", "ultralytics"):
+        try:
+            info[module] = __import__(module).__version__
+        except Exception:
+            info[module] = None
+    return info
+
+
+def format_report(report: Dict) -> str:
+    env = report["environment"]
+    lines = [
+        f"CPU: {env['processor']} x{env['cpu_count']}, torch {env.get('torch')}, {env['date']}",
+        f"{'model':<20} {'thr':>3} {'res':>5} {'load s':>7} {'rss MB':>7} {'batch':>5} "
+        f"{'ms/img':>8} {'p95 ms':>8} {'img/s':>8}",
+    ]
+    for scenario in report["scenarios"]:
+        prefix = f"{scenario['model']:<20} {scenario['threads']:>3} {scenario['resolution']:>5}"
+        if "error" in scenario:
+            lines.append(f"{prefix} error: {scenario['error']}")
+            continue
+        for batch in scenario["batches"]:
+            lines.append(
+                f"{prefix} {scenario['cold_load_s']:>7.2f} {scenario['peak_rss_mb']:>7.0f} {batch['batch_size']:>5} "
+                f"{batch['image_p50_ms']:>8.1f} {batch['batch_p95_ms']:>8.1f} {batch['images_per_s']:>8.1f}")
+    return "\n".join(lines)
+
+
+def compare_reports(before: Dict, after: Dict) -> str:
+    def index(report):
+        return {
+            (s["model"], s["threads"], s["resolution"], b["batch_size"]): b["images_per_s"]
+            for s in report["scenarios"] if "error" not in s for b in s["batches"]
+        }
+
+    old, new = index(before), index(after)
+    lines = [f"{'model':<20} {'thr':>3} {'res':>5} {'batch':>5} {'before':>9} {'after':>9} {'change':>7}  (images/s)"]
+    for key in sorted(set(old) & set(new)):
+        model, threads, resolution, batch_size = key
+        lines.append(f"{model:<20} {threads:>3} {resolution:>5} {batch_size:>5} {old[key]:>9.1f} {new[key]:>9.1f} "
+                     f"{new[key] / old[key] - 1:>+7.0%}")
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    if sys.argv[1:2] == ["worker"]:
+        try:
+            result = run_scenario(json.loads(sys.argv[2]))
+        except Exception as e:
+            spec = json.loads(sys.argv[2])
+            result = {"model": spec["model"], "threads": spec["threads"], "resolution": spec["resolution"],
+                      "error": f"{type(e).__name__}: {e}"}
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return
+
+    parser = argparse.ArgumentParser(description="CPU inference benchmark for the food and workout models")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run")
+    run.add_argument("--models", default=",".join(MODELS))
+    run.add_argument("--threads", default=DEFAULT_THREADS, help="torch thread counts")
+    run.add_argument("--batch-sizes", default=DEFAULT_BATCH_SIZES)
+    run.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="longest image side in pixels")
+    run.add_argument("--images", default=DEFAULT_IMAGES_DIR, help="directory of sample .jpg/.png images")
+    run.add_argument("--iterations", type=int, default=20, help="minimum timed batches per batch size")
+    run.add_argument("--min-seconds", type=float, default=3, help="minimum timed seconds per batch size")
+    run.add_argument("--warmup", type=int, default=2, help="untimed batches per batch size")
+    run.add_argument("--timeout", type=float, default=1800, help="seconds allowed per scenario")
+    run.add_argument("--output", default="inference_bench.json")
+    compare = commands.add_parser("compare")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.before) as f_before, open(args.after) as f_after:
+            print(compare_reports(json.load(f_before), json.load(f_after)))
+        return
+
+    models = [model.strip() for model in args.models.split(",") if model.strip()]
+    unknown = [model for model in models if model not in MODELS]
+    if unknown:
+        parser.error(f"unknown model(s) {', '.join(unknown)}; choose from {', '.join(MODELS)}")
+
+    report = {"environment": environment(), "scenarios": []}
+    for model in models:
+        for threads in _int_list(args.threads):
+            for resolution in _int_list(args.resolutions):
+                print(f"▶ {model}, {threads} thread(s), {resolution}px...", flush=True)
+                spec = {
+                    "model": model, "threads": threads, "resolution": resolution,
+                    "batch_sizes": _int_list(args.batch_sizes), "images": os.path.abspath(args.images),
+                    "iterations": args.iterations, "min_seconds": args.min_seconds, "warmup": args.warmup,
+                }
+                report["scenarios"].append(_run_in_subprocess(spec, args.timeout))
+                # Written after every scenario, so a long run that is interrupted keeps its results
+                with open(args.output, "w") as f:
+                    json.dump(report, f, indent=2)
+    print(format_report(report))
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Inference Client
+Routes model calls either to the models in this process (ml_models.py) or,
+when INFERENCE_SERVER_URL is set, to one or more standalone inference
+servers (inference_server.py) that own the models for every web worker.
+"""
+
+import itertools
+import os
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import http_client
+import metrics
+from inference_batcher import QueueFullError
+from ml_models import food_batcher, workout_batcher, workout_labels
+
+# Comma-separated base URLs, e.g. "http://127.0.0.1:8100,http://127.0.0.1:8101"
+INFERENCE_SERVER_URL = os.environ.get("INFERENCE_SERVER_URL", "")
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", "30"))           # first call may load a model
+INFERENCE_MAX_CONCURRENCY = int(os.environ.get("INFERENCE_MAX_CONCURRENCY", "32"))  # in-flight calls per server
+
+_servers: List[str] = [url.strip().rstrip("/") for url in INFERENCE_SERVER_URL.split(",") if url.strip()]
+_server_cycle = itertools.cycle(_servers) if _servers else None
+_cycle_lock = threading.Lock()
+_workout_labels: Optional[Dict[int, str]] = None
+
+# Let enough frames through to the inference servers for batching to pay off
+for _url in _servers:
+    http_client.HOST_LIMITS[urlsplit(_url).hostname or ""] = INFERENCE_MAX_CONCURRENCY
+
+
+class InferenceError(RuntimeError):
+    """Raised when the inference server fails or cannot be reached"""
+
+
+def remote_inference_enabled() -> bool:
+    return bool(_servers)
+
+
+def inference_servers() -> List[str]:
+    return list(_servers)
+
+
+def _next_server() -> str:
+    with _cycle_lock:
+        return next(_server_cycle)
+
+
+async def _call(method: str, path: str, server: Optional[str] = None, **kwargs) -> Dict:
+    """Call an inference server and map its errors onto the local exceptions"""
+    url = f"{server or _next_server()}{path}"
+    try:
+        # No retries: a busy server answers 503 and the caller drops or reports the frame
+        response = await http_client.request(method, url, timeout=INFERENCE_TIMEOUT, max_retries=0, **kwargs)
+    except httpx.HTTPError as e:
+        raise InferenceError(f"Inference server unreachable at {url}: {e}")
+    if response.status_code == 400:
+        raise ValueError(response.json().get("detail", "Invalid image"))
+    if response.status_code == 503:
+        raise QueueFullError(response.json().get("detail", "Inference server is busy"))
+    if response.status_code >= 400:
+        raise InferenceError(f"Inference server returned {response.status_code} for {path}")
+    return response.json()
+
+
+async def _post_image(path: str, image_data: bytes, params: Optional[Dict] = None) -> Dict:
+    return await _call(
+        "POST", path,
+        content=image_data,
+        params=params,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+
+
+async def classify_workout_frame(frame: bytes) -> Dict:
+    """Label, score and class probabilities for one encoded webcam frame"""
+    with metrics.timed("inference", "workout-classifier"):
+        if remote_inference_enabled():
+            return await _post_image("/v1/workout/classify", frame)
+        return await workout_batcher.infer(frame)
+
+
+async def get_workout_labels() -> Dict[int, str]:
+    """Class index -> exercise name, fetched once from the inference server"""
+    global _workout_labels
+    if not remote_inference_enabled():
+        return workout_labels()
+    if _workout_labels is None:
+        labels = await _call("GET", "/v1/workout/labels")
+        _workout_labels = {int(idx): label for idx, label in labels["labels"].items()}
+    return _workout_labels
+
+
+async def classify_food(image_data: bytes) -> Dict:
+    """Same result shape as ml_models.classify_food_image"""
+    with metrics.timed("inference", "food-classifier"):
+        if remote_inference_enabled():
+            try:
+                return await _post_image("/v1/food/classify", image_data)
+            except (InferenceError, QueueFullError, ValueError) as e:
+                return {"error": str(e)}
+        # Local model: runs on the food batcher's thread, not the event loop or the DB executor
+        try:
+            return await food_batcher.infer(image_data)
+        except QueueFullError as e:
+            return {"error": str(e)}
+
+
+# The YOLO detector lives in routes/food_detect.py; it only calls these in remote mode
+
+async def detect_food(image_data: bytes, confidence_threshold: Optional[float] = None) -> Dict:
+    params = {"confidence_threshold": confidence_threshold} if confidence_threshold is not None else None
+    return await _post_image("/v1/food/detect", image_data, params)
+
+
+async def detector_status() -> Dict:
+    return await _call("GET", "/v1/food/detect/status")
+
+
+async def switch_detector_model(model_name: str) -> Dict:
+    """Switch every inference server, so requests get the same model whichever server answers"""
+    results = [
+        await _call("POST", "/v1/food/detect/switch-model", server=server, json={"model_name": model_name})
+        for server in _servers
+    ]
+    failed = [result for result in results if not result.get("success")]
+    return failed[0] if failed else results[0]
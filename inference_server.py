@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Inference Server
+Standalone process that owns the AI models (workout classifier, food
+classifier, YOLO food detector) for every web worker. Web workers send image
+bytes over local HTTP (see inference_client.py) instead of each loading
+their own copy of the weights, so model and web processes scale separately.
+
+Usage:
+    python inference_server.py                       # 127.0.0.1:8100
+    python inference_server.py --host 0.0.0.0 --port 8101
+    INFERENCE_SERVER_URL=http://127.0.0.1:8100,http://127.0.0.1:8101 uvicorn api:app --workers 8
+"""
+
+import argparse
+import os
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request, Body
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from app_logging import setup_logging
+setup_logging()
+
+from inference_batcher import QueueFullError
+from metrics import MetricsMiddleware, render_metrics, PROMETHEUS_CONTENT_TYPE
+from ml_models import classify_food_image, workout_batcher, workout_labels
+from model_registry import start_warmup, readiness
+from routes.food_detect import registry as detector_registry, VALID_MODELS
+
+INFERENCE_HOST = os.environ.get("INFERENCE_HOST", "127.0.0.1")
+INFERENCE_PORT = int(os.environ.get("INFERENCE_PORT", "8100"))
+
+app = FastAPI(title="PowerFit Inference Server")
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+async def warm_up_models():
+    start_warmup()
+
+
+@app.on_event("shutdown")
+async def stop_batchers():
+    workout_batcher.stop()
+
+
+@app.get("/ready")
+async def ready():
+    report = readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/stats")
+async def stats():
+    return {"workout_classifier": workout_batcher.stats()}
+
+
+@app.post("/v1/workout/classify")
+async def classify_workout(request: Request):
+    """Raw JPEG/PNG body -> label, score and class probabilities (batched with concurrent frames)"""
+    try:
+        return await workout_batcher.infer(await request.body())
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Classifier is busy, try again shortly")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/v1/workout/labels")
+async def get_workout_labels():
+    labels = await run_in_threadpool(workout_labels)
+    return {"labels": {str(idx): label for idx, label in labels.items()}}
+
+
+@app.post("/v1/food/classify")
+async def classify_food(request: Request):
+    """Raw image body -> classify_food_image() result"""
+    return await run_in_threadpool(classify_food_image, await request.body())
+
+
+@app.post("/v1/food/detect")
+async def detect_food(request: Request, confidence_threshold: Optional[float] = None):
+    """Raw image body -> FoodDetector.detect_food() result for the active YOLO model"""
+    image_data = await request.body()
+    detector = await run_in_threadpool(detector_registry.get)
+    return await run_in_threadpool(detector.detect_food, image_data, confidence_threshold)
+
+
+@app.get("/v1/food/detect/status")
+async def detector_status():
+    status = detector_registry.status()
+    detector = detector_registry.peek()
+    status.update({
+        "device": detector.device if detector else None,
+        "confidence_threshold": detector.confidence_threshold if detector else None,
+    })
+    return status
+
+
+@app.post("/v1/food/detect/switch-model")
+async def switch_detector_model(model_name: str = Body(..., embed=True)):
+    if model_name not in VALID_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid model name. Valid options: {VALID_MODELS}")
+    detector = await run_in_threadpool(detector_registry.switch, model_name)
+    info = detector_registry.status()["models"].get(model_name, {})
+    return {
+        "success": detector.model is not None,
+        "active_model": detector_registry.active_model,
+        "model_loaded": detector.model is not None,
+        "warm": bool(info.get("warm")),
+        "load_time_seconds": info.get("load_time_seconds"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the PowerFit inference server")
+    parser.add_argument("--host", default=INFERENCE_HOST)
+    parser.add_argument("--port", type=int, default=INFERENCE_PORT)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
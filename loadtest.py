@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Role-based journeys for gyms, coaches and members (login, dashboards,
+schedule_view, assign_best_workout, nutrition today, messages, exports)
+with p50/p95/p99 latency and throughput per route, and a regression gate
+against a stored baseline.
+
+Usage:
+    python seed_database.py generate --scale medium          # accounts and data to test against
+    python loadtest.py run --users 50 --duration 60          # in-process ASGI app on the local MySQL
+    python loadtest.py run --url http://localhost:8000       # a running server
+    python loadtest.py run --save-baseline                   # store the results in LOADTEST_BASELINE
+    python loadtest.py run --check                           # exit 1 if a route regressed
+    python loadtest.py compare results.json                  # check saved results (--output) instead
+
+Virtual users log in as the accounts created by `seed_database.py
+generate`, then repeat their role's journey until --duration runs out.
+The in-process mode drives api.app through httpx's ASGI transport, so
+client and server share one event loop; use --url against uvicorn for
+numbers that include HTTP parsing and multiple workers.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from db_pool import create_raw_connection
+from seed_database import LOADTEST_EMAIL_DOMAIN, LOADTEST_PASSWORD, WORKOUT_TYPES
+
+LOADTEST_BASELINE = os.environ.get("LOADTEST_BASELINE", "loadtest_baseline.json")
+LOADTEST_TOLERANCE = float(os.environ.get("LOADTEST_TOLERANCE", "0.25"))       # allowed p95 growth over the baseline
+LOADTEST_MIN_REGRESSION_MS = float(os.environ.get("LOADTEST_MIN_REGRESSION_MS", "10"))  # ignore smaller p95 changes
+
+# Virtual users per role, as weights
+DEFAULT_MIX = "gym=1,coach=4,member=15"
+
+
+def _monday(day: date) -> str:
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+# Journeys: (route name, method, path template, JSON body or None). Paths are
+# formatted with the account's ids; the route name is what results are keyed by.
+JOURNEYS = {
+    "gym": [
+        ("GET /api/gym/dashboard", "GET", "/api/gym/dashboard", None),
+        ("GET /api/gym/members", "GET", "/api/gym/members", None),
+        ("GET /api/gym/sessions", "GET", "/api/gym/sessions", None),
+        ("GET /gym/messages", "GET", "/gym/messages", None),
+        ("GET /api/export/sessions/gym", "GET", "/api/export/sessions/gym", None),
+    ],
+    "coach": [
+        ("GET /api/coach/dashboard", "GET", "/api/coach/dashboard", None),
+        ("GET /api/coach/schedule_view/{coach_id}/{member_id}", "GET",
+         "/api/coach/schedule_view/{id}/{member_id}?week_start={week_start}", None),
+        ("POST /api/coach/assign_best_workout", "POST", "/api/coach/assign_best_workout",
+         {"coach_id": "{id}", "member_id": "{member_id}", "workout_type": "{workout_type}", "duration": 60}),
+        ("GET /api/coach/nutrition/member/{member_id}/today", "GET",
+         "/api/coach/nutrition/member/{member_id}/today", None),
+        ("GET /coach/messages", "GET", "/coach/messages", None),
+        ("GET /api/export/schedule/coach", "GET", "/api/export/schedule/coach", None),
+    ],
+    "member": [
+        ("GET /api/member/dashboard", "GET", "/api/member/dashboard", None),
+        ("GET /api/member/schedule", "GET", "/api/member/schedule", None),
+        ("GET /api/member/nutrition/today", "GET", "/api/member/nutrition/today", None),
+        ("GET /member/messages", "GET", "/member/messages", None),
+        ("GET /api/export/nutrition/member", "GET", "/api/export/nutrition/member", None),
+    ],
+}
+LOGIN_ROUTE = "POST /api/login"
+LOGOUT_ROUTE = "GET /logout"
+
+
+def _fill_body(body: Optional[Dict], values: Dict) -> Optional[Dict]:
+    """Fill "{placeholder}" values in a JSON body, keeping ids as ints"""
+    if body is None:
+        return None
+    return {key: values[value[1:-1]] if isinstance(value, str) and value.startswith("{") else value
+            for key, value in body.items()}
+
+
+class RouteStats:
+    """Latencies and failures for one route"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[int, int] = {}
+
+    def record(self, seconds: float, status: Optional[int]):
+        self.latencies.append(seconds)
+        if status is not None:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def summary(self, duration: float) -> Dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            # Nearest-rank percentile, in milliseconds
+            return round(ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))] * 1000, 2)
+
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "error_rate": round(self.errors / len(ordered), 4) if ordered else 0.0,
+            "rps": round(len(ordered) / duration, 2) if duration > 0 else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+        }
+
+
+class LoadTest:
+    """Runs virtual users until the deadline and collects RouteStats by route name"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, base_url: str, accounts: Dict[str, List[Dict]],
+                 mix: Dict[str, float], users: int, duration: float, warmup: float, think_time: float,
+                 seed: int = 42):
+        self.transport = transport
+        self.base_url = base_url
+        self.accounts = accounts
+        self.mix = {role: weight for role, weight in mix.items() if weight > 0 and accounts.get(role)}
+        if not self.mix:
+            raise ValueError("No accounts for any role in the mix; run `python seed_database.py generate` first")
+        self.users = users
+        self.duration = duration
+        self.warmup = warmup
+        self.think_time = think_time
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, RouteStats] = {}
+        self._measure_from = 0.0
+        self._deadline = 0.0
+
+    def _record(self, route: str, started: float, seconds: float, status: Optional[int]):
+        # Requests started during warm-up don't count
+        if started >= self._measure_from:
+            self.stats.setdefault(route, RouteStats()).record(seconds, status)
+
+    async def _request(self, client: httpx.AsyncClient, route: str, method: str, path: str,
+                       body: Optional[Dict] = None) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+        except httpx.HTTPError:
+            self._record(route, started, time.perf_counter() - started, None)
+            return None
+        self._record(route, started, time.perf_counter() - started, response.status_code)
+        return response
+
+    async def _virtual_user(self, role: str, account: Dict):
+        # Not closed per user: that would close the shared transport; run() closes it at the end
+        client = httpx.AsyncClient(transport=self.transport, base_url=self.base_url, timeout=60, follow_redirects=False)
+        rng = random.Random(f"{role}:{account['id']}")
+        login = {"email": account["email"], "password": LOADTEST_PASSWORD, "role": role}
+        # One journey per visit: log in, walk the role's pages, log out
+        while time.perf_counter() < self._deadline:
+            response = await self._request(client, LOGIN_ROUTE, "POST", "/api/login", login)
+            if response is None or response.status_code != 200:
+                await asyncio.sleep(1)
+                continue
+            for route, method, path, body in JOURNEYS[role]:
+                if time.perf_counter() >= self._deadline:
+                    return
+                # Coaches work through their members; everyone looks at the current week
+                values = dict(account, week_start=_monday(date.today()), workout_type=rng.choice(WORKOUT_TYPES))
+                if account.get("members"):
+                    values["member_id"] = rng.choice(account["members"])
+                await self._request(client, route, method, path.format(**values), _fill_body(body, values))
+                if self.think_time:
+                    await asyncio.sleep(rng.uniform(0, 2 * self.think_time))
+            await self._request(client, LOGOUT_ROUTE, "GET", "/logout")
+
+    def _assign(self) -> List[Tuple[str, Dict]]:
+        roles = list(self.mix)
+        weights = [self.mix[role] for role in roles]
+        picked = self.rng.choices(roles, weights, k=self.users)
+        # Each role's accounts are used in turn, so users don't share a login unless there are too few
+        cursors = {role: 0 for role in roles}
+        assignments = []
+        for role in picked:
+            accounts = self.accounts[role]
+            assignments.append((role, accounts[cursors[role] % len(accounts)]))
+            cursors[role] += 1
+        return assignments
+
+    async def run(self) -> Dict:
+        start = time.perf_counter()
+        self._measure_from = start + self.warmup
+        self._deadline = self._measure_from + self.duration
+        await asyncio.gather(*(self._virtual_user(role, account) for role, account in self._assign()))
+        measured = max(min(time.perf_counter(), self._deadline) - self._measure_from, 1e-9)
+        routes = {route: stats.summary(measured) for route, stats in sorted(self.stats.items())}
+        total = sum(route["requests"] for route in routes.values())
+        return {
+            "config": {"users": self.users, "duration": self.duration, "warmup": self.warmup,
+                       "mix": self.mix, "think_time": self.think_time, "target": self.base_url},
+            "total_requests": total,
+            "total_rps": round(total / measured, 2),
+            "routes": routes,
+        }
+
+
+def load_accounts(per_role: int) -> Dict[str, List[Dict]]:
+    """Up to per_role generated gyms, coaches (with their member ids) and members"""
+    pattern = f"%@{LOADTEST_EMAIL_DOMAIN}"
+    connection = create_raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id, email FROM gyms WHERE email LIKE %s ORDER BY id LIMIT %s", (pattern, per_role))
+        gyms = cursor.fetchall()
+        cursor.execute("SELECT id, email FROM coaches WHERE email LIKE %s AND status = 'Active' ORDER BY id LIMIT %s",
+                       (pattern, per_role))
+        coaches = cursor.fetchall()
+        if coaches:
+            placeholders = ", ".join(["%s"] * len(coaches))
+            cursor.execute(f"SELECT coach_id, member_id FROM member_coach WHERE coach_id IN ({placeholders})",
+                           [coach["id"] for coach in coaches])
+            members_by_coach: Dict[int, List[int]] = {}
+            for row in cursor.fetchall():
+                members_by_coach.setdefault(row["coach_id"], []).append(row["member_id"])
+            for coach in coaches:
+                coach["members"] = members_by_coach.get(coach["id"], [])[:50]
+            coaches = [coach for coach in coaches if coach["members"]]
+        cursor.execute("SELECT id, email FROM members WHERE email LIKE %s ORDER BY id LIMIT %s", (pattern, per_role))
+        members = cursor.fetchall()
+        return {"gym": list(gyms), "coach": coaches, "member": list(members)}
+    finally:
+        connection.close()
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        role, _, weight = item.partition("=")
+        if role.strip() not in JOURNEYS:
+            raise ValueError(f"Unknown role '{role.strip()}' in --mix (expected {', '.join(JOURNEYS)})")
+        mix[role.strip()] = float(weight or 1)
+    return mix
+
+
+# Baseline
+
+def compare(results: Dict, baseline: Dict, tolerance: float = LOADTEST_TOLERANCE,
+            min_regression_ms: float = LOADTEST_MIN_REGRESSION_MS) -> List[str]:
+    """
+    Routes whose p95 grew by more than tolerance (and min_regression_ms) over
+    the baseline, or whose error rate grew by more than a percentage point.
+    Routes missing from either side are not compared.
+    """
+    regressions = []
+    for route, base in baseline.get("routes", {}).items():
+        current = results["routes"].get(route)
+        if not current or not current["requests"] or base.get("p95_ms") is None:
+            continue
+        limit = max(base["p95_ms"] * (1 + tolerance), base["p95_ms"] + min_regression_ms)
+        if current["p95_ms"] > limit:
+            regressions.append(f"{route}: p95 {current['p95_ms']:.1f}ms > {limit:.1f}ms "
+                               f"(baseline {base['p95_ms']:.1f}ms)")
+        if current["error_rate"] > base.get("error_rate", 0) + 0.01:
+            regressions.append(f"{route}: error rate {current['error_rate']:.1%} "
+                               f"(baseline {base.get('error_rate', 0):.1%})")
+    return regressions
+
+
+def format_results(results: Dict) -> str:
+    lines = [f"{'route':<58} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for route, stats in results["routes"].items():
+        cells = [f"{stats[key]:>9.1f}" if stats[key] is not None else f"{'-':>9}" for key in ("p50_ms", "p95_ms", "p99_ms")]
+        lines.append(f"{route:<58} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} {' '.join(cells)}")
+    lines.append(f"total: {results['total_requests']} requests, {results['total_rps']:.1f} req/s")
+    return "\n".join(lines)
+
+
+def _check(results: Dict, baseline_path: str, tolerance: float, min_regression_ms: float) -> bool:
+    if not os.path.exists(baseline_path):
+        print(f"❌ No baseline at {baseline_path}; create one with --save-baseline")
+        return False
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, tolerance, min_regression_ms)
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if not regressions:
+        print(f"✅ No route regressed beyond {tolerance:.0%} of {baseline_path}")
+    return not regressions
+
+
+async def _run(args) -> Dict:
+    accounts = load_accounts(args.accounts)
+    if args.url:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.users))
+        base_url = args.url.rstrip("/")
+    else:
+        # Keep startup light: no model warm-up and no per-request debug output
+        os.environ.setdefault("MODEL_WARMUP", "none")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        from api import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+        await app.router.startup()
+    try:
+        test = LoadTest(transport, base_url, accounts, parse_mix(args.mix), args.users, args.duration,
+                        args.warmup, args.think_time, args.seed)
+        print(f"Running {args.users} users for {args.warmup:.0f}s warm-up + {args.duration:.0f}s against {base_url}...")
+        return await test.run()
+    finally:
+        await transport.aclose()
+        if not args.url:
+            await app.router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Role-based load test with a latency regression gate")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the journeys and report per-route latency")
+    run.add_argument("--url", help="target a running server instead of the in-process app")
+    run.add_argument("--users", type=int, default=20)
+    run.add_argument("--duration", type=float, default=30, help="measured seconds")
+    run.add_argument("--warmup", type=float, default=5, help="seconds before measuring starts")
+    run.add_argument("--think-time", type=float, default=0, help="mean pause between requests (seconds)")
+    run.add_argument("--mix", default=DEFAULT_MIX, help="virtual users per role as weights")
+    run.add_argument("--accounts", type=int, default=200, help="generated accounts loaded per role")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="also write the results as JSON")
+    run.add_argument("--save-baseline", action="store_true")
+    run.add_argument("--check", action="store_true", help="fail if a route regressed against the baseline")
+    cmp = commands.add_parser("compare", help="check saved results against the baseline")
+    cmp.add_argument("results")
+    for sub in (run, cmp):
+        sub.add_argument("--baseline", default=LOADTEST_BASELINE)
+        sub.add_argument("--tolerance", type=float, default=LOADTEST_TOLERANCE)
+        sub.add_argument("--min-regression-ms", type=float, default=LOADTEST_MIN_REGRESSION_MS)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.results) as f:
+            results = json.load(f)
+        print(format_results(results))
+        sys.exit(0 if _check(results, args.baseline, args.tolerance, args.min_regression_ms) else 1)
+
+    try:
+        results = asyncio.run(_run(args))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if args.check and not _check(results, args.baseline, args.tolerance, args.min_regression_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
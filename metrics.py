@@ -0,0 +1,266 @@
+"""
+Request Metrics
+Per-endpoint latency, SQL query count, DB time, external-call time and model
+inference time, exposed in the Prometheus text format at /metrics.
+
+MetricsMiddleware starts a RequestMetrics for each HTTP request; the pooled
+cursors (db_pool.py), the shared HTTP client and the inference client add to
+it, and the totals are observed under the route template (e.g.
+"/api/coach/members/{member_id}") once the response has been sent.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from db_pool import add_query_listener, pool_stats
+from inference_batcher import Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class LabeledHistogram:
+    """One Histogram per label combination"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        child = self._children.get(labels)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labels, Histogram(self.buckets))
+        child.observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, child in sorted(list(self._children.items())):
+            snapshot = child.snapshot()
+            base = _format_labels(self.labelnames, labels)
+            for bound, count in snapshot["buckets"].items():
+                le = _format_labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{base} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{base} {snapshot['count']}")
+        return lines
+
+
+class LabeledCounter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(list(self._values.items())):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Metric families
+http_requests_total = LabeledCounter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status"))
+http_request_duration = LabeledHistogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"), LATENCY_BUCKETS)
+http_request_db_queries = LabeledHistogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS)
+http_request_db_time = LabeledHistogram(
+    "http_request_db_seconds", "Cumulative SQL time per request", ("method", "route"), LATENCY_BUCKETS)
+http_request_external_time = LabeledHistogram(
+    "http_request_external_seconds", "Cumulative outbound HTTP time per request", ("method", "route"), LATENCY_BUCKETS)
+http_request_inference_time = LabeledHistogram(
+    "http_request_inference_seconds", "Cumulative model inference time per request", ("method", "route"), LATENCY_BUCKETS)
+db_query_duration = LabeledHistogram(
+    "db_query_duration_seconds", "SQL statement latency by statement type", ("statement",), LATENCY_BUCKETS)
+db_query_errors_total = LabeledCounter(
+    "db_query_errors_total", "SQL statements that raised", ("statement",))
+external_call_duration = LabeledHistogram(
+    "external_call_duration_seconds", "Outbound HTTP call latency by host", ("host",), LATENCY_BUCKETS)
+model_inference_duration = LabeledHistogram(
+    "model_inference_duration_seconds", "Model inference latency", ("model",), LATENCY_BUCKETS)
+
+_FAMILIES = (
+    http_requests_total,
+    http_request_duration,
+    http_request_db_queries,
+    http_request_db_time,
+    http_request_external_time,
+    http_request_inference_time,
+    db_query_duration,
+    db_query_errors_total,
+    external_call_duration,
+    model_inference_duration,
+)
+
+
+class RequestMetrics:
+    """Totals for the request being handled (shared with worker threads through the context)"""
+
+    __slots__ = ("queries", "db_seconds", "external_seconds", "inference_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.external_seconds = 0.0
+        self.inference_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def _statement_type(sql: str) -> str:
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE") else "OTHER"
+
+
+def record_query(sql: str, params, seconds: float, error: Optional[BaseException]):
+    """db_pool query listener"""
+    statement = _statement_type(sql)
+    db_query_duration.observe(seconds, statement)
+    if error is not None:
+        db_query_errors_total.inc(statement)
+    request_metrics = _current.get()
+    if request_metrics is not None:
+        request_metrics.queries += 1
+        request_metrics.db_seconds += seconds
+
+
+@contextmanager
+def timed(kind: str, label: str):
+    """Time a block as an "external" call (label = host) or an "inference" (label = model)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        request_metrics = _current.get()
+        if kind == "external":
+            external_call_duration.observe(elapsed, label)
+            if request_metrics is not None:
+                request_metrics.external_seconds += elapsed
+        else:
+            model_inference_duration.observe(elapsed, label)
+            if request_metrics is not None:
+                request_metrics.inference_seconds += elapsed
+
+
+add_query_listener(record_query)
+
+
+class RouteTemplates:
+    """Maps a handled request's scope to its route template (e.g. "/api/coach/members/{member_id}")"""
+
+    def __init__(self):
+        self._templates: Dict = {}
+        self._routes_seen = 0
+
+    def __call__(self, scope) -> str:
+        router = scope.get("router")
+        routes = getattr(router, "routes", [])
+        if len(routes) != self._routes_seen:
+            # Rebuilt when routes are added (include_router after startup); mounts
+            # such as /static put their app in scope["endpoint"]
+            self._templates = {
+                getattr(route, "endpoint", None) or getattr(route, "app", None): route.path
+                for route in routes if hasattr(route, "path")
+            }
+            self._routes_seen = len(routes)
+        return self._templates.get(scope.get("endpoint"), "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route metrics for HTTP requests.
+
+    Routes are labelled with their template, not the raw path, so ids don't
+    multiply the series; requests that match no route are labelled "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_template = RouteTemplates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            method, route = scope["method"], self._route_template(scope)
+            http_requests_total.inc(method, route, str(status["code"]))
+            http_request_duration.observe(elapsed, method, route)
+            http_request_db_queries.observe(request_metrics.queries, method, route)
+            http_request_db_time.observe(request_metrics.db_seconds, method, route)
+            if request_metrics.external_seconds:
+                http_request_external_time.observe(request_metrics.external_seconds, method, route)
+            if request_metrics.inference_seconds:
+                http_request_inference_time.observe(request_metrics.inference_seconds, method, route)
+
+
+def _pool_gauges() -> List[str]:
+    gauges = {
+        "db_pool_connections_in_use": ("in_use", "Connections checked out of the pool"),
+        "db_pool_connections_idle": ("idle", "Idle connections in the pool"),
+        "db_pool_max_size": ("max_size", "Pool size limit"),
+    }
+    stats = pool_stats()
+    lines = []
+    for name, (key, help_text) in gauges.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for pool_name, pool in stats.items():
+            lines.append(f"{name}{_format_labels(('pool',), (pool_name,))} {pool[key]}")
+    return lines
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for family in _FAMILIES:
+        lines += family.render()
+    lines += _pool_gauges()
+    return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
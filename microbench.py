@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks
+Timings for the pure-Python helpers on hot request paths, with stored
+baselines so optimizations can be measured and regressions caught.
+
+Usage:
+    python microbench.py                       # run everything and compare with the baseline
+    python microbench.py --filter notes        # only benchmarks whose name contains "notes"
+    python microbench.py --save-baseline       # store the results in MICROBENCH_BASELINE
+    python microbench.py --check               # exit 1 if a benchmark got slower than the tolerance
+
+Each benchmark calls the real helper on inputs shaped like production data
+(free_days rows as pymysql returns them, a coach dashboard payload, ...).
+Timings are the best of --repeat runs, in microseconds per call, so
+background noise inflates them as little as possible. Each run is paired
+with a fixed calibration loop, and --check compares the ratio of the two
+("relative"), so a machine that is uniformly faster or slower than the one
+that saved the baseline does not register as a change. Benchmarks that
+cannot run (a missing optional dependency) fail --check.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+# Importing api must not start model loading
+os.environ.setdefault("MODEL_WARMUP", "none")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import api
+import scheduling
+from seed_database import WORKOUTS, WORKOUT_TYPES
+
+MICROBENCH_BASELINE = os.environ.get(
+    "MICROBENCH_BASELINE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_baseline.json"))
+MICROBENCH_TOLERANCE = float(os.environ.get("MICROBENCH_TOLERANCE", "0.5"))  # allowed calibrated slowdown over the baseline
+MICROBENCH_REPEAT = int(os.environ.get("MICROBENCH_REPEAT", "25"))  # runs per benchmark, best one counts
+
+
+# Representative inputs
+
+def _free_days() -> List[Dict]:
+    """A week of free_days rows; pymysql returns TIME columns as timedelta"""
+    rows = []
+    for index, day in enumerate(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]):
+        rows.append({
+            "id": index + 1, "user_id": 1, "user_type": "coach", "day_of_week": day,
+            "is_available": index != 6,
+            "start_time": timedelta(hours=7 + index % 3), "end_time": timedelta(hours=18 + index % 3),
+        })
+    return rows
+
+
+def _sessions(count: int, start: datetime) -> List[Dict]:
+    """A busy coach's booked sessions as pymysql returns them"""
+    return [
+        {"session_date": (start + timedelta(days=i // 8)).date(), "session_time": timedelta(hours=8 + i % 8),
+         "duration": 60 if i % 3 else 90}
+        for i in range(count)
+    ]
+
+
+def _dashboard_payload(sessions: int = 50) -> Dict:
+    """Coach dashboard-shaped result: nested dicts and lists with datetimes and timedeltas"""
+    now = datetime(2025, 1, 6, 12, 0)
+    return {
+        "stats": {"total_members": 42, "sessions_today": 6, "completed_this_week": 18},
+        "recent_sessions": [
+            {
+                "id": i, "member": {"name": f"Member {i}", "membership_type": "Premium"},
+                "session_date": now + timedelta(days=i % 7), "session_time": timedelta(hours=8 + i % 10),
+                "duration": 60, "status": "Scheduled", "created_at": now - timedelta(days=i),
+                "workout_type": WORKOUT_TYPES[i % len(WORKOUT_TYPES)],
+                "exercises": WORKOUTS[WORKOUT_TYPES[i % len(WORKOUT_TYPES)]][:4],
+            }
+            for i in range(sessions)
+        ],
+    }
+
+
+def _session_notes(sessions: int = 100) -> List[str]:
+    notes = []
+    for i in range(sessions):
+        workout_type = WORKOUT_TYPES[i % len(WORKOUT_TYPES)]
+        exercises = "\n".join(f"{n}. {exercise}" for n, exercise in enumerate(WORKOUTS[workout_type], 1))
+        notes.append(f"Workout Type: {workout_type}\n{exercises}" if i % 10 else f"{workout_type} Workout:\nfree text")
+    return notes
+
+
+# name -> reason, for benchmarks whose dependencies are missing
+SKIPPED: Dict[str, str] = {}
+
+
+def _calibration_loop() -> int:
+    """Fixed pure-Python work (dicts, lists, strings, datetimes) that timings are expressed relative to"""
+    day = datetime(2025, 1, 6)
+    rows = [{"i": i, "start": day + timedelta(minutes=15 * i), "name": f"row {i}"} for i in range(200)]
+    rows.sort(key=lambda row: row["start"], reverse=True)
+    return sum(len(row["name"]) for row in rows if row["i"] % 3)
+
+
+def benchmarks() -> Dict[str, Tuple[Callable[[], object], str]]:
+    """name -> (zero-argument callable, what one call covers)"""
+    free_days = _free_days()
+    now = datetime(2025, 1, 6, 7, 0)
+    coach_sessions = _sessions(500, now)
+    busy = scheduling.IntervalIndex.from_sessions(coach_sessions)
+    probes = [now + timedelta(minutes=37 * i) for i in range(100)]
+    payload = _dashboard_payload()
+    notes = _session_notes()
+    meals = [(650, 35, 80, 20), (320, 12, 45, 9), (880, 60, 70, 38), (0, 0, 0, 0)]
+    profiles = [
+        (30, "male", 80, 180, "moderately_active", "muscle_gain"),
+        (45, "female", 65, 165, "sedentary", "weight_loss"),
+        (25, "female", 58, 170, "very_active", "maintenance"),
+    ]
+    suite = {
+        "weekly_windows": (
+            lambda: scheduling.weekly_windows(free_days), "one user's week (7 free_days rows)"),
+        "interval_index_build": (
+            lambda: scheduling.IntervalIndex.from_sessions(coach_sessions), "500 booked sessions"),
+        "interval_overlaps": (
+            lambda: [busy.overlaps(start, start + timedelta(hours=1)) for start in probes],
+            "100 overlap queries against 500 sessions"),
+        "best_slots": (
+            lambda: scheduling.best_slots(free_days, free_days, coach_sessions, [], 60, ["09:00"], [],
+                                          horizon_weeks=4, now=now),
+            "4-week search for a coach with 500 booked sessions, as assign_best_workout does"),
+        "calculate_health_score": (
+            lambda: [api.calculate_health_score(*meal) for meal in meals], "4 meals"),
+        "convert_for_json": (
+            lambda: api.convert_for_json(payload), "coach dashboard payload with 50 sessions"),
+        "parse_workout_notes": (
+            lambda: [api.parse_workout_notes(text) for text in notes], "100 sessions' notes"),
+    }
+    try:
+        from ai_meal_planner import AIMealPlanner
+        planner = AIMealPlanner()
+        suite["calculate_nutritional_needs"] = (
+            lambda: [planner.calculate_nutritional_needs(*profile) for profile in profiles], "3 profiles")
+    except ImportError as e:
+        print(f"Skipping calculate_nutritional_needs: {e}")
+        SKIPPED["calculate_nutritional_needs"] = str(e)
+    return suite
+
+
+def run(suite: Dict[str, Tuple[Callable[[], object], str]], repeat: int) -> Dict[str, Dict]:
+    calibration = timeit.Timer(_calibration_loop)
+    calibration_number = max(calibration.autorange()[0] // 4, 1)
+    results = {}
+    for name, (func, covers) in suite.items():
+        timer = timeit.Timer(func)
+        # Short runs (~0.05s) interleaved with the calibration loop, so both
+        # see the same machine state; the best of `repeat` runs counts
+        number = max(timer.autorange()[0] // 4, 1)
+        best, best_calibration = float("inf"), float("inf")
+        for _ in range(repeat):
+            best_calibration = min(best_calibration, calibration.timeit(calibration_number) / calibration_number)
+            best = min(best, timer.timeit(number) / number)
+        results[name] = {"us_per_call": round(best * 1e6, 3), "relative": round(best / best_calibration, 4),
+                         "calls_per_run": number, "covers": covers}
+    return results
+
+
+def _change(current: Dict, base: Dict) -> float:
+    """Slowdown against the baseline, calibrated when the baseline has a relative timing"""
+    if "relative" in base:
+        return current["relative"] / base["relative"] - 1
+    return current["us_per_call"] / base["us_per_call"] - 1
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float = MICROBENCH_TOLERANCE) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base and _change(current, base) > tolerance:
+            regressions.append(f"{name}: {current['us_per_call']:.2f}us, {_change(current, base):+.0%} "
+                               f"against the baseline")
+    # A benchmark that did not run guards nothing
+    regressions.extend(f"{name}: skipped ({reason})" for name, reason in SKIPPED.items())
+    return regressions
+
+
+def format_results(results: Dict[str, Dict], baseline: Dict[str, Dict]) -> str:
+    lines = [f"{'benchmark':<30} {'us/call':>10} {'baseline':>10} {'change':>8}  covers"]
+    for name, current in results.items():
+        base = baseline.get(name)
+        change = f"{_change(current, base):+.0%}" if base else "-"
+        base_text = f"{base['us_per_call']:.2f}" if base else "-"
+        lines.append(f"{name:<30} {current['us_per_call']:>10.2f} {base_text:>10} {change:>8}  {current['covers']}")
+    for name, reason in SKIPPED.items():
+        lines.append(f"{name:<30} {'skipped':>10} {'':>10} {'':>8}  {reason}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for hot pure-Python helpers")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=MICROBENCH_REPEAT)
+    parser.add_argument("--baseline", default=MICROBENCH_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=MICROBENCH_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    suite = {name: benchmark for name, benchmark in benchmarks().items() if args.filter in name}
+    for name in [name for name in SKIPPED if args.filter not in name]:
+        del SKIPPED[name]
+    results = run(suite, args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(format_results(results, baseline))
+
+    if args.save_baseline:
+        # Merge, so a filtered run only replaces its own entries
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+    elif args.check:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+AI Models
+The food classification and workout classification models, shared by the
+web app (api.py) and the standalone inference server (inference_server.py).
+Both are loaded lazily through model_registry.py.
+"""
+
+import io
+from typing import Dict, List, Union
+
+from inference_batcher import MicroBatcher
+from model_registry import lazy_model, get_torch_device
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# Food classification model
+FOOD_MODEL_NAME = "Kaludi/food-category-classification-v2.0"
+food_processor = None
+food_model = None
+
+
+def load_food_classification_model():
+    """Load the food classification model from Hugging Face"""
+    global food_processor, food_model
+    from transformers import AutoImageProcessor, AutoModelForImageClassification
+    device = get_torch_device()
+    try:
+        logger.info("Loading food classification model: %s", FOOD_MODEL_NAME)
+        food_processor = AutoImageProcessor.from_pretrained(FOOD_MODEL_NAME)
+        food_model = AutoModelForImageClassification.from_pretrained(FOOD_MODEL_NAME)
+        food_model.to(device)
+        food_model.eval()
+        logger.info("Food classification model loaded successfully")
+    except Exception as e:
+        logger.error("Error loading food classification model: %s", e)
+        # Fallback to a simpler model
+        try:
+            fallback_model = "Shresthadev403/food-image-classification"
+            logger.info("Loading fallback model: %s", fallback_model)
+            food_processor = AutoImageProcessor.from_pretrained(fallback_model)
+            food_model = AutoModelForImageClassification.from_pretrained(fallback_model)
+            food_model.to(device)
+            food_model.eval()
+            logger.info("Fallback food classification model loaded successfully")
+        except Exception as e2:
+            logger.error("Error loading fallback model: %s", e2)
+            food_processor = None
+            food_model = None
+
+
+def _load_food_classifier():
+    load_food_classification_model()
+    if food_model is None or food_processor is None:
+        raise RuntimeError("Food classification model not loaded")
+    return food_processor, food_model
+
+
+food_classifier = lazy_model("food-classifier", _load_food_classifier)
+
+
+def classify_food_image(image_data: bytes) -> Dict:
+    """
+    Classify food in an image using Hugging Face model
+    Returns the detected food type and confidence
+    """
+    try:
+        food_processor, food_model = food_classifier.get()
+    except Exception:
+        return {"error": "Food classification model not loaded"}
+    
+    try:
+        import torch
+        
+        # Convert bytes to PIL Image
+        from PIL import Image
+        image = Image.open(io.BytesIO(image_data))
+        
+        # Preprocess image
+        inputs = food_processor(images=image, return_tensors="pt")
+        inputs = {k: v.to(get_torch_device()) for k, v in inputs.items()}
+        
+        # Get predictions
+        with torch.no_grad():
+            outputs = food_model(**inputs)
+            logits = outputs.logits
+            probabilities = torch.nn.functional.softmax(logits, dim=-1)
+        
+        # Get top predictions
+        top_probs, top_indices = torch.topk(probabilities, 3)
+        
+        predictions = []
+        for i in range(len(top_indices[0])):
+            label_id = top_indices[0][i].item()
+            confidence = top_probs[0][i].item()
+            label = food_model.config.id2label.get(label_id, f"class_{label_id}")
+            predictions.append({
+                "food_type": label,
+                "confidence": confidence,
+                "label_id": label_id
+            })
+        
+        return {
+            "success": True,
+            "predictions": predictions,
+            "top_prediction": predictions[0] if predictions else None
+        }
+        
+    except Exception as e:
+        logger.error("Error classifying food image: %s", e)
+        return {"error": f"Error classifying image: {str(e)}"}
+
+
+def classify_food_batch(images: List[bytes]) -> List[Dict]:
+    """Runs on the food batcher's worker thread; classify_food_image takes one image at a time"""
+    return [classify_food_image(image_data) for image_data in images]
+
+
+# Food photos are classified one at a time on a dedicated thread, so inference
+# never takes a database executor thread
+food_batcher = MicroBatcher(classify_food_batch, name="food-classifier", max_batch_size=1, max_wait_ms=0)
+
+
+# Workout classifier, loaded on first use or by the startup warm-up
+WORKOUT_MODEL_NAME = "prithivMLmods/Gym-Workout-Classifier-SigLIP2"
+
+
+def _load_workout_classifier():
+    from transformers import AutoImageProcessor, SiglipForImageClassification
+    image_processor = AutoImageProcessor.from_pretrained(WORKOUT_MODEL_NAME)
+    model = SiglipForImageClassification.from_pretrained(WORKOUT_MODEL_NAME).to(get_torch_device())
+    return image_processor, model
+
+
+workout_classifier = lazy_model("workout-classifier", _load_workout_classifier)
+
+
+def classify_workout_batch(frames: List[bytes]) -> List[Union[Dict, Exception]]:
+    """
+    Classify a batch of encoded webcam frames in one forward pass.
+    Runs on the workout batcher's worker thread; frames that fail to decode
+    get a ValueError instead of failing the whole batch.
+    """
+    import cv2
+    import numpy as np
+    import torch
+    
+    image_processor, model = workout_classifier.get()
+    results: List[Union[Dict, Exception]] = [None] * len(frames)
+    images, positions = [], []
+    for i, contents in enumerate(frames):
+        frame = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            results[i] = ValueError("Could not decode image")
+            continue
+        images.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        positions.append(i)
+    if not images:
+        return results
+
+    inputs = image_processor(images=images, return_tensors="pt").to(get_torch_device())
+    with torch.no_grad():
+        logits = model(**inputs).logits
+    probabilities = torch.nn.functional.softmax(logits, dim=-1)
+    scores, indices = probabilities.max(dim=-1)
+    for position, idx, score, probs in zip(positions, indices.tolist(), scores.tolist(), probabilities.tolist()):
+        results[position] = {
+            "label": model.config.id2label.get(idx, str(idx)),
+            "score": score,
+            "probabilities": probs,
+        }
+    return results
+
+
+# Frames from concurrent requests are batched for a few ms (CLASSIFIER_MAX_BATCH_SIZE,
+# CLASSIFIER_MAX_WAIT_MS) and classified together on a dedicated thread
+workout_batcher = MicroBatcher(classify_workout_batch, name="workout-classifier")
+
+
+def workout_labels() -> Dict[int, str]:
+    """Class index -> exercise name for the workout classifier"""
+    return workout_classifier.get()[1].config.id2label
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Lazy Model Registry
+ML models (and the torch/transformers/cv2 imports they need) are loaded on
+first use or by a background warm-up thread at startup, never while api.py
+is being imported. Registered models report their state to /api/ready.
+
+Usage:
+    python model_registry.py import-budget            # check `import api` against IMPORT_TIME_BUDGET
+    python model_registry.py import-budget --budget 2
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Models to load in the background at startup: "all", "none", or a comma-separated list of names
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "all")
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", "3"))  # seconds for `import api`
+
+# Modules that must not be imported by `import api`
+HEAVY_MODULES = ("torch", "transformers", "cv2", "pandas", "ultralytics")
+
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+_warmup_thread: Optional[threading.Thread] = None
+_import_time: Optional[float] = None
+_device = None
+
+
+class LazyModel:
+    """
+    A model loaded once, on first get(), by the given loader.
+
+    A failed load is remembered and retried on the next get(), so a
+    transient download error doesn't disable the model until restart.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._value = None
+        self._lock = threading.Lock()
+        self.state = "not_loaded"
+        self.error: Optional[str] = None
+        self.load_time: Optional[float] = None
+        self.loaded_at: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.state == "loaded"
+
+    def get(self) -> Any:
+        if self._value is not None:
+            return self._value
+        with self._lock:
+            if self._value is None:
+                self.state = "loading"
+                start_time = time.time()
+                try:
+                    value = self._loader()
+                except Exception as e:
+                    self.state = "failed"
+                    self.error = str(e)
+                    logger.error("❌ Failed to load model %s: %s", self.name, e)
+                    raise
+                self.load_time = time.time() - start_time
+                self.loaded_at = datetime.now().isoformat()
+                self.state = "loaded"
+                self.error = None
+                self._value = value
+                logger.info("✅ Model %s loaded in %.2fs", self.name, self.load_time)
+        return self._value
+
+    def ensure_loaded(self):
+        self.get()
+
+    def status(self) -> Dict:
+        return {
+            "state": self.state,
+            "loaded": self.loaded,
+            "load_time_seconds": round(self.load_time, 3) if self.load_time is not None else None,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+        }
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def lazy_module(name: str) -> LazyModule:
+    """e.g. `pd = lazy_module("pandas")` keeps `pd.DataFrame(...)` call sites unchanged"""
+    return LazyModule(name)
+
+
+def register_model(model) -> Any:
+    """
+    Register a model for warm-up and readiness reporting.
+
+    Anything with a name, ensure_loaded() and a status() dict containing
+    "state" and "loaded" can be registered (see routes/food_detect.py).
+    """
+    with _models_lock:
+        _models[model.name] = model
+    return model
+
+
+def lazy_model(name: str, loader: Callable[[], Any]) -> LazyModel:
+    """Create and register a LazyModel"""
+    return register_model(LazyModel(name, loader))
+
+
+def get_torch_device():
+    """torch.device to run models on, resolved (and torch imported) on first call"""
+    global _device
+    if _device is None:
+        import torch
+        _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return _device
+
+
+def _warmup_names() -> List[str]:
+    setting = MODEL_WARMUP.strip().lower()
+    if setting in ("", "none", "0", "false"):
+        return []
+    if setting == "all":
+        return list(_models)
+    return [name.strip() for name in MODEL_WARMUP.split(",") if name.strip() in _models]
+
+
+def _warm_up(names: List[str]):
+    for name in names:
+        try:
+            _models[name].ensure_loaded()
+        except Exception:
+            pass  # already reported by the model; first use will retry
+
+
+def start_warmup():
+    """Load the MODEL_WARMUP models one after another on a background thread"""
+    global _warmup_thread
+    names = _warmup_names()
+    if not names or (_warmup_thread is not None and _warmup_thread.is_alive()):
+        return
+    logger.info("🔥 Warming up models in the background: %s", ', '.join(names))
+    _warmup_thread = threading.Thread(target=_warm_up, args=(names,), name="model-warmup", daemon=True)
+    _warmup_thread.start()
+
+
+def record_import_time(seconds: float):
+    """Called at the end of api.py with the time its import took"""
+    global _import_time
+    _import_time = seconds
+    status = "within" if seconds <= IMPORT_TIME_BUDGET else "OVER"
+    logger.info("api.py imported in %.2fs (%s the %.1fs budget)", seconds, status, IMPORT_TIME_BUDGET)
+
+
+def readiness(required: Optional[List[str]] = None) -> Dict:
+    """
+    Per-model load state. The process is ready once every required model
+    (by default those selected by MODEL_WARMUP) has loaded or failed to
+    load; models left to lazy loading don't count. A failed model is listed
+    under "failed" and retried on use, so a missing optional dependency
+    doesn't keep the process out of service.
+    """
+    models = {name: model.status() for name, model in list(_models.items())}
+    required = _warmup_names() if required is None else required
+    failed = [name for name in required if models[name]["state"] == "failed"]
+    return {
+        "ready": all(models[name]["loaded"] or name in failed for name in required),
+        "warmup": required,
+        "failed": failed,
+        "models": models,
+        "import_time_seconds": round(_import_time, 3) if _import_time is not None else None,
+        "import_time_budget_seconds": IMPORT_TIME_BUDGET,
+        "heavy_modules_imported": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def check_import_budget(budget: float = IMPORT_TIME_BUDGET) -> bool:
+    """Import api in a fresh interpreter and check time and eagerly imported heavy modules"""
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import api\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print('import-budget', elapsed, ','.join(heavy))\n"
+    )
+    env = dict(os.environ, MODEL_WARMUP="none")
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        print("❌ import api failed")
+        return False
+
+    # api.py logs while importing; pick our report line out of the output
+    report = next(line for line in result.stdout.splitlines() if line.startswith("import-budget ")).split(" ")
+    elapsed = float(report[1])
+    heavy = report[2].split(",") if len(report) > 2 and report[2] else []
+    ok = elapsed <= budget and not heavy
+    print(f"import api: {elapsed:.2f}s (budget {budget:.1f}s)")
+    print(f"heavy modules imported eagerly: {', '.join(heavy) if heavy else 'none'}")
+    print("✅ Within budget" if ok else "❌ Over budget")
+    return ok
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "import-budget":
+        print(__doc__)
+        sys.exit(1)
+    budget = IMPORT_TIME_BUDGET
+    if sys.argv[2:3] == ["--budget"]:
+        budget = float(sys.argv[3])
+    sys.exit(0 if check_import_budget(budget) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+USDA Nutrition Cache
+Two-tier cache for USDA FoodData Central lookups: an in-process LRU in front
+of an on-disk SQLite store, keyed by FDC ID and normalized query string.
+
+Entries expire after NUTRITION_CACHE_TTL seconds. Concurrent lookups of the
+same key share a single upstream call. With NUTRITION_CACHE_OFFLINE=1 the
+cache never calls upstream and serves whatever is on disk (expired or not),
+so a pre-warmed cache file makes nutrition lookups work without network.
+
+Usage:
+    python nutrition_cache.py stats
+    python nutrition_cache.py warm banana apple "chicken breast"
+    python nutrition_cache.py warm --file foods.txt
+"""
+
+import asyncio
+import copy
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app_logging import get_logger
+from db_offload import run_in_db_executor
+
+logger = get_logger(__name__)
+
+NUTRITION_CACHE_PATH = os.environ.get("NUTRITION_CACHE_PATH", os.path.join("cache", "nutrition_cache.sqlite3"))
+NUTRITION_CACHE_TTL = float(os.environ.get("NUTRITION_CACHE_TTL", str(30 * 24 * 3600)))  # USDA data changes rarely
+NUTRITION_CACHE_MEMORY_SIZE = int(os.environ.get("NUTRITION_CACHE_MEMORY_SIZE", "2000"))
+NUTRITION_CACHE_DISK_SIZE = int(os.environ.get("NUTRITION_CACHE_DISK_SIZE", "200000"))
+NUTRITION_CACHE_OFFLINE = os.environ.get("NUTRITION_CACHE_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, trim and collapse whitespace so 'Banana ' and 'banana' share a key"""
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+def food_key(fdc_id: int) -> str:
+    return f"fdc:{int(fdc_id)}"
+
+
+def query_key(kind: str, query: str, max_results: Optional[int] = None) -> str:
+    key = f"{kind}:{normalize_query(query)}"
+    return key if max_results is None else f"{key}:{max_results}"
+
+
+class NutritionCache:
+    """
+    In-process LRU backed by a size-bounded SQLite file.
+
+    Values must be JSON-serializable. Empty results (None, [], {}) are never
+    cached so a transient upstream failure does not get pinned for the TTL.
+    """
+
+    def __init__(
+        self,
+        path: str = NUTRITION_CACHE_PATH,
+        ttl: float = NUTRITION_CACHE_TTL,
+        memory_size: int = NUTRITION_CACHE_MEMORY_SIZE,
+        disk_size: int = NUTRITION_CACHE_DISK_SIZE,
+        offline: bool = NUTRITION_CACHE_OFFLINE,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.offline = offline
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._inflight: Dict[str, Future] = {}
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+            "coalesced": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    # Disk tier
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS nutrition_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON nutrition_cache (accessed_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        try:
+            with self._db_lock:
+                db = self._connect()
+                row = db.execute(
+                    "SELECT value, fetched_at FROM nutrition_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                db.execute("UPDATE nutrition_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+            return json.loads(row[0]), row[1]
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning("Nutrition cache disk read failed for %s: %s", key, e)
+            return None
+
+    def _disk_set(self, key: str, value: Any, fetched_at: float):
+        try:
+            with self._db_lock:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO nutrition_cache (key, value, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), fetched_at, fetched_at),
+                )
+                (count,) = db.execute("SELECT COUNT(*) FROM nutrition_cache").fetchone()
+                overflow = count - self.disk_size
+                if overflow > 0:
+                    db.execute(
+                        "DELETE FROM nutrition_cache WHERE key IN "
+                        "(SELECT key FROM nutrition_cache ORDER BY accessed_at LIMIT ?)",
+                        (overflow,),
+                    )
+                    self._stats["disk_evictions"] += overflow
+                db.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning("Nutrition cache disk write failed for %s: %s", key, e)
+
+    # Memory tier
+
+    def _memory_get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_set(self, key: str, value: Any, fetched_at: float):
+        with self._lock:
+            self._memory[key] = (value, fetched_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+                self._stats["memory_evictions"] += 1
+
+    # Public API
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return self.offline or (time.time() - fetched_at) < self.ttl
+
+    def lookup(self, key: str, allow_stale: bool = False) -> Any:
+        """Return a copy of the cached value for key, or _MISSING
+
+        Callers are free to mutate what they get back, so the memory tier
+        only ever hands out copies.
+        """
+        entry = self._memory_get(key)
+        if entry is not None and (allow_stale or self._is_fresh(entry[1])):
+            self._stats["memory_hits"] += 1
+            return copy.deepcopy(entry[0])
+        entry = self._disk_get(key)
+        if entry is not None and (allow_stale or self._is_fresh(entry[1])):
+            self._stats["disk_hits"] += 1
+            self._memory_set(key, *entry)
+            return copy.deepcopy(entry[0])
+        return _MISSING
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any):
+        if not value:
+            return
+        fetched_at = time.time()
+        self._memory_set(key, copy.deepcopy(value), fetched_at)
+        self._disk_set(key, value, fetched_at)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, calling fetch() on a miss.
+
+        Concurrent callers for the same key (from any thread or event loop)
+        wait on the first caller's upstream request instead of issuing their own.
+        The SQLite tier is read and written on the database executor, so callers
+        running on the event loop never block on disk.
+        """
+        value = await run_in_db_executor(self.lookup, key)
+        if value is not _MISSING:
+            return value
+
+        if self.offline:
+            self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = Future()
+                self._inflight[key] = pending
+            else:
+                self._stats["coalesced"] += 1
+
+        if not owner:
+            return copy.deepcopy(await asyncio.wrap_future(pending))
+
+        self._stats["misses"] += 1
+        try:
+            self._stats["upstream_calls"] += 1
+            value = await fetch()
+            if value:
+                await run_in_db_executor(self.set, key, value)
+            else:
+                # Serve an expired copy rather than nothing when upstream comes back empty
+                stale = await run_in_db_executor(self.lookup, key, allow_stale=True)
+                if stale is not _MISSING:
+                    self._stats["stale_hits"] += 1
+                    value = stale
+            pending.set_result(value)
+            return value
+        except Exception as e:
+            self._stats["upstream_errors"] += 1
+            stale = await run_in_db_executor(self.lookup, key, allow_stale=True)
+            if stale is not _MISSING:
+                self._stats["stale_hits"] += 1
+                pending.set_result(stale)
+                return stale
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            if not pending.done():
+                # Cancelled, or the stale fallback itself failed: don't leave the waiters hanging
+                pending.set_exception(RuntimeError(f"Fetch for {key!r} did not complete"))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["memory_entries"] = len(self._memory)
+        try:
+            with self._db_lock:
+                (snapshot["disk_entries"],) = self._connect().execute(
+                    "SELECT COUNT(*) FROM nutrition_cache"
+                ).fetchone()
+        except sqlite3.Error:
+            snapshot["disk_entries"] = None
+        lookups = snapshot["memory_hits"] + snapshot["disk_hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = round((snapshot["memory_hits"] + snapshot["disk_hits"]) / lookups, 3) if lookups else 0.0
+        snapshot.update({
+            "path": self.path,
+            "ttl_seconds": self.ttl,
+            "memory_size": self.memory_size,
+            "disk_size": self.disk_size,
+            "offline": self.offline,
+        })
+        return snapshot
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Process-wide cache used by api.py
+nutrition_cache = NutritionCache()
+
+
+async def _warm(food_names):
+    # Imported lazily: warming reuses the exact lookup code the API serves from
+    from api import search_and_get_nutrition, search_usda_foods
+    for name in food_names:
+        await search_usda_foods(name, max_results=10)
+        nutrition = await search_and_get_nutrition(name)
+        status = "ok" if nutrition else "not found"
+        print(f"{name}: {status}")
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "warm"):
+        print(__doc__)
+        sys.exit(1)
+
+    # Use the module instance api.py shares, not this __main__ copy
+    from nutrition_cache import nutrition_cache as cache
+
+    if sys.argv[1] == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+        return
+
+    names = sys.argv[2:]
+    if names[:1] == ["--file"]:
+        with open(names[1], encoding="utf-8") as f:
+            names = [line.strip() for line in f if line.strip()]
+    asyncio.run(_warm(names))
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Query Profiler
+Slow-query log and N+1 detector for statements run through the connection
+pool (db_pool.py).
+
+For every statement it sees it records the normalized template, the shape of
+the parameters (types and counts, never values), the duration and the call
+site in our code. Two kinds of problems are reported:
+
+- slow queries: statements over SLOW_QUERY_MS
+- N+1 patterns: the same statement template run N_PLUS_ONE_THRESHOLD or more
+  times in one request, or the same API route called that many times from
+  one page load (e.g. a page fetching /selected-plan once per member)
+
+QUERY_PROFILE selects the mode:
+    off   - no listener, no middleware (zero overhead)
+    slow  - production: slow queries and N+1 findings only (default)
+    all   - development: also keep the last QUERY_LOG_SIZE statements
+
+Usage:
+    python query_profiler.py report                          # text report from a running server
+    python query_profiler.py report --url http://127.0.0.1:8001
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app_logging import get_logger
+from db_pool import add_query_listener, remove_query_listener
+from metrics import RouteTemplates
+
+logger = get_logger(__name__)
+
+# Profiler settings
+QUERY_PROFILE = os.environ.get("QUERY_PROFILE", "slow")                        # "off", "slow" or "all"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", "5"))        # repeats that count as N+1
+PAGE_LOAD_WINDOW_SECONDS = float(os.environ.get("PAGE_LOAD_WINDOW_SECONDS", "3"))  # gap that ends a page load
+QUERY_LOG_SIZE = int(os.environ.get("QUERY_LOG_SIZE", "500"))                  # statements kept in "all" mode
+
+# Frames from these files are skipped when looking for the call site
+_INTERNAL_FILES = ("db_pool.py", "query_profiler.py", "metrics.py", "contextlib.py")
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Statement template: literals and placeholders become ?, IN lists collapse to (?+)"""
+    template = _STRING_LITERAL.sub("?", sql)
+    template = _PLACEHOLDER.sub("?", template)
+    template = _NUMBER_LITERAL.sub("?", template)
+    template = _IN_LIST.sub("(?+)", template)
+    return _WHITESPACE.sub(" ", template).strip()
+
+
+def params_shape(params) -> str:
+    """Types of the parameters without their values, e.g. "(int, str)" or "[12 x tuple]" """
+    if params is None:
+        return "none"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    if isinstance(params, (list, tuple)):
+        if params and all(isinstance(item, (list, tuple, dict)) for item in params):
+            return f"[{len(params)} x {type(params[0]).__name__}]"  # executemany rows
+        return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+    return type(params).__name__
+
+
+def call_site() -> str:
+    """First frame outside the database layer, as "file.py:line in function" """
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.endswith(_INTERNAL_FILES) and "pymysql" not in filename:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class _RequestProfile:
+    __slots__ = ("method", "path", "templates", "slow")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.templates: Dict[str, list] = {}  # template -> [count, seconds, call site]
+        self.slow: List[tuple] = []           # recorded under the route template when the request ends
+
+
+_current: ContextVar[Optional[_RequestProfile]] = ContextVar("query_profile", default=None)
+
+
+class QueryProfiler:
+    """Collects slow queries and N+1 findings; report() returns them worst first"""
+
+    def __init__(
+        self,
+        mode: str = QUERY_PROFILE,
+        slow_query_ms: float = SLOW_QUERY_MS,
+        n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD,
+        page_load_window: float = PAGE_LOAD_WINDOW_SECONDS,
+    ):
+        self.mode = mode
+        self.slow_query_seconds = slow_query_ms / 1000.0
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.page_load_window = page_load_window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._slow: Dict[str, Dict] = {}
+            self._n_plus_one: Dict[tuple, Dict] = {}
+            self._api_n_plus_one: Dict[tuple, Dict] = {}
+            self._routes: Dict[str, Dict] = {}
+            self._page_loads: Dict[tuple, Dict] = {}
+            self._recent = deque(maxlen=QUERY_LOG_SIZE)
+            self._started_at = time.time()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("slow", "all")
+
+    def start(self):
+        if self.enabled:
+            add_query_listener(self.on_query)
+
+    def stop(self):
+        remove_query_listener(self.on_query)
+
+    # Statement level
+
+    def on_query(self, sql: str, params, seconds: float, error: Optional[BaseException]):
+        """db_pool query listener"""
+        profile = _current.get()
+        is_slow = seconds >= self.slow_query_seconds
+        if profile is None and not is_slow and self.mode != "all":
+            return
+
+        template = normalize_sql(sql)
+        site, route = None, None
+        if profile is not None:
+            entry = profile.templates.get(template)
+            if entry is None:
+                entry = profile.templates[template] = [0, 0.0, call_site()]
+            entry[0] += 1
+            entry[1] += seconds
+            site, route = entry[2], f"{profile.method} {profile.path}"
+        elif is_slow or self.mode == "all":
+            site = call_site()
+
+        if is_slow:
+            if profile is not None:
+                profile.slow.append((template, params_shape(params), seconds, site))
+            else:
+                self._record_slow(template, params_shape(params), seconds, site, None)
+            logger.warning("Slow query (%.0f ms) at %s [%s]: %s", seconds * 1000, site, route, template)
+        if self.mode == "all":
+            with self._lock:
+                self._recent.append({
+                    "at": time.time(),
+                    "template": template,
+                    "params": params_shape(params),
+                    "ms": round(seconds * 1000, 2),
+                    "call_site": site,
+                    "route": route,
+                    "error": str(error) if error is not None else None,
+                })
+            logger.debug("%.1f ms %s %s", seconds * 1000, site, template)
+
+    def _record_slow(self, template: str, shape: str, seconds: float, site: str, route: Optional[str]):
+        with self._lock:
+            entry = self._slow.get(template)
+            if entry is None:
+                entry = self._slow[template] = {
+                    "template": template,
+                    "params": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "call_sites": {},
+                    "routes": {},
+                }
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            entry["call_sites"][site] = entry["call_sites"].get(site, 0) + 1
+            if route:
+                entry["routes"][route] = entry["routes"].get(route, 0) + 1
+
+    # Request level
+
+    def begin_request(self, method: str, path: str):
+        return _current.set(_RequestProfile(method, path))
+
+    def end_request(self, token, route: str, page_key: Optional[tuple]):
+        profile = _current.get()
+        _current.reset(token)
+        if profile is None:
+            return
+        profile.path = route
+        total_queries = sum(entry[0] for entry in profile.templates.values())
+        route_key = f"{profile.method} {route}"
+
+        with self._lock:
+            stats = self._routes.setdefault(route_key, {"requests": 0, "queries": 0, "max_queries": 0, "templates": set()})
+            stats["requests"] += 1
+            stats["queries"] += total_queries
+            stats["max_queries"] = max(stats["max_queries"], total_queries)
+            stats["templates"].update(profile.templates)
+
+        for template, shape, seconds, site in profile.slow:
+            self._record_slow(template, shape, seconds, site, route_key)
+        for template, (count, seconds, site) in profile.templates.items():
+            if count >= self.n_plus_one_threshold:
+                self._record_n_plus_one(route_key, template, count, seconds, site)
+
+        if page_key is not None:
+            self._record_page_request(page_key, route_key)
+
+    def _record_n_plus_one(self, route_key: str, template: str, count: int, seconds: float, site: str):
+        with self._lock:
+            entry = self._n_plus_one.get((route_key, template))
+            if entry is None:
+                entry = self._n_plus_one[(route_key, template)] = {
+                    "route": route_key,
+                    "template": template,
+                    "call_site": site,
+                    "occurrences": 0,
+                    "max_repeats": 0,
+                    "total_ms": 0.0,
+                }
+                logger.warning("N+1 query: ran %d times in one %s request at %s: %s", count, route_key, site, template)
+            entry["occurrences"] += 1
+            entry["max_repeats"] = max(entry["max_repeats"], count)
+            entry["total_ms"] += seconds * 1000
+
+    def _record_page_request(self, page_key: tuple, route_key: str):
+        """Count API routes per page load: requests from one client and page with gaps under the window"""
+        now = time.monotonic()
+        with self._lock:
+            page = self._page_loads.get(page_key)
+            if page is None or now - page["last_seen"] > self.page_load_window:
+                if len(self._page_loads) > 1000:
+                    self._page_loads = {
+                        key: value for key, value in self._page_loads.items()
+                        if now - value["last_seen"] <= self.page_load_window
+                    }
+                page = self._page_loads[page_key] = {"last_seen": now, "routes": {}}
+            page["last_seen"] = now
+            count = page["routes"][route_key] = page["routes"].get(route_key, 0) + 1
+            if count < self.n_plus_one_threshold:
+                return
+            page_path = page_key[1]
+            entry = self._api_n_plus_one.get((page_path, route_key))
+            if entry is None:
+                entry = self._api_n_plus_one[(page_path, route_key)] = {
+                    "page": page_path, "route": route_key, "page_loads": 0, "max_calls": 0,
+                }
+            if count == self.n_plus_one_threshold:
+                entry["page_loads"] += 1
+                if entry["page_loads"] == 1:
+                    logger.warning("N+1 API calls: page %s called %s %d+ times", page_path, route_key, count)
+            entry["max_calls"] = max(entry["max_calls"], count)
+
+    def report(self, limit: int = 20) -> Dict:
+        with self._lock:
+            slow = sorted(self._slow.values(), key=lambda entry: entry["total_ms"], reverse=True)[:limit]
+            n_plus_one = sorted(
+                self._n_plus_one.values(), key=lambda entry: entry["occurrences"] * entry["max_repeats"], reverse=True
+            )[:limit]
+            api_n_plus_one = sorted(
+                self._api_n_plus_one.values(), key=lambda entry: entry["page_loads"] * entry["max_calls"], reverse=True
+            )[:limit]
+            routes = sorted(
+                (
+                    {
+                        "route": route,
+                        "requests": stats["requests"],
+                        "avg_queries": round(stats["queries"] / stats["requests"], 2),
+                        "max_queries": stats["max_queries"],
+                        "distinct_templates": len(stats["templates"]),
+                    }
+                    for route, stats in self._routes.items()
+                ),
+                key=lambda entry: entry["avg_queries"],
+                reverse=True,
+            )[:limit]
+            recent = list(self._recent)[-limit:]
+        return {
+            "mode": self.mode,
+            "since": self._started_at,
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "slow_queries": [
+                dict(entry, total_ms=round(entry["total_ms"], 2), max_ms=round(entry["max_ms"], 2),
+                     avg_ms=round(entry["total_ms"] / entry["count"], 2),
+                     call_sites=dict(entry["call_sites"]), routes=dict(entry["routes"]))
+                for entry in slow
+            ],
+            "n_plus_one_queries": [dict(entry, total_ms=round(entry["total_ms"], 2)) for entry in n_plus_one],
+            "n_plus_one_api_calls": api_n_plus_one,
+            "queries_per_route": routes,
+            "recent_queries": recent,
+        }
+
+
+def format_report(report: Dict) -> str:
+    """Plain-text version of QueryProfiler.report()"""
+    lines = [
+        f"Query profile (mode={report['mode']}, slow >= {report['slow_query_ms']:.0f} ms, "
+        f"N+1 >= {report['n_plus_one_threshold']} repeats)",
+        "",
+        "Slow queries (by total time):",
+    ]
+    for entry in report["slow_queries"] or []:
+        lines.append(f"  {entry['count']:>5}x  avg {entry['avg_ms']:.0f} ms  max {entry['max_ms']:.0f} ms  {entry['template']}")
+        lines.append(f"          params {entry['params']}  at {', '.join(entry['call_sites'])}")
+    if not report["slow_queries"]:
+        lines.append("  none")
+
+    lines += ["", "N+1 queries (same statement repeated in one request):"]
+    for entry in report["n_plus_one_queries"]:
+        lines.append(f"  {entry['route']}: up to {entry['max_repeats']}x per request, "
+                     f"{entry['occurrences']} requests, at {entry['call_site']}")
+        lines.append(f"          {entry['template']}")
+    if not report["n_plus_one_queries"]:
+        lines.append("  none")
+
+    lines += ["", "N+1 API calls (same route repeated in one page load):"]
+    for entry in report["n_plus_one_api_calls"]:
+        lines.append(f"  page {entry['page']} -> {entry['route']}: up to {entry['max_calls']} calls, "
+                     f"{entry['page_loads']} page loads")
+    if not report["n_plus_one_api_calls"]:
+        lines.append("  none")
+
+    lines += ["", "Queries per request (by average):"]
+    for entry in report["queries_per_route"]:
+        lines.append(f"  {entry['avg_queries']:>6} avg  {entry['max_queries']:>4} max  "
+                     f"{entry['distinct_templates']:>3} templates  {entry['route']}")
+    return "\n".join(lines) + "\n"
+
+
+class QueryProfilerMiddleware:
+    """Scopes statement counts to each HTTP request and groups requests into page loads"""
+
+    def __init__(self, app, profiler: Optional[QueryProfiler] = None):
+        self.app = app
+        self.profiler = profiler or query_profiler
+        self._route_template = RouteTemplates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+        token = self.profiler.begin_request(scope["method"], scope.get("path", ""))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end_request(token, self._route_template(scope), _page_key(scope))
+
+
+def _page_key(scope) -> Optional[tuple]:
+    """(client, referring page) for API calls made by a page, else None"""
+    headers = dict(scope.get("headers") or [])
+    referer = headers.get(b"referer")
+    if not referer:
+        return None
+    page = re.sub(r"^https?://[^/]+", "", referer.decode("latin-1")).split("?")[0]
+    cookies = headers.get(b"cookie", b"").decode("latin-1")
+    match = re.search(r"session_id=([^;]+)", cookies)
+    client = match.group(1) if match else (scope.get("client") or ("",))[0]
+    return client, page
+
+
+# Process-wide profiler used by api.py
+query_profiler = QueryProfiler()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "report":
+        print(__doc__)
+        sys.exit(1)
+    url = "http://127.0.0.1:8000"
+    if sys.argv[2:3] == ["--url"]:
+        url = sys.argv[3].rstrip("/")
+
+    import httpx
+    response = httpx.get(f"{url}/api/debug/query-report", params={"format": "text"}, timeout=10)
+    response.raise_for_status()
+    print(response.text)
+
+
+if __name__ == "__main__":
+    main()
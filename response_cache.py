@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Response Cache
+Read-through cache for the role dashboards (/api/coach/dashboard,
+/api/member/dashboard, /api/gym/dashboard), keyed by endpoint and user.
+
+Entries hold the encoded JSON body, so a hit costs a dictionary lookup and
+no queries or serialization. Each entry is tagged with what it was built
+from ("coach:5:sessions", "member:9:profile", ...); the write endpoints
+invalidate those tags after they commit, and RESPONSE_CACHE_TTL bounds how
+stale an entry can get otherwise (time-based figures such as "today", and
+writes made by another worker process, since each worker has its own cache).
+
+A response computed while one of its tags was being invalidated is not
+stored: callers take a token with begin() before reading the database and
+hand it back to put().
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "30"))  # seconds, 0 disables
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "10000"))  # entries per worker
+RESPONSE_CACHE_TRACKED_INVALIDATIONS = 10000
+
+Key = Tuple[str, int]
+
+
+class ResponseCache:
+    """In-process LRU of encoded responses with TTL and tag-based invalidation"""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Key, tuple]" = OrderedDict()  # key -> (body, expires_at, tags)
+        self._tags: Dict[str, Set[Key]] = {}
+        # Generation of each tag's latest invalidation, for put()'s staleness check
+        self._generation = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0  # generations at or below this are no longer tracked per tag
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "skipped_stale": 0, "invalidations": 0,
+                       "invalidated_entries": 0, "expired": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _drop(self, key: Key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, endpoint: str, user_id: int) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        key = (endpoint, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            if entry is not None:
+                self._drop(key)
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+
+    def begin(self) -> int:
+        """Token to pass to put(); take it before reading what the response is built from"""
+        with self._lock:
+            return self._generation
+
+    def put(self, endpoint: str, user_id: int, body: bytes, tags: Iterable[str], token: int):
+        if not self.enabled:
+            return
+        key = (endpoint, user_id)
+        tags = frozenset(tags)
+        with self._lock:
+            if token < self._floor or any(self._invalidated.get(tag, 0) > token for tag in tags):
+                self._stats["skipped_stale"] += 1
+                return
+            self._drop(key)
+            self._entries[key] = (body, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self, *tags: str):
+        """Drop every entry built from any of these tags"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+            for tag in tags:
+                self._invalidated[tag] = self._generation
+                self._invalidated.move_to_end(tag)
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    self._stats["invalidated_entries"] += 1
+            while len(self._invalidated) > RESPONSE_CACHE_TRACKED_INVALIDATIONS:
+                _, generation = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, generation)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._generation += 1
+            self._floor = self._generation
+
+    def stats(self) -> Dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = round(snapshot["hits"] / lookups, 3) if lookups else 0.0
+        snapshot.update({"ttl_seconds": self.ttl, "max_entries": self.max_entries})
+        return snapshot
+
+
+# Process-wide cache used by api.py
+response_cache = ResponseCache()
+
+
+# Write events: call after the transaction commits, with whatever ids the write touched
+
+def _ids(ids) -> Iterable[int]:
+    return [i for i in ([ids] if isinstance(ids, int) else ids) if i is not None]
+
+
+def sessions_written(gym_id: Optional[int], coach_ids=(), member_ids=()):
+    """Sessions created, changed or deleted"""
+    tags = [f"coach:{i}:sessions" for i in _ids(coach_ids)] + [f"member:{i}:sessions" for i in _ids(member_ids)]
+    if gym_id is not None:
+        tags.append(f"gym:{gym_id}:sessions")
+    response_cache.invalidate(*tags)
+
+
+def member_written(gym_id: Optional[int], member_id: int):
+    """A member was added, edited or deleted"""
+    tags = [f"member:{member_id}:profile"]
+    if gym_id is not None:
+        tags.append(f"gym:{gym_id}:members")
+    response_cache.invalidate(*tags)
+
+
+def assignment_written(member_id: int, coach_ids=()):
+    """A member's coach assignment changed (pass the old and the new coach)"""
+    response_cache.invalidate(f"member:{member_id}:coach", *[f"coach:{i}:members" for i in _ids(coach_ids)])
+
+
+def coach_written(gym_id: Optional[int], coach_id: int):
+    """A coach was added, edited or deleted"""
+    tags = [f"coach:{coach_id}:profile"]
+    if gym_id is not None:
+        tags.append(f"gym:{gym_id}:coaches")
+    response_cache.invalidate(*tags)
+
+
+# What each dashboard is built from
+
+def coach_dashboard_tags(coach_id: int, gym_id: Optional[int], member_ids: Iterable[int]) -> Set[str]:
+    tags = {f"coach:{coach_id}:profile", f"coach:{coach_id}:members", f"coach:{coach_id}:sessions"}
+    if gym_id is not None:
+        tags.add(f"gym:{gym_id}:profile")
+    tags.update(f"member:{i}:profile" for i in member_ids)
+    return tags
+
+
+def member_dashboard_tags(member_id: int, coach_id: Optional[int]) -> Set[str]:
+    tags = {f"member:{member_id}:profile", f"member:{member_id}:sessions", f"member:{member_id}:coach"}
+    if coach_id is not None:
+        tags.add(f"coach:{coach_id}:profile")
+    return tags
+
+
+def gym_dashboard_tags(gym_id: int) -> Set[str]:
+    return {f"gym:{gym_id}:{part}" for part in ("profile", "members", "coaches", "sessions")}
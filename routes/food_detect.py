@@ -3,12 +3,14 @@ Food Detection API Routes
 Integrates YOLOv5 food detection with existing FastAPI backend
 """
 
+import io
 import os
 import sys
+import threading
 import time
 import uuid
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -16,29 +18,200 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from PIL import Image
 import json
 
 # Import the food detector
 from food_detect import FoodDetector
+from model_registry import register_model
+import inference_client
+import metrics
+from app_logging import get_logger
+
+logger = get_logger(__name__)
 
 # Create router
 router = APIRouter(prefix="/api/food-detect", tags=["Food Detection"])
 
-# Global detector instance
-detector = None
-
-def get_detector():
-    """Get or create the food detector instance"""
-    global detector
-    # Force fresh creation for debugging
-    print("🔧 Creating new FoodDetector instance for API...")
-    detector = FoodDetector()
-    print(f"🔧 Detector created - Model loaded: {detector.model is not None}")
-    if detector.model is None:
-        print("❌ Model failed to load in API context")
-    else:
-        print("✅ Model loaded successfully in API context")
-    return detector
+VALID_MODELS = ["yolov8n", "yolov8s", "yolov8m", "yolov8l", "yolov8x"]
+DEFAULT_FOOD_MODEL = os.environ.get("FOOD_DETECT_MODEL", "yolov8n")
+LOAD_RETRY_SECONDS = float(os.environ.get("FOOD_DETECT_LOAD_RETRY_SECONDS", "60"))  # backoff after a failed load
+
+
+class DetectorRegistry:
+    """
+    One FoodDetector per model name, loaded once and shared by every request.
+
+    Requests take a reference to the active detector and keep using it until
+    they finish, so switching models only changes what the next request gets.
+    Registered with model_registry, which warms up the active model at startup.
+
+    A model whose weights fail to load is remembered for LOAD_RETRY_SECONDS:
+    until then get() returns the failed detector (its detect_food() reports
+    "Model not loaded") instead of repeating the YOLO and torch.hub attempts.
+    """
+
+    name = "food-detector"
+
+    def __init__(self, default_model: str = DEFAULT_FOOD_MODEL):
+        self.active_model = default_model
+        self._detectors: Dict[str, FoodDetector] = {}
+        self._info: Dict[str, Dict] = {}
+        self._failed: Dict[str, Tuple[float, FoodDetector]] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _load_lock(self, model_name: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(model_name, threading.Lock())
+
+    def _recent_failure(self, model_name: str) -> Optional[FoodDetector]:
+        """The detector from a failed load of model_name, if that load is still within its backoff"""
+        failed = self._failed.get(model_name)
+        if failed is not None and time.monotonic() - failed[0] < LOAD_RETRY_SECONDS:
+            return failed[1]
+        return None
+
+    def get(self, model_name: Optional[str] = None) -> FoodDetector:
+        """Return the detector for model_name (the active model by default), loading it on first use"""
+        model_name = model_name or self.active_model
+        detector = self._detectors.get(model_name)
+        if detector is not None:
+            return detector
+        detector = self._recent_failure(model_name)
+        if detector is not None:
+            return detector
+
+        # Concurrent first requests wait for a single load instead of each reading the weights
+        with self._load_lock(model_name):
+            detector = self._detectors.get(model_name) or self._recent_failure(model_name)
+            if detector is not None:
+                return detector
+
+            logger.info("🔧 Loading FoodDetector for %s...", model_name)
+            self._info[model_name] = {"state": "loading", "warm": False}
+            start_time = time.time()
+            try:
+                detector = FoodDetector(model_path=f"{model_name}.pt")
+            except Exception as e:
+                self._info[model_name] = {"state": "failed", "warm": False, "error": str(e)}
+                logger.error("❌ Failed to load %s: %s", model_name, e)
+                raise
+            load_time = time.time() - start_time
+            if detector.model is None:
+                # Missing weights or ultralytics: kept aside and retried once the backoff has passed
+                self._failed[model_name] = (time.monotonic(), detector)
+                self._info[model_name] = {"state": "failed", "warm": False, "model_loaded": False,
+                                          "error": "model weights could not be loaded",
+                                          "load_time_seconds": round(load_time, 3),
+                                          "failed_at": datetime.now().isoformat(),
+                                          "retry_after_seconds": LOAD_RETRY_SECONDS}
+                logger.error("❌ Failed to load %s: model weights could not be loaded (retrying in %.0fs)",
+                             model_name, LOAD_RETRY_SECONDS)
+                return detector
+            self._failed.pop(model_name, None)
+            self._info[model_name] = {
+                "state": "cold",
+                "warm": False,
+                "model_loaded": detector.model is not None,
+                "load_time_seconds": round(load_time, 3),
+                "loaded_at": datetime.now().isoformat(),
+                "warmup_time_seconds": None,
+            }
+            logger.info("✅ %s loaded in %.2fs", model_name, load_time)
+            self.warm_up(model_name, detector)
+            with self._lock:
+                self._detectors[model_name] = detector
+            return detector
+
+    def ensure_loaded(self):
+        if self.get().model is None:
+            raise RuntimeError(f"{self.active_model} could not be loaded")
+
+    def warm_up(self, model_name: str, detector: FoodDetector):
+        """Run one dummy inference so the first real request doesn't pay for lazy initialisation"""
+        if detector.model is None:
+            return
+        buffer = io.BytesIO()
+        Image.new("RGB", (320, 320)).save(buffer, format="JPEG")
+        start_time = time.time()
+        result = detector.detect_food(buffer.getvalue())
+        warmup_time = time.time() - start_time
+        warm = bool(result.get("success"))
+        self._info[model_name].update({
+            "state": "warm" if warm else "cold",
+            "warm": warm,
+            "warmup_time_seconds": round(warmup_time, 3),
+        })
+        if warm:
+            logger.info("🔥 %s warmed up in %.2fs", model_name, warmup_time)
+        else:
+            logger.error("❌ %s warm-up failed: %s", model_name, result.get('error'))
+
+    def peek(self, model_name: Optional[str] = None) -> Optional[FoodDetector]:
+        """Return the detector for model_name if it is already loaded, without loading it"""
+        return self._detectors.get(model_name or self.active_model)
+
+    def switch(self, model_name: str) -> FoodDetector:
+        """Load and warm model_name, then make it the active model
+
+        A model whose weights fail to load is not activated (a later switch
+        retries the load once its backoff has passed) and the current model
+        stays in place.
+        """
+        detector = self.get(model_name)
+        with self._lock:
+            if detector.model is None:
+                return detector
+            previous, self.active_model = self.active_model, model_name
+            if previous != model_name:
+                # In-flight requests still hold their own reference to the old detector
+                self._detectors.pop(previous, None)
+                self._info.pop(previous, None)
+        return detector
+
+    def status(self) -> Dict:
+        with self._lock:
+            models = {name: dict(info) for name, info in self._info.items()}
+        active = models.get(self.active_model, {})
+        return {
+            "state": active.get("state", "not_loaded"),
+            "loaded": bool(active.get("model_loaded")) and self.active_model in self._detectors,
+            "active_model": self.active_model,
+            "models": models,
+        }
+
+
+registry = register_model(DetectorRegistry())
+
+
+def get_detector() -> FoodDetector:
+    """Get the shared detector for the active model"""
+    return registry.get()
+
+
+async def run_detection(image_data: bytes, confidence_threshold: Optional[float] = None) -> Dict:
+    """Detect with the shared local detector, or on the inference server when one is configured"""
+    if inference_client.remote_inference_enabled():
+        with metrics.timed("inference", registry.name):
+            return await inference_client.detect_food(image_data, confidence_threshold)
+    detector = await run_in_threadpool(get_detector)
+    with metrics.timed("inference", registry.name):
+        return await run_in_threadpool(detector.detect_food, image_data, confidence_threshold)
+
+
+async def detector_status() -> Dict:
+    """Registry status plus device and default threshold of the active detector"""
+    if inference_client.remote_inference_enabled():
+        return await inference_client.detector_status()
+    status = registry.status()
+    detector = registry.peek()
+    status.update({
+        "device": detector.device if detector else None,
+        "confidence_threshold": detector.confidence_threshold if detector else None,
+    })
+    return status
 
 @router.post("/detect")
 async def detect_food_items(
@@ -65,16 +238,9 @@ async def detect_food_items(
         # Read image data
         image_data = await file.read()
         
-        # Get detector
-        detector = get_detector()
-        
-        # Update confidence threshold if different
-        if confidence_threshold != detector.confidence_threshold:
-            detector.confidence_threshold = confidence_threshold
-        
-        # Perform detection
+        # Perform detection (threshold is per request, the detector is shared)
         start_time = time.time()
-        results = detector.detect_food(image_data)
+        results = await run_detection(image_data, confidence_threshold)
         inference_time = time.time() - start_time
         
         # Add metadata
@@ -98,7 +264,9 @@ async def detect_food_items(
             output_path = results_dir / filename
             
             # Save annotated image
-            saved_path = detector.save_annotated_image(image_data, results["detections"], str(output_path))
+            saved_path = await run_in_threadpool(
+                FoodDetector.save_annotated_image, image_data, results["detections"], str(output_path)
+            )
             if saved_path:
                 results["annotated_image_path"] = f"/static/results/{filename}"
         
@@ -126,13 +294,8 @@ async def detect_food_simple(file: UploadFile = File(...)):
         # Read image data
         image_data = await file.read()
         
-        # Get detector
-        detector = get_detector()
-        
-
-        
         # Perform detection
-        results = detector.detect_food(image_data)
+        results = await run_detection(image_data)
         
         if not results.get("success"):
             return JSONResponse(content={
@@ -167,31 +330,37 @@ async def get_detector_status():
     Returns:
         JSON response with detector status
     """
-    print("🔍 Status endpoint called!")
     try:
-        detector = get_detector()
-        print(f"🔍 Detector obtained: {detector}")
-        print(f"🔍 Model loaded: {detector.model is not None}")
-        
         # Import YOLO_AVAILABLE from food_detect module
         from food_detect import YOLO_AVAILABLE
         
+        registry_status = await detector_status()
+        active_model = registry_status["active_model"]
+        active = registry_status["models"].get(active_model, {})
+        
         status = {
-            "model_loaded": detector.model is not None,
-            "model_path": detector.model_path,
-            "device": detector.device,
-            "confidence_threshold": detector.confidence_threshold,
+            "model_loaded": bool(active.get("model_loaded")),
+            "model_path": f"{active_model}.pt",
+            "device": registry_status["device"],
+            "confidence_threshold": registry_status["confidence_threshold"],
             "yolo_available": YOLO_AVAILABLE,
             "model_type": "yolo",
             "mock_model": False,
-            "model_status": "real"
+            "model_status": "real",
+            "active_model": active_model,
+            "warm": bool(active.get("warm")),
+            "state": active.get("state", "not_loaded"),
+            "load_time_seconds": active.get("load_time_seconds"),
+            "warmup_time_seconds": active.get("warmup_time_seconds"),
+            "loaded_at": active.get("loaded_at"),
+            "models": registry_status["models"],
+            "inference_server": inference_client.remote_inference_enabled()
         }
         
-        print(f"🔍 Returning status: {status}")
         return JSONResponse(content=status)
         
     except Exception as e:
-        print(f"❌ Status check failed: {e}")
+        logger.error("❌ Status check failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Status check failed: {str(e)}")
 
 @router.post("/test")
@@ -203,9 +372,11 @@ async def test_detection():
         JSON response with test results
     """
     try:
-        detector = get_detector()
+        if not inference_client.remote_inference_enabled():
+            await run_in_threadpool(get_detector)
+        status = await detector_status()
         
-        if detector.model is None:
+        if not status["loaded"]:
             return JSONResponse(content={
                 "success": False,
                 "error": "Model not loaded",
@@ -216,9 +387,9 @@ async def test_detection():
             "success": True,
             "message": "Detector is ready",
             "model_info": {
-                "path": detector.model_path,
-                "device": detector.device,
-                "confidence_threshold": detector.confidence_threshold
+                "path": f"{status['active_model']}.pt",
+                "device": status["device"],
+                "confidence_threshold": status["confidence_threshold"]
             }
         })
         
@@ -285,21 +456,39 @@ async def switch_model(model_name: str = Form(...)):
         JSON response with switch results
     """
     try:
-        global detector
-        
         # Validate model name
-        valid_models = ["yolov8n", "yolov8s", "yolov8m", "yolov8l", "yolov8x"]
-        if model_name not in valid_models:
-            raise HTTPException(status_code=400, detail=f"Invalid model name. Valid options: {valid_models}")
+        if model_name not in VALID_MODELS:
+            raise HTTPException(status_code=400, detail=f"Invalid model name. Valid options: {VALID_MODELS}")
+        
+        # Load and warm the new model before it replaces the active one
+        if inference_client.remote_inference_enabled():
+            result = await inference_client.switch_detector_model(model_name)
+        else:
+            detector = await run_in_threadpool(registry.switch, model_name)
+            info = registry.status()["models"].get(model_name, {})
+            result = {
+                "success": detector.model is not None,
+                "active_model": registry.active_model,
+                "warm": bool(info.get("warm")),
+                "load_time_seconds": info.get("load_time_seconds")
+            }
         
-        # Create new detector with specified model
-        detector = FoodDetector(model_path=f"{model_name}.pt")
+        if not result["success"]:
+            return JSONResponse(content={
+                "success": False,
+                "message": f"Failed to load {model_name}, still using {result['active_model']}",
+                "model_loaded": False
+            })
         
         return JSONResponse(content={
             "success": True,
             "message": f"Switched to {model_name}",
-            "model_loaded": detector.model is not None
+            "model_loaded": True,
+            "warm": result["warm"],
+            "load_time_seconds": result["load_time_seconds"]
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Model switch failed: {str(e)}") 
\ No newline at end of file
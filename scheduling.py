@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Scheduling Engine
+Slot search and conflict checks for booking sessions.
+
+Busy time (existing sessions) is turned into an IntervalIndex once per
+request: sorted, merged intervals, so "does [start, end) overlap anything"
+is a binary search instead of a scan over every session. Weekly free_days
+rows become minute-granularity windows per weekday, and candidate slots
+are generated over a horizon of several weeks rather than only the next
+occurrence of each weekday.
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+SCHEDULING_HORIZON_WEEKS = int(os.environ.get("SCHEDULING_HORIZON_WEEKS", "1"))  # default search horizon
+SCHEDULING_MAX_HORIZON_WEEKS = int(os.environ.get("SCHEDULING_MAX_HORIZON_WEEKS", "12"))
+
+Window = Tuple[int, int]  # [start, end) in minutes after midnight
+
+
+def to_minutes(value) -> int:
+    """Minutes after midnight from a TIME column (timedelta), time, "HH:MM[:SS]" or seconds"""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, int):
+        return value // 60
+    parts = str(value).split(":")
+    return int(parts[0]) * 60 + (int(parts[1]) if len(parts) > 1 else 0)
+
+
+def session_interval(session: Dict) -> Tuple[datetime, datetime]:
+    """[start, end) of a sessions row (session_date, session_time, duration in minutes)"""
+    start = datetime.combine(session["session_date"], time()) + timedelta(minutes=to_minutes(session["session_time"]))
+    return start, start + timedelta(minutes=session["duration"] or 0)
+
+
+class IntervalIndex:
+    """Sorted, non-overlapping busy intervals with logarithmic overlap queries"""
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime]] = ()):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        for start, end in sorted(i for i in intervals if i[1] > i[0]):
+            if self._ends and start <= self._ends[-1]:
+                self._ends[-1] = max(self._ends[-1], end)
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[Dict]) -> "IntervalIndex":
+        return cls(session_interval(session) for session in sessions)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        # Merged intervals are sorted by start and by end, so only the last
+        # interval starting before `end` can reach past `start`
+        i = bisect_left(self._starts, end) - 1
+        return i >= 0 and self._ends[i] > start
+
+    def add(self, start: datetime, end: datetime):
+        """Mark [start, end) busy, merging with the intervals it touches"""
+        if end <= start:
+            return
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+
+def weekly_windows(free_days: Iterable[Dict]) -> Dict[int, List[Window]]:
+    """Weekday index (Monday = 0) -> merged [start, end) minute windows from free_days rows"""
+    windows: Dict[int, List[Window]] = {}
+    for row in free_days:
+        if not row["is_available"]:
+            continue
+        start, end = to_minutes(row["start_time"]), to_minutes(row["end_time"])
+        if end > start:
+            windows.setdefault(DAYS_OF_WEEK.index(row["day_of_week"]), []).append((start, end))
+    for day, spans in windows.items():
+        merged: List[Window] = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        windows[day] = merged
+    return windows
+
+
+def intersect_windows(a: Sequence[Window], b: Sequence[Window]) -> List[Window]:
+    """Overlap of two sorted, merged window lists (linear merge)"""
+    result, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def candidate_slots(
+    windows: Sequence[Dict[int, List[Window]]],
+    busy: Sequence[IntervalIndex],
+    duration: int,
+    earliest: datetime,
+    horizon_days: float,
+    step: int = 60,
+) -> Iterator[datetime]:
+    """
+    Start times after `earliest` and within `horizon_days` where a session of
+    `duration` minutes fits inside everyone's availability windows and
+    overlaps nobody's busy intervals, in chronological order. Starts are
+    aligned to multiples of `step` minutes after midnight.
+    """
+    latest = earliest + timedelta(days=horizon_days)
+    length = timedelta(minutes=duration)
+    day = earliest.date()
+    while day <= latest.date():
+        shared = windows[0].get(day.weekday(), [])
+        for other in windows[1:]:
+            shared = intersect_windows(shared, other.get(day.weekday(), []))
+        midnight = datetime.combine(day, time())
+        for window_start, window_end in shared:
+            minute = -(-window_start // step) * step
+            while minute + duration <= window_end:
+                start = midnight + timedelta(minutes=minute)
+                if earliest < start < latest and not any(index.overlaps(start, start + length) for index in busy):
+                    yield start
+                minute += step
+        day += timedelta(days=1)
+
+
+def preference_score(slot: str, coach_preferred: Sequence[str], member_preferred: Sequence[str]) -> int:
+    """4 both prefer, 3 coach only, 2 member only, 1 neither (preferred_time_slots hold "HH:MM")"""
+    coach_prefers = slot in coach_preferred
+    member_prefers = slot in member_preferred
+    if coach_prefers and member_prefers:
+        return 4
+    if coach_prefers:
+        return 3
+    if member_prefers:
+        return 2
+    return 1
+
+
+def best_slots(
+    coach_free_days: Iterable[Dict],
+    member_free_days: Iterable[Dict],
+    coach_sessions: Iterable[Dict],
+    member_sessions: Iterable[Dict],
+    duration: int,
+    coach_preferred: Sequence[str] = (),
+    member_preferred: Sequence[str] = (),
+    horizon_weeks: int = SCHEDULING_HORIZON_WEEKS,
+    step: int = 60,
+    limit: int = 10,
+    now: Optional[datetime] = None,
+) -> List[Dict]:
+    """The `limit` best free slots for a coach and member: by preference, then earliest"""
+    now = now or datetime.now()
+    windows = [weekly_windows(coach_free_days), weekly_windows(member_free_days)]
+    busy = [IntervalIndex.from_sessions(coach_sessions), IntervalIndex.from_sessions(member_sessions)]
+    scored = []
+    for start in candidate_slots(windows, busy, duration, now, horizon_weeks * 7, step):
+        slot = start.strftime("%H:%M")
+        scored.append((-preference_score(slot, coach_preferred, member_preferred), start))
+    scored.sort()
+    return [
+        {
+            "date": start.strftime("%Y-%m-%d"),
+            "day": DAYS_OF_WEEK[start.weekday()],
+            "hour": start.strftime("%H:%M"),
+            "end": (start + timedelta(minutes=duration)).strftime("%H:%M"),
+            "preference_score": -score,
+        }
+        for score, start in scored[:limit]
+    ]
+
+
+class Timeline:
+    """Non-overlapping intervals, each owned by a key, with bisect conflict lookups"""
+
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._items: List[Tuple[datetime, datetime, object]] = []
+
+    def conflicts(self, start: datetime, end: datetime) -> List[object]:
+        owners = []
+        i = bisect_left(self._starts, end) - 1
+        while i >= 0 and self._items[i][1] > start:
+            owners.append(self._items[i][2])
+            i -= 1
+        return owners
+
+    def add(self, start: datetime, end: datetime, owner: object):
+        i = bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._items.insert(i, (start, end, owner))
+
+    def remove(self, start: datetime, owner: object):
+        i = bisect_left(self._starts, start)
+        while self._items[i][2] != owner:
+            i += 1
+        del self._starts[i]
+        del self._items[i]
+
+
+def plan_batch(
+    coach_free_days: Iterable[Dict],
+    coach_sessions: Iterable[Dict],
+    coach_preferred: Sequence[str],
+    requests: Sequence[Dict],
+    earliest: datetime,
+    horizon_days: float = 7,
+    step: int = 60,
+    max_depth: int = 4,
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Place every requested session of a coach's members jointly.
+
+    Each request is {"member_id", "count", "duration", "free_days",
+    "sessions", "preferred"}. A member's sessions go on different days; the
+    coach is never double-booked; nobody's existing sessions are touched.
+
+    Sessions are placed most-constrained first (fewest candidate slots;
+    members' first sessions before their second ones on ties), each in its
+    best-scoring free slot. When every candidate is taken, an
+    augmenting path moves the one new session in the way to another slot
+    (up to max_depth moves), as in bipartite matching, so a placement is
+    only given up when no short chain of moves can make room.
+
+    Returns (placed, unplaced): placed rows are {"member_id", "start",
+    "end", "preference_score"}, unplaced rows {"member_id", "missing"}.
+    """
+    coach_windows = weekly_windows(coach_free_days)
+    coach_busy = IntervalIndex.from_sessions(coach_sessions)
+
+    units = []  # (member_id, duration, candidates best first, n-th session of the member)
+    for request in requests:
+        member_busy = IntervalIndex.from_sessions(request["sessions"])
+        windows = [coach_windows, weekly_windows(request["free_days"])]
+        candidates = [
+            (preference_score(start.strftime("%H:%M"), coach_preferred, request["preferred"]), start)
+            for start in candidate_slots(windows, [coach_busy, member_busy], request["duration"],
+                                         earliest, horizon_days, step)
+        ]
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        units.extend((request["member_id"], request["duration"], candidates, n) for n in range(request["count"]))
+
+    timeline = Timeline()
+    placement: Dict[int, Tuple[int, datetime]] = {}  # unit -> (score, start)
+    member_days: Dict[Tuple[int, object], int] = {}  # (member_id, date) -> unit
+
+    def assign(unit: int, score: int, start: datetime):
+        member_id, duration = units[unit][:2]
+        placement[unit] = (score, start)
+        member_days[(member_id, start.date())] = unit
+        timeline.add(start, start + timedelta(minutes=duration), unit)
+
+    def unassign(unit: int) -> Tuple[int, datetime]:
+        score, start = placement.pop(unit)
+        del member_days[(units[unit][0], start.date())]
+        timeline.remove(start, unit)
+        return score, start
+
+    def place(unit: int, visited: set, depth: int) -> bool:
+        member_id, duration, candidates, _ = units[unit]
+        usable = [
+            (score, start) for score, start in candidates
+            if start not in visited and (member_id, start.date()) not in member_days
+        ]
+        for score, start in usable:
+            if not timeline.conflicts(start, start + timedelta(minutes=duration)):
+                assign(unit, score, start)
+                return True
+        if depth == 0:
+            return False
+        for score, start in usable:
+            blocking = timeline.conflicts(start, start + timedelta(minutes=duration))
+            if len(blocking) != 1:
+                continue
+            other = blocking[0]
+            visited.add(start)
+            previous = unassign(other)
+            assign(unit, score, start)
+            if place(other, visited, depth - 1):
+                return True
+            unassign(unit)
+            assign(other, *previous)
+        return False
+
+    unplaced: Dict[int, int] = {}
+    for unit in sorted(range(len(units)), key=lambda u: (len(units[u][2]), units[u][3])):
+        if not place(unit, set(), max_depth):
+            unplaced[units[unit][0]] = unplaced.get(units[unit][0], 0) + 1
+
+    placed = [
+        {
+            "member_id": units[unit][0],
+            "start": start,
+            "end": start + timedelta(minutes=units[unit][1]),
+            "preference_score": score,
+        }
+        for unit, (score, start) in sorted(placement.items(), key=lambda item: item[1][1])
+    ]
+    return placed, [{"member_id": member_id, "missing": missing} for member_id, missing in unplaced.items()]
@@ -0,0 +1,331 @@
+"""
+Session Store
+Login sessions with sliding expiry, behind a pluggable backend:
+
+- "memory": a dict in this process (single worker, lost on restart)
+- "mysql":  the user_sessions table through the shared pool, so every
+            uvicorn worker sees the same sessions and restarts keep them
+
+Pick the backend with SESSION_BACKEND. Expired sessions are removed on
+lookup and by a background sweeper thread. With the mysql backend,
+SessionMiddleware looks the session up before the route runs, so handlers
+never hold their own connection and a session lookup's at the same time.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import HTTPConnection
+
+from db_offload import run_in_db_executor
+from db_pool import get_pool
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_TTL = float(os.environ.get("SESSION_TTL", str(7 * 24 * 3600)))           # idle time before a session expires
+SESSION_MAX_AGE = float(os.environ.get("SESSION_MAX_AGE", str(30 * 24 * 3600)))  # hard limit since login
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", "300"))
+SESSION_TOUCH_INTERVAL = float(os.environ.get("SESSION_TOUCH_INTERVAL", "60"))   # min seconds between expiry writes
+SESSION_CACHE_SECONDS = float(os.environ.get("SESSION_CACHE_SECONDS", "5"))      # mysql: per-worker lookup cache
+
+
+class SessionStore:
+    """Common API and sweeper; backends implement _save, _load, _touch, _delete and _sweep"""
+
+    backend = "base"
+
+    def __init__(self, ttl: float = SESSION_TTL, max_age: float = SESSION_MAX_AGE):
+        self.ttl = ttl
+        self.max_age = max_age
+        self._stats = {"created": 0, "hits": 0, "misses": 0, "expired": 0, "deleted": 0, "swept": 0}
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _expiry(self, now: float, created_at: float) -> float:
+        return min(now + self.ttl, created_at + self.max_age)
+
+    def create(self, user_data: Dict) -> str:
+        """Store user_data under a new random session id and return the id"""
+        session_id = secrets.token_urlsafe(32)
+        now = time.time()
+        self._save(session_id, user_data, now, self._expiry(now, now))
+        self._stats["created"] += 1
+        return session_id
+
+    def get(self, session_id: Optional[str]) -> Optional[Dict]:
+        """User data for a live session (extending its expiry), or None"""
+        if not session_id:
+            return None
+        entry = self._load(session_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        user_data, created_at, expires_at = entry
+        now = time.time()
+        if expires_at <= now:
+            self._stats["expired"] += 1
+            self._delete(session_id)
+            return None
+        new_expiry = self._expiry(now, created_at)
+        if new_expiry - expires_at >= SESSION_TOUCH_INTERVAL:
+            self._touch(session_id, new_expiry)
+        self._stats["hits"] += 1
+        return user_data
+
+    def __contains__(self, session_id: Optional[str]) -> bool:
+        return self.get(session_id) is not None
+
+    def delete(self, session_id: Optional[str]):
+        if session_id:
+            self._delete(session_id)
+            self._stats["deleted"] += 1
+
+    def sweep(self) -> int:
+        """Remove every expired session; returns how many were removed"""
+        removed = self._sweep(time.time())
+        self._stats["swept"] += removed
+        return removed
+
+    def start_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error("Session sweep failed: %s", e)
+
+        self._sweeper = threading.Thread(target=run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        snapshot = dict(self._stats)
+        snapshot.update({"backend": self.backend, "ttl_seconds": self.ttl, "max_age_seconds": self.max_age})
+        return snapshot
+
+    # Backend hooks
+
+    def _save(self, session_id: str, user_data: Dict, created_at: float, expires_at: float):
+        raise NotImplementedError
+
+    def _load(self, session_id: str) -> Optional[Tuple[Dict, float, float]]:
+        raise NotImplementedError
+
+    def _touch(self, session_id: str, expires_at: float):
+        raise NotImplementedError
+
+    def _delete(self, session_id: str):
+        raise NotImplementedError
+
+    def _sweep(self, now: float) -> int:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in a dict guarded by a lock; O(1) lookups"""
+
+    backend = "memory"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._sessions: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _save(self, session_id, user_data, created_at, expires_at):
+        with self._lock:
+            self._sessions[session_id] = [user_data, created_at, expires_at]
+
+    def _load(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return tuple(entry) if entry is not None else None
+
+    def _touch(self, session_id, expires_at):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[2] = expires_at
+
+    def _delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _sweep(self, now):
+        with self._lock:
+            expired = [sid for sid, entry in self._sessions.items() if entry[2] <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+    def stats(self):
+        snapshot = super().stats()
+        snapshot["active"] = len(self._sessions)
+        return snapshot
+
+
+class MySQLSessionStore(SessionStore):
+    """
+    Sessions in the user_sessions table, shared by every worker.
+
+    Lookups are primary-key reads; each worker caches them for
+    SESSION_CACHE_SECONDS, so a logout can take that long to reach the
+    other workers.
+    """
+
+    backend = "mysql"
+
+    def __init__(self, cache_seconds: float = SESSION_CACHE_SECONDS, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_seconds = cache_seconds
+        self._cache: Dict[str, Tuple[float, Optional[Tuple[Dict, float, float]]]] = {}
+        self._cache_lock = threading.Lock()
+        self._table_ready = False
+
+    def _execute(self, sql: str, params=(), fetch: bool = False):
+        conn = get_pool().get_connection()
+        try:
+            cursor = conn.cursor()
+            try:
+                if not self._table_ready:
+                    ensure_sessions_table(cursor)
+                    self._table_ready = True
+                cursor.execute(sql, params)
+                result = cursor.fetchone() if fetch else cursor.rowcount
+                conn.commit()
+                return result
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+    def _cache_put(self, session_id, entry):
+        with self._cache_lock:
+            self._cache[session_id] = (time.monotonic() + self.cache_seconds, entry)
+            if len(self._cache) > 10000:
+                now = time.monotonic()
+                self._cache = {sid: item for sid, item in self._cache.items() if item[0] > now}
+
+    def _save(self, session_id, user_data, created_at, expires_at):
+        self._execute(
+            "INSERT INTO user_sessions (session_id, user_data, created_at, expires_at) "
+            "VALUES (%s, %s, FROM_UNIXTIME(%s), FROM_UNIXTIME(%s))",
+            (session_id, json.dumps(user_data, default=str), created_at, expires_at),
+        )
+        self._cache_put(session_id, (user_data, created_at, expires_at))
+
+    def _load(self, session_id):
+        with self._cache_lock:
+            cached = self._cache.get(session_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        row = self._execute(
+            "SELECT user_data, UNIX_TIMESTAMP(created_at) AS created_at, UNIX_TIMESTAMP(expires_at) AS expires_at "
+            "FROM user_sessions WHERE session_id = %s",
+            (session_id,),
+            fetch=True,
+        )
+        entry = (json.loads(row["user_data"]), float(row["created_at"]), float(row["expires_at"])) if row else None
+        self._cache_put(session_id, entry)
+        return entry
+
+    def _touch(self, session_id, expires_at):
+        self._execute(
+            "UPDATE user_sessions SET expires_at = FROM_UNIXTIME(%s) WHERE session_id = %s",
+            (expires_at, session_id),
+        )
+        with self._cache_lock:
+            cached = self._cache.get(session_id)
+            if cached is not None and cached[1] is not None:
+                user_data, created_at, _ = cached[1]
+                self._cache[session_id] = (cached[0], (user_data, created_at, expires_at))
+
+    def _delete(self, session_id):
+        self._execute("DELETE FROM user_sessions WHERE session_id = %s", (session_id,))
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
+    def _sweep(self, now):
+        removed = 0
+        while True:
+            # Small batches keep the delete from holding locks on a busy table
+            count = self._execute(
+                "DELETE FROM user_sessions WHERE expires_at <= FROM_UNIXTIME(%s) LIMIT 1000", (now,)
+            )
+            removed += count
+            if count < 1000:
+                return removed
+
+    def stats(self):
+        snapshot = super().stats()
+        try:
+            row = self._execute("SELECT COUNT(*) AS active FROM user_sessions WHERE expires_at > NOW()", fetch=True)
+            snapshot["active"] = row["active"]
+        except Exception as e:
+            snapshot["active"] = None
+            snapshot["error"] = str(e)
+        snapshot["cached"] = len(self._cache)
+        return snapshot
+
+
+def ensure_sessions_table(cursor):
+    """Create user_sessions if it does not exist (also done by seed_database.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            session_id VARCHAR(64) PRIMARY KEY,
+            user_data TEXT NOT NULL,
+            created_at DATETIME NOT NULL,
+            expires_at DATETIME NOT NULL,
+            INDEX idx_expires_at (expires_at)
+        )
+    """)
+
+
+class SessionMiddleware:
+    """
+    ASGI middleware that resolves the session cookie before the route runs.
+
+    The result is left in request.state.session as (session_id, user_data),
+    where api.get_current_user() picks it up instead of checking out a
+    second pool connection while the handler already holds one.
+    """
+
+    def __init__(self, app, store: Optional[SessionStore] = None):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope.get("path", "").startswith("/static/"):
+            session_id = HTTPConnection(scope).cookies.get("session_id")
+            if session_id:
+                store = self.store or session_store
+                try:
+                    user_data = await run_in_db_executor(store.get, session_id)
+                    scope.setdefault("state", {})["session"] = (session_id, user_data)
+                except Exception as e:
+                    # Left unresolved: get_current_user() tries again and reports the error
+                    logger.error("Session lookup failed: %s", e)
+        await self.app(scope, receive, send)
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "mysql":
+        return MySQLSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}' (expected 'memory' or 'mysql')")
+
+
+# Process-wide store used by api.py
+session_store = create_session_store()